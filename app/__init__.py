@@ -25,6 +25,21 @@ def create_app(config_name=None):
     from app.routes import main_bp
     app.register_blueprint(main_bp)
 
+    # Token-authenticated; see app.api
+    from app.api import api_bp
+    csrf.exempt(api_bp)
+    app.register_blueprint(api_bp)
+
+    from app.commands import register_commands
+    register_commands(app)
+
+    from app.services import compression, query_budget, response_cache, search, stats
+    stats.init_app(app)
+    query_budget.init_app(app)
+    search.init_app(app)
+    response_cache.init_app(app)
+    compression.init_app(app)
+
     # Ensure app_settings table exists (safe even if it already does)
     with app.app_context():
         from sqlalchemy import inspect
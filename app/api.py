@@ -0,0 +1,121 @@
+"""
+Versioned JSON API (``/api/v1``) over platforms, targets, campaigns,
+emails and templates.
+
+Requests authenticate with ``Authorization: Bearer <token>`` (issue tokens
+with ``flask api-token create``) instead of a CSRF token. Lists page with
+the same keyset cursors as the HTML lists (``after``/``before``/
+``per_page``), take ``fields=`` for a sparse fieldset and exact-match
+filters on the resource's filter fields plus ``updated_since``. ``POST``
+and ``PATCH`` on a collection take a JSON array of records (up to
+API_MAX_BATCH) and write all of them or none.
+"""
+from flask import Blueprint, g, jsonify, request, url_for
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.services import api_resources
+from app.services.api_resources import ApiError
+from app.services.pagination import keyset_page, page_args
+from app.services.query_budget import query_budget
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+@api_bp.before_request
+def _authenticate():
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    name = api_resources.token_name(token.strip()) if scheme.lower() == 'bearer' else None
+    if name is None:
+        response = jsonify(error='A valid API token is required.')
+        response.headers['WWW-Authenticate'] = 'Bearer'
+        return response, 401
+    g.api_token = name
+
+
+@api_bp.errorhandler(ApiError)
+def _api_error(e):
+    db.session.rollback()
+    body = {'error': e.message}
+    if e.errors:
+        body['errors'] = e.errors
+    return jsonify(body), e.status
+
+
+@api_bp.errorhandler(404)
+@api_bp.errorhandler(405)
+def _http_error(e):
+    return jsonify(error=e.description), e.code
+
+
+def _payload():
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and 'data' in data:
+        data = data['data']
+    if data is None:
+        raise ApiError('Send a JSON body.', 400)
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+@api_bp.route('/<resource>', methods=['GET'])
+@query_budget(1)
+def list_records(resource):
+    model, _, filterable = api_resources.resource(resource)
+    fields = api_resources.select_fields(model, request.args.get('fields'))
+    stmt = api_resources.list_query(model, fields, request.args, filterable)
+    page = keyset_page(stmt, model, **page_args())
+
+    def link(**cursor):
+        args = {k: v for k, v in request.args.items() if k not in ('after', 'before')}
+        return url_for('api.list_records', resource=resource, **args, **cursor)
+
+    return jsonify(
+        data=[api_resources.serialize(row, fields) for row in page],
+        links={
+            'next': link(after=page.next_cursor) if page.has_next else None,
+            'prev': link(before=page.prev_cursor) if page.has_prev else None,
+        },
+    )
+
+
+@api_bp.route('/<resource>/<int:record_id>', methods=['GET'])
+@query_budget(1)
+def get_record(resource, record_id):
+    model = api_resources.resource(resource)[0]
+    fields = api_resources.select_fields(model, request.args.get('fields'))
+    row = db.session.execute(
+        select(*api_resources.select_columns(model, fields)).where(model.id == record_id)).first()
+    if row is None:
+        raise ApiError(f'No {model.__name__} with id {record_id}.', 404)
+    return jsonify(data=api_resources.serialize(row, fields))
+
+
+# ---------------------------------------------------------------------------
+# Bulk writes
+# ---------------------------------------------------------------------------
+
+@api_bp.route('/<resource>', methods=['POST'])
+def create_records(resource):
+    api_resources.resource(resource)
+    try:
+        ids = api_resources.bulk_create(resource, _payload())
+    except IntegrityError as e:
+        db.session.rollback()
+        raise ApiError(f'Conflict with existing data: {e.orig}', 409)
+    return jsonify(created=len(ids), ids=ids), 201
+
+
+@api_bp.route('/<resource>', methods=['PATCH'])
+def update_records(resource):
+    api_resources.resource(resource)
+    try:
+        updated = api_resources.bulk_update(resource, _payload())
+    except IntegrityError as e:
+        db.session.rollback()
+        raise ApiError(f'Conflict with existing data: {e.orig}', 409)
+    return jsonify(updated=updated)
@@ -0,0 +1,170 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+@click.command('sync-replies')
+@with_appcontext
+def sync_replies_command():
+    """Pull new Gmail replies and bounces and update outreach statuses."""
+    from app.services.gmail_service import GmailService
+    from app.services.reply_sync import sync_replies
+
+    result = sync_replies(GmailService.from_config(current_app.config))
+    if result.reset:
+        click.echo(f'Checkpoint set to historyId {result.history_id}.')
+    else:
+        click.echo(f'{result.messages_seen} new messages: '
+                   f'{result.replied} replied, {result.bounced} bounced '
+                   f'(historyId {result.history_id}).')
+
+
+@click.command('follow-ups')
+@click.option('--template-id', type=int, help='EmailTemplate to create follow-ups from.')
+@click.option('--stage', type=click.Choice(['1', '2', 'all']), default='all', show_default=True)
+@click.option('--queue', is_flag=True, help='Queue for sending instead of creating drafts.')
+@click.option('--send-queued', is_flag=True, help='Send all queued follow-ups.')
+@with_appcontext
+def follow_ups_command(template_id, stage, queue, send_queued):
+    """Create follow-ups for every pitch that is due, and/or send queued ones."""
+    from app import db
+    from app.models import EmailTemplate
+    from app.services import follow_ups
+    from app.services.gmail_service import GmailService
+
+    if template_id:
+        template = db.session.get(EmailTemplate, template_id)
+        if template is None:
+            raise click.BadParameter(f'No template with id {template_id}', param_hint='--template-id')
+        stages = [1, 2] if stage == 'all' else [int(stage)]
+        for s in stages:
+            result = follow_ups.create_follow_ups(template, s, queue=queue)
+            click.echo(f'Follow-up {s}: created {result.created} '
+                       f'{"queued emails" if queue else "drafts"}.')
+
+    if send_queued:
+        result = follow_ups.send_queued(GmailService.from_config(current_app.config))
+        click.echo(f'Sent {result.sent} queued follow-ups '
+                   f'({result.failed} failed, left queued for the next run).')
+
+    if not template_id and not send_queued:
+        raise click.UsageError('Pass --template-id and/or --send-queued.')
+
+
+@click.command('reconcile-stats')
+@with_appcontext
+def reconcile_stats_command():
+    """Recount the dashboard counters from the real tables."""
+    from app import db
+    from app.services import stats
+
+    drift = stats.reconcile()
+    db.session.commit()
+    if drift:
+        for key, delta in sorted(drift.items()):
+            click.echo(f'{key}: {delta:+d}')
+    else:
+        click.echo('Counters were already correct.')
+
+
+@click.command('purge')
+@click.argument('kind', type=click.Choice(['platforms', 'campaigns']), required=False)
+@click.option('--resume', is_flag=True, help='Carry on with an interrupted purge.')
+@with_appcontext
+def purge_command(kind, resume):
+    """Delete every platform or campaign (and dependent rows) in batches."""
+    from app.services import purge
+
+    def report(job):
+        done = ', '.join(f'{name} {job["done"][name]}/{job["total"][name]}'
+                         for name in job['total'])
+        click.echo(f'\r{done}', nl=False)
+
+    try:
+        if resume:
+            job = purge.status()
+            if job and job['status'] != 'done':
+                click.echo(f'Resuming purge of {job["kind"]} at {job["stage"]}.')
+            job = purge.resume(progress=report)
+        elif kind:
+            job = purge.run(purge.start(kind), progress=report)
+        else:
+            raise click.UsageError('Pass a KIND to purge, or --resume.')
+    except purge.PurgeError as e:
+        raise click.ClickException(str(e))
+    click.echo(f'\nPurge of {job["kind"]} finished.')
+
+
+@click.group('api-token')
+def api_token_group():
+    """Manage bearer tokens for the JSON API."""
+
+
+@api_token_group.command('create')
+@click.argument('name')
+@with_appcontext
+def api_token_create(name):
+    """Issue a token labelled NAME (shown once; only its hash is stored)."""
+    from app import db
+    from app.services import api_resources
+
+    token = api_resources.create_token(name)
+    db.session.commit()
+    click.echo(token)
+
+
+@api_token_group.command('list')
+@with_appcontext
+def api_token_list():
+    """List issued tokens by name and hash prefix."""
+    from app.services import api_resources
+
+    for prefix, name in sorted(api_resources.list_tokens(), key=lambda t: t[1]):
+        click.echo(f'{name}\t{prefix}')
+
+
+@api_token_group.command('revoke')
+@click.argument('name')
+@with_appcontext
+def api_token_revoke(name):
+    """Revoke every token labelled NAME."""
+    from app import db
+    from app.services import api_resources
+
+    revoked = api_resources.revoke_tokens(name)
+    db.session.commit()
+    click.echo(f'Revoked {revoked} token(s).')
+
+
+@click.group('email-bodies')
+def email_bodies_group():
+    """Maintain the deduplicated email body store."""
+
+
+@email_bodies_group.command('compact')
+@with_appcontext
+def email_bodies_compact():
+    """Store emails made from a template as the template body plus their values."""
+    from app.services import email_bodies
+
+    moved = email_bodies.compact()
+    click.echo(f'Moved {moved} email(s) onto their template body.')
+
+
+@email_bodies_group.command('prune')
+@with_appcontext
+def email_bodies_prune():
+    """Delete stored bodies that no email uses (run while nothing is sending)."""
+    from app.services import email_bodies
+
+    removed = email_bodies.prune()
+    click.echo(f'Deleted {removed} unused email bodies.')
+
+
+def register_commands(app):
+    app.cli.add_command(sync_replies_command)
+    app.cli.add_command(follow_ups_command)
+    app.cli.add_command(reconcile_stats_command)
+    app.cli.add_command(purge_command)
+    app.cli.add_command(api_token_group)
+    app.cli.add_command(email_bodies_group)
@@ -2,16 +2,44 @@ from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed, FileRequired
 from wtforms import (StringField, TextAreaField, SelectField, IntegerField,
                      SubmitField, HiddenField, DateField, BooleanField)
-from wtforms.validators import DataRequired, Email, Optional, URL, NumberRange
+from wtforms.validators import (DataRequired, Email, Optional, URL, NumberRange,
+                                ValidationError)
+from wtforms.widgets import HiddenInput
+
+from app.models import (CAMPAIGN_STATUSES, DIFFICULTIES, PLATFORM_STATUSES, PRIORITIES,
+                        TARGET_STATUSES, TIERS)
+
+
+class LookupField(IntegerField):
+    """Row ID chosen through a typeahead picker (rendered as a hidden input).
+
+    ``kind`` names the /lookup endpoint; the ID is checked with a single
+    primary-key lookup instead of against a list of every row.
+    """
+    widget = HiddenInput()
+
+    def __init__(self, label=None, validators=None, kind=None, **kwargs):
+        super().__init__(label, validators, **kwargs)
+        self.kind = kind
+
+    def pre_validate(self, form):
+        if self.data is None:
+            return
+        from app import db
+        from app.models import Platform, Target
+        model = {'platforms': Platform, 'targets': Target}[self.kind]
+        if db.session.get(model, self.data) is None:
+            raise ValidationError(f'Not a valid {model.__name__.lower()}.')
+
+
+def _blank_to_none(value):
+    """Coerce an unselected optional choice to NULL rather than ''."""
+    return value or None
 
 
 class PlatformForm(FlaskForm):
-    tier = SelectField('Tier', choices=[
-        ('', '-- Select --'),
-        ('T1', 'T1'),
-        ('T2', 'T2'),
-        ('T3', 'T3'),
-    ], validators=[Optional()])
+    tier = SelectField('Tier', choices=[('', '-- Select --')] + [(t, t) for t in TIERS],
+                       coerce=_blank_to_none, validators=[Optional()])
     name = StringField('Platform Name', validators=[DataRequired()])
     url = StringField('URL', validators=[DataRequired(), URL()])
     submission_type = SelectField('Submission Type', choices=[
@@ -20,12 +48,9 @@ class PlatformForm(FlaskForm):
         ('Pitch First', 'Pitch First'),
     ], validators=[Optional()])
     topic_to_submit = StringField('Topic to Submit', validators=[Optional()])
-    difficulty = SelectField('Difficulty', choices=[
-        ('', '-- Select --'),
-        ('Easy', 'Easy'),
-        ('Medium', 'Medium'),
-        ('Hard', 'Hard'),
-    ], validators=[Optional()])
+    difficulty = SelectField('Difficulty',
+                             choices=[('', '-- Select --')] + [(d, d) for d in DIFFICULTIES],
+                             coerce=_blank_to_none, validators=[Optional()])
     contact_name = StringField('Contact/Editor', validators=[Optional()])
     contact_email = StringField('Email', validators=[Optional(), Email()])
     pitch_sent_date = DateField('Pitch Sent Date', validators=[Optional()])
@@ -33,14 +58,8 @@ class PlatformForm(FlaskForm):
     follow_up_1 = DateField('Follow-up 1', validators=[Optional()])
     follow_up_2 = DateField('Follow-up 2', validators=[Optional()])
     response_date = DateField('Response Date', validators=[Optional()])
-    status = SelectField('Status', choices=[
-        ('Not Started', 'Not Started'),
-        ('Pitch Sent', 'Pitch Sent'),
-        ('Article Sent', 'Article Sent'),
-        ('Follow-up', 'Follow-up'),
-        ('Published', 'Published'),
-        ('Rejected', 'Rejected'),
-    ], validators=[Optional()])
+    status = SelectField('Status', choices=[(s, s) for s in PLATFORM_STATUSES],
+                         validators=[Optional()])
     notes = TextAreaField('Notes', validators=[Optional()])
     publication_date = DateField('Publication Date', validators=[Optional()])
     live_url = StringField('Live URL', validators=[Optional()])
@@ -49,24 +68,15 @@ class PlatformForm(FlaskForm):
 
 
 class TargetForm(FlaskForm):
-    platform_id = SelectField('Platform', coerce=int, validators=[DataRequired()])
+    platform_id = LookupField('Platform', kind='platforms', validators=[DataRequired()])
     target_url = StringField('Target URL', validators=[DataRequired(), URL()])
     target_page_title = StringField('Page Title', validators=[Optional()])
     our_url = StringField('Our URL to Link', validators=[Optional()])
     anchor_text = StringField('Desired Anchor Text', validators=[Optional()])
-    status = SelectField('Status', choices=[
-        ('identified', 'Identified'),
-        ('contacted', 'Contacted'),
-        ('negotiating', 'Negotiating'),
-        ('approved', 'Approved'),
-        ('live', 'Live'),
-        ('rejected', 'Rejected'),
-    ], validators=[DataRequired()])
-    priority = SelectField('Priority', choices=[
-        ('low', 'Low'),
-        ('medium', 'Medium'),
-        ('high', 'High'),
-    ], validators=[DataRequired()])
+    status = SelectField('Status', choices=[(s, s.capitalize()) for s in TARGET_STATUSES],
+                         validators=[DataRequired()])
+    priority = SelectField('Priority', choices=[(p, p.capitalize()) for p in PRIORITIES],
+                           validators=[DataRequired()])
     notes = TextAreaField('Notes', validators=[Optional()])
     submit = SubmitField('Save Target')
 
@@ -74,17 +84,13 @@ class TargetForm(FlaskForm):
 class CampaignForm(FlaskForm):
     name = StringField('Campaign Name', validators=[DataRequired()])
     description = TextAreaField('Description', validators=[Optional()])
-    status = SelectField('Status', choices=[
-        ('draft', 'Draft'),
-        ('active', 'Active'),
-        ('paused', 'Paused'),
-        ('completed', 'Completed'),
-    ], validators=[DataRequired()])
+    status = SelectField('Status', choices=[(s, s.capitalize()) for s in CAMPAIGN_STATUSES],
+                         validators=[DataRequired()])
     submit = SubmitField('Save Campaign')
 
 
 class OutreachEmailForm(FlaskForm):
-    target_id = SelectField('Target', coerce=int, validators=[DataRequired()])
+    target_id = LookupField('Target', kind='targets', validators=[DataRequired()])
     campaign_id = SelectField('Campaign', coerce=int, validators=[Optional()])
     recipient_email = StringField('Recipient Email',
                                   validators=[DataRequired(), Email()])
@@ -104,6 +110,20 @@ class EmailTemplateForm(FlaskForm):
     body_html = TextAreaField('Email Body (HTML)', validators=[DataRequired()])
     submit = SubmitField('Save Template')
 
+    def validate_subject(self, field):
+        _check_template_syntax(field.data)
+
+    def validate_body_html(self, field):
+        _check_template_syntax(field.data)
+
+
+def _check_template_syntax(text):
+    from app.services.template_engine import compile_text, TemplateSyntaxError
+    try:
+        compile_text(text or '')
+    except TemplateSyntaxError as e:
+        raise ValidationError(str(e))
+
 
 class BulkSendForm(FlaskForm):
     template_id = SelectField('Email Template', coerce=int, validators=[DataRequired()])
@@ -116,4 +136,15 @@ class UploadPlatformsForm(FlaskForm):
         FileRequired(),
         FileAllowed(['csv', 'xlsx', 'xls'], 'Only CSV and Excel files allowed.')
     ])
-    submit = SubmitField('Upload & Import')
+    mode = SelectField('If a platform\'s domain already exists', choices=[
+        ('skip', 'Keep the existing platform'),
+        ('upsert', 'Update it with the values in this file'),
+    ], default='skip')
+    submit = SubmitField('Upload & Review')
+
+
+class ConfirmImportForm(FlaskForm):
+    token = HiddenField(validators=[DataRequired()])
+    mode = HiddenField(default='skip')
+    true_values = StringField('Values that mean "yes"', validators=[Optional()])
+    submit = SubmitField('Confirm & Import')
@@ -1,7 +1,76 @@
 from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from sqlalchemy import Integer, false, inspect
+from sqlalchemy.orm import validates
+
 from app import db
 
 
+def normalize_domain(url):
+    """Reduce a URL to its lower-cased host without ``www.`` (dedupe key)."""
+    if not url or not url.strip():
+        return None
+    value = url.strip().lower()
+    if '://' not in value:
+        value = 'http://' + value
+    try:
+        host = urlsplit(value).hostname or ''
+    except ValueError:
+        return None
+    if host.startswith('www.'):
+        host = host[4:]
+    return host.rstrip('.') or None
+
+
+# Allowed values of the enumerated columns, in display order. Stored as
+# native enums on PostgreSQL (VARCHAR elsewhere); see migrations 013 and 015.
+PLATFORM_STATUSES = ('Not Started', 'Pitch Sent', 'Article Sent', 'Follow-up', 'Responded',
+                     'Published', 'Rejected')
+TARGET_STATUSES = ('identified', 'contacted', 'negotiating', 'approved', 'live', 'rejected')
+CAMPAIGN_STATUSES = ('draft', 'active', 'paused', 'completed')
+EMAIL_STATUSES = ('draft', 'queued', 'sent', 'delivered', 'replied', 'bounced')
+TIERS = ('T1', 'T2', 'T3')
+PRIORITIES = ('low', 'medium', 'high')
+DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+
+
+def _enum(name, values, length):
+    """Native enum on PostgreSQL; VARCHAR(length), as before, elsewhere."""
+    return db.Enum(*values, name=name, length=length, validate_strings=True)
+
+
+def _choice_key(value):
+    return ''.join(ch for ch in value.lower() if ch.isalnum())
+
+
+def normalize_choice(value, choices):
+    """Match free text to one of ``choices`` ignoring case, spaces and
+    punctuation (``'pitch sent'`` -> ``'Pitch Sent'``); None if none match."""
+    if not value or not value.strip():
+        return None
+    key = _choice_key(value)
+    return next((c for c in choices if _choice_key(c) == key), None)
+
+
+def choice_equals(column, value):
+    """``column == value``, or false for a value the column cannot hold.
+
+    Filters arrive as request strings: an enum column only matches its own
+    values, and an integer column only whole numbers, so a bad value
+    selects nothing instead of failing the query on PostgreSQL.
+    """
+    enums = getattr(column.type, 'enums', None)
+    if enums is not None and value not in enums:
+        return false()
+    if isinstance(column.type, Integer):
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return false()
+    return column == value
+
+
 class AppSetting(db.Model):
     """Key-value store for app settings (API keys, etc.)."""
     __tablename__ = 'app_settings'
@@ -37,16 +106,56 @@ class AppSetting(db.Model):
     ]
 
 
+class StatCounter(db.Model):
+    """Precomputed dashboard counts, kept current by app.services.stats."""
+    __tablename__ = 'stat_counters'
+
+    key = db.Column(db.String(100), primary_key=True)  # e.g. 'targets', 'targets.status.live'
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<StatCounter {self.key}={self.value}>'
+
+
+class StagedUploadChunk(db.Model):
+    """One piece of an upload waiting for its import to be confirmed.
+
+    Kept in the database so the confirm request finds the file on any
+    dyno; see app/services/platform_import.py.
+    """
+    __tablename__ = 'staged_upload_chunks'
+
+    token = db.Column(db.String(40), primary_key=True)   # e.g. '<32 hex>.csv'
+    seq = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+
+    def __repr__(self):
+        return f'<StagedUploadChunk {self.token}#{self.seq}>'
+
+
+def _trigram_index(name, column):
+    """GIN pg_trgm index for /lookup substring search (PostgreSQL only)."""
+    return db.Index(name, column, postgresql_using='gin',
+                    postgresql_ops={column: 'gin_trgm_ops'}).ddl_if(dialect='postgresql')
+
+
+_HAS_EMAIL = "contact_email IS NOT NULL AND contact_email <> ''"
+_NEEDS_EMAIL = ("contact_name IS NOT NULL AND contact_name <> '' "
+                "AND (contact_email IS NULL OR contact_email = '')")
+
+
 class Platform(db.Model):
     __tablename__ = 'platforms'
 
     id = db.Column(db.Integer, primary_key=True)
-    tier = db.Column(db.String(10))                       # T1, T2, T3
+    tier = db.Column(_enum('platform_tier', TIERS, 10))
     name = db.Column(db.String(200), nullable=False)
     url = db.Column(db.String(500), nullable=False)
+    domain = db.Column(db.String(255))                     # normalized from url, unique
     submission_type = db.Column(db.String(50))             # Full Article, Pitch First
     topic_to_submit = db.Column(db.String(300))
-    difficulty = db.Column(db.String(20))                  # Easy, Medium, Hard
+    difficulty = db.Column(_enum('platform_difficulty', DIFFICULTIES, 20))
     contact_name = db.Column(db.String(200))               # Contact/Editor
     contact_email = db.Column(db.String(200))              # Email
     pitch_sent_date = db.Column(db.Date)
@@ -54,18 +163,46 @@ class Platform(db.Model):
     follow_up_1 = db.Column(db.Date)
     follow_up_2 = db.Column(db.Date)
     response_date = db.Column(db.Date)
-    status = db.Column(db.String(50), default='Not Started')
+    status = db.Column(_enum('platform_status', PLATFORM_STATUSES, 50), default='Not Started')
     notes = db.Column(db.Text)
     publication_date = db.Column(db.Date)
     live_url = db.Column(db.String(500))
     backlink_confirmed = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
                            onupdate=lambda: datetime.now(timezone.utc))
 
     targets = db.relationship('Target', backref='platform', lazy='dynamic',
                               cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_platforms_domain', 'domain', unique=True),
+        # Pending pitches only, for the follow-up engine's due queries
+        db.Index('ix_platforms_follow_up_1_due', 'pitch_sent_date',
+                 postgresql_where=db.text('follow_up_1 IS NULL AND response_date IS NULL'),
+                 sqlite_where=db.text('follow_up_1 IS NULL AND response_date IS NULL')),
+        db.Index('ix_platforms_follow_up_2_due', 'follow_up_1',
+                 postgresql_where=db.text('follow_up_2 IS NULL AND response_date IS NULL'),
+                 sqlite_where=db.text('follow_up_2 IS NULL AND response_date IS NULL')),
+        db.Index('ix_platforms_created_at_id', 'created_at', 'id'),
+        db.Index('ix_platforms_name', 'name'),
+        # Bulk Send recipients / Find All Emails candidates
+        db.Index('ix_platforms_with_email', 'name',
+                 postgresql_where=db.text(_HAS_EMAIL), sqlite_where=db.text(_HAS_EMAIL)),
+        db.Index('ix_platforms_needs_email', 'id',
+                 postgresql_where=db.text(_NEEDS_EMAIL), sqlite_where=db.text(_NEEDS_EMAIL)),
+        _trigram_index('ix_platforms_name_trgm', 'name'),
+        _trigram_index('ix_platforms_domain_trgm', 'domain'),
+    )
+
+    @validates('url')
+    def _set_domain(self, key, url):
+        # Only a new URL resets the domain: duplicates migration 007 left
+        # without one stay editable as long as their URL is kept
+        if url != self.url:
+            self.domain = normalize_domain(url)
+        return url
+
     def __repr__(self):
         return f'<Platform {self.name}>'
 
@@ -74,22 +211,29 @@ class Target(db.Model):
     __tablename__ = 'targets'
 
     id = db.Column(db.Integer, primary_key=True)
-    platform_id = db.Column(db.Integer, db.ForeignKey('platforms.id'), nullable=False)
+    platform_id = db.Column(db.Integer, db.ForeignKey('platforms.id'), nullable=False, index=True)
     target_url = db.Column(db.String(500), nullable=False)
     target_page_title = db.Column(db.String(300))
     our_url = db.Column(db.String(500))
     anchor_text = db.Column(db.String(300))
-    status = db.Column(db.String(50), default='identified',
-                       nullable=False)  # identified, contacted, negotiating, approved, live, rejected
-    priority = db.Column(db.String(20), default='medium')  # low, medium, high
+    status = db.Column(_enum('target_status', TARGET_STATUSES, 50), default='identified',
+                       nullable=False)
+    priority = db.Column(_enum('target_priority', PRIORITIES, 20), default='medium')
     notes = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
                            onupdate=lambda: datetime.now(timezone.utc))
 
     emails = db.relationship('OutreachEmail', backref='target', lazy='dynamic',
                              cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_targets_created_at_id', 'created_at', 'id'),
+        db.Index('ix_targets_status_created_at_id', 'status', 'created_at', 'id'),
+        _trigram_index('ix_targets_target_page_title_trgm', 'target_page_title'),
+        _trigram_index('ix_targets_target_url_trgm', 'target_url'),
+    )
+
     def __repr__(self):
         return f'<Target {self.target_url}>'
 
@@ -100,14 +244,18 @@ class Campaign(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    status = db.Column(db.String(50), default='draft')  # draft, active, paused, completed
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    status = db.Column(_enum('campaign_status', CAMPAIGN_STATUSES, 50), default='draft')
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
                            onupdate=lambda: datetime.now(timezone.utc))
 
     emails = db.relationship('OutreachEmail', backref='campaign', lazy='dynamic',
                              cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_campaigns_created_at_id', 'created_at', 'id'),
+    )
+
     def __repr__(self):
         return f'<Campaign {self.name}>'
 
@@ -119,60 +267,104 @@ class EmailTemplate(db.Model):
     name = db.Column(db.String(200), nullable=False)
     subject = db.Column(db.String(500), nullable=False)
     body_html = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
                            onupdate=lambda: datetime.now(timezone.utc))
 
+    __table_args__ = (
+        db.Index('ix_email_templates_created_at_id', 'created_at', 'id'),
+    )
+
     def render(self, platform):
         """Render template with platform data.
 
         Supported placeholders:
           {{contact_name}}, {{platform_name}}, {{platform_url}},
           {{contact_first_name}}, {{tier}}, {{topic}}
+        plus defaults ({{topic|anything}}) and conditional sections
+        ({{#topic}}...{{/topic}}, {{^topic}}...{{/topic}}).
         """
-        first_name = ''
-        if platform.contact_name:
-            first_name = platform.contact_name.strip().split()[0]
-
-        replacements = {
-            '{{contact_name}}': platform.contact_name or '',
-            '{{contact_first_name}}': first_name,
-            '{{platform_name}}': platform.name or '',
-            '{{platform_url}}': platform.url or '',
-            '{{tier}}': platform.tier or '',
-            '{{topic}}': platform.topic_to_submit or '',
-        }
-        subject = self.subject
-        body = self.body_html
-        for placeholder, value in replacements.items():
-            subject = subject.replace(placeholder, value)
-            body = body.replace(placeholder, value)
-        return subject, body
+        return self.render_many([platform])[0]
+
+    def render_many(self, platforms):
+        """Render for several platforms; returns a list of (subject, body)."""
+        from app.services.template_engine import render_many
+        return render_many(self, platforms)
 
     def __repr__(self):
         return f'<EmailTemplate {self.name}>'
 
 
+class EmailBody(db.Model):
+    """One distinct email body, stored once and shared by every email using it.
+
+    Emails rendered from a template point at the template's body text and
+    keep their placeholder values in ``OutreachEmail.body_context``; see
+    app/services/email_bodies.py.
+    """
+    __tablename__ = 'email_bodies'
+
+    id = db.Column(db.Integer, primary_key=True)
+    hash = db.Column(db.String(64), nullable=False, unique=True)  # SHA-256 of body
+    body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f'<EmailBody {self.hash[:12]}>'
+
+
 class OutreachEmail(db.Model):
     __tablename__ = 'outreach_emails'
 
     id = db.Column(db.Integer, primary_key=True)
-    target_id = db.Column(db.Integer, db.ForeignKey('targets.id'), nullable=True)
-    campaign_id = db.Column(db.Integer, db.ForeignKey('campaigns.id'), nullable=True)
-    platform_id = db.Column(db.Integer, db.ForeignKey('platforms.id'), nullable=True)
-    template_id = db.Column(db.Integer, db.ForeignKey('email_templates.id'), nullable=True)
+    target_id = db.Column(db.Integer, db.ForeignKey('targets.id'), nullable=True, index=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey('campaigns.id'), nullable=True, index=True)
+    platform_id = db.Column(db.Integer, db.ForeignKey('platforms.id'), nullable=True, index=True)
+    template_id = db.Column(db.Integer, db.ForeignKey('email_templates.id'), nullable=True, index=True)
     recipient_email = db.Column(db.String(200), nullable=False)
     subject = db.Column(db.String(500), nullable=False)
-    body = db.Column(db.Text, nullable=False)
-    status = db.Column(db.String(50), default='draft')  # draft, sent, delivered, replied, bounced
+    body_id = db.Column(db.Integer, db.ForeignKey('email_bodies.id'), nullable=False, index=True)
+    # Placeholder values when body_id is a template body; NULL when it is the final text
+    body_context = db.Column(db.JSON(none_as_null=True))
+    status = db.Column(_enum('email_status', EMAIL_STATUSES, 50), default='draft')
+    follow_up_stage = db.Column(db.SmallInteger)         # 1, 2 for follow-ups; NULL for first pitch
     sent_at = db.Column(db.DateTime)
-    gmail_message_id = db.Column(db.String(200))
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    gmail_message_id = db.Column(db.String(200), index=True)
+    gmail_thread_id = db.Column(db.String(200), index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
                            onupdate=lambda: datetime.now(timezone.utc))
 
     platform = db.relationship('Platform', backref=db.backref('outreach_emails', lazy='dynamic'))
     template = db.relationship('EmailTemplate', backref=db.backref('emails', lazy='dynamic'))
+    stored_body = db.relationship('EmailBody')  # loaded on first access to .body
+
+    __table_args__ = (
+        db.Index('ix_outreach_emails_created_at_id', 'created_at', 'id'),
+        db.Index('ix_outreach_emails_status_created_at_id', 'status', 'created_at', 'id'),
+    )
+
+    @property
+    def body(self):
+        """The full body HTML, rebuilt from the stored body and context."""
+        from app.services.email_bodies import materialize
+        # Text set on this instance, readable before the row is flushed
+        assigned = getattr(self, '_assigned_body', None)
+        if assigned and assigned[0] == self.body_id and self.body_context is None:
+            return assigned[1]
+        if self.stored_body is None:
+            return None
+        return materialize(self.stored_body.id, self.stored_body.body, self.body_context)
+
+    @body.setter
+    def body(self, text):
+        from app.services.email_bodies import store
+        # Point at the row by id; loading it here would cost a SELECT per save
+        self.body_id = store([text])[0]
+        self.body_context = None
+        self._assigned_body = (self.body_id, text)
+        if inspect(self).persistent:
+            db.session.expire(self, ['stored_body'])
 
     def __repr__(self):
         return f'<OutreachEmail to={self.recipient_email} status={self.status}>'
@@ -1,39 +1,42 @@
+import hashlib
+from collections import Counter
 from datetime import datetime, timezone
 
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, jsonify
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import joinedload
 
 from app import db
-from app.models import Platform, Target, Campaign, OutreachEmail, EmailTemplate, AppSetting
+from app.models import (Platform, Target, Campaign, OutreachEmail, EmailTemplate, AppSetting,
+                        choice_equals, normalize_domain)
 from app.forms import (PlatformForm, TargetForm, CampaignForm,
-                       OutreachEmailForm, SendEmailForm, UploadPlatformsForm,
+                       OutreachEmailForm, SendEmailForm, UploadPlatformsForm, ConfirmImportForm,
                        EmailTemplateForm, BulkSendForm)
+from app.services import bulk_actions, email_bodies, purge, read_models, stats, typeahead
+from app.services.bulk import chunked
+from app.services.cache import LRUCache
 from app.services.gmail_service import GmailService
+from app.services.pagination import keyset_page, page_args
+from app.services.query_budget import query_budget
+from app.services.response_cache import cached_response
+from app.services.streaming import render_stream
+from app.services.follow_ups import send_follow_up, mark_follow_ups_sent
 
 main_bp = Blueprint('main', __name__)
 
+# Rendered bulk-send previews, keyed on template/platform versions
+_preview_cache = LRUCache(maxsize=1024)
+PREVIEW_MAX_BATCH = 50
+
 
 # ---------------------------------------------------------------------------
 # Dashboard
 # ---------------------------------------------------------------------------
 
 @main_bp.route('/')
+@query_budget(5)
+@cached_response('platforms', 'targets', 'campaigns', 'outreach_emails')
 def dashboard():
-    total_platforms = Platform.query.count()
-    total_targets = Target.query.count()
-    total_campaigns = Campaign.query.count()
-    total_emails = OutreachEmail.query.count()
-
-    targets_by_status = (
-        db.session.query(Target.status, db.func.count(Target.id))
-        .group_by(Target.status)
-        .all()
-    )
-    emails_by_status = (
-        db.session.query(OutreachEmail.status, db.func.count(OutreachEmail.id))
-        .group_by(OutreachEmail.status)
-        .all()
-    )
-
     recent_emails = (
         OutreachEmail.query
         .order_by(OutreachEmail.created_at.desc())
@@ -42,20 +45,16 @@ def dashboard():
     )
     recent_targets = (
         Target.query
+        .options(joinedload(Target.platform))
         .order_by(Target.created_at.desc())
         .limit(10)
         .all()
     )
 
     return render_template('dashboard.html',
-                           total_platforms=total_platforms,
-                           total_targets=total_targets,
-                           total_campaigns=total_campaigns,
-                           total_emails=total_emails,
-                           targets_by_status=dict(targets_by_status),
-                           emails_by_status=dict(emails_by_status),
                            recent_emails=recent_emails,
-                           recent_targets=recent_targets)
+                           recent_targets=recent_targets,
+                           **stats.cached_dashboard_stats())
 
 
 # ---------------------------------------------------------------------------
@@ -63,15 +62,21 @@ def dashboard():
 # ---------------------------------------------------------------------------
 
 @main_bp.route('/platforms')
+@query_budget(4)
+@cached_response('platforms', 'app_settings')
 def platforms_list():
-    platforms = Platform.query.order_by(Platform.created_at.desc()).all()
-    return render_template('platforms/list.html', platforms=platforms)
+    platforms = keyset_page(read_models.platform_list(), Platform, **page_args())
+    job = purge.status()
+    return render_stream('platforms/list.html', platforms=platforms,
+                         total=stats.count('platforms'),
+                         purge_job=job if purge.is_running(job) else None,
+                         bulk_actions=bulk_actions.action_choices('platforms'))
 
 
 @main_bp.route('/platforms/new', methods=['GET', 'POST'])
 def platform_create():
     form = PlatformForm()
-    if form.validate_on_submit():
+    if form.validate_on_submit() and not _domain_taken(form):
         platform = Platform()
         form.populate_obj(platform)
         db.session.add(platform)
@@ -85,7 +90,10 @@ def platform_create():
 def platform_edit(id):
     platform = Platform.query.get_or_404(id)
     form = PlatformForm(obj=platform)
-    if form.validate_on_submit():
+    # The domain is only checked when the URL changes (see Platform._set_domain)
+    url_changed = form.url.data != platform.url
+    if form.validate_on_submit() and not (url_changed
+                                          and _domain_taken(form, exclude_id=platform.id)):
         form.populate_obj(platform)
         db.session.commit()
         flash('Platform updated.', 'success')
@@ -93,6 +101,21 @@ def platform_edit(id):
     return render_template('platforms/form.html', form=form, title='Edit Platform')
 
 
+def _domain_taken(form, exclude_id=None):
+    """Flag the URL field if another platform already uses its domain."""
+    domain = normalize_domain(form.url.data)
+    if not domain:
+        return False
+    query = Platform.query.filter(Platform.domain == domain)
+    if exclude_id is not None:
+        query = query.filter(Platform.id != exclude_id)
+    existing = query.first()
+    if existing is None:
+        return False
+    form.url.errors.append(f'{existing.name} already uses {domain}.')
+    return True
+
+
 @main_bp.route('/platforms/<int:id>/delete', methods=['POST'])
 def platform_delete(id):
     platform = Platform.query.get_or_404(id)
@@ -104,177 +127,258 @@ def platform_delete(id):
 
 @main_bp.route('/platforms/delete-all', methods=['POST'])
 def platform_delete_all():
-    count = Platform.query.count()
-    Platform.query.delete()
-    db.session.commit()
-    flash(f'Deleted all {count} platforms.', 'success')
+    try:
+        job = purge.start_in_background('platforms')
+    except purge.PurgeError as e:
+        flash(str(e), 'warning')
+    else:
+        flash(f'Deleting all {job["total"]["platforms"]} platforms (with their targets and '
+              f'emails) in the background.', 'info')
     return redirect(url_for('main.platforms_list'))
 
 
+@main_bp.route('/purge/status')
+def purge_status():
+    job = purge.status()
+    if job:
+        job['running'] = purge.is_running(job)
+    return jsonify(job=job)
+
+
+def _read_staged_upload(token):
+    """Open a staged upload; returns (rows, headers, col_map) or flashes and returns None."""
+    from app.services.platform_import import (iter_staged_rows, auto_map_columns,
+                                              staged_upload_path)
+
+    path = staged_upload_path(token)
+    if not path:
+        flash('The uploaded file has expired. Please upload it again.', 'warning')
+        return None
+
+    rows = iter_staged_rows(path)
+    try:
+        header = next(rows, None)
+    except Exception as e:
+        rows.close()
+        flash(f'Could not read file: {e}', 'danger')
+        return None
+
+    if not header:
+        rows.close()
+        flash('File is empty or has no data rows.', 'warning')
+        return None
+
+    headers = [h.strip().lower() for h in header]
+    col_map = auto_map_columns(headers)
+
+    if 'name' not in col_map and 'url' not in col_map:
+        rows.close()
+        flash(
+            f'Could not detect a Name or URL column. '
+            f'Found columns: {", ".join(header)}. '
+            f'Please rename at least one column to "Name" or "URL".',
+            'danger',
+        )
+        return None
+    return rows, headers, col_map
+
+
 @main_bp.route('/platforms/upload', methods=['GET', 'POST'])
 def platform_upload():
+    from itertools import islice
+    from app.services.platform_import import stage_upload, discard_staged_upload
+    from app.services.import_profiles import DATE_FORMATS, PROFILE_SAMPLE_ROWS, detect_profile
+
     form = UploadPlatformsForm()
     if form.validate_on_submit():
         file = form.file.data
-        filename = file.filename.lower()
+        token = stage_upload(file, file.filename.lower())
 
-        try:
-            rows = _parse_upload_file(file, filename)
-        except Exception as e:
-            flash(f'Could not read file: {e}', 'danger')
+        opened = _read_staged_upload(token)
+        if opened is None:
+            discard_staged_upload(token)
             return render_template('platforms/upload.html', form=form)
+        rows, headers, col_map = opened
 
-        if not rows:
-            flash('File is empty or has no data rows.', 'warning')
-            return render_template('platforms/upload.html', form=form)
+        profile = detect_profile(headers, col_map, list(islice(rows, PROFILE_SAMPLE_ROWS)))
+        rows.close()
 
-        headers = [h.strip().lower() for h in rows[0]]
-        col_map = _auto_map_columns(headers)
+        confirm_form = ConfirmImportForm(formdata=None, token=token, mode=form.mode.data,
+                                         true_values=', '.join(profile['true_values']))
+        columns = sorted((idx, field) for field, idx in col_map.items())
+        return render_template('platforms/upload_confirm.html', form=confirm_form,
+                               profile=profile, headers=headers, columns=columns,
+                               date_formats=DATE_FORMATS)
 
-        if 'name' not in col_map and 'url' not in col_map:
-            flash(
-                f'Could not detect a Name or URL column. '
-                f'Found columns: {", ".join(rows[0])}. '
-                f'Please rename at least one column to "Name" or "URL".',
-                'danger',
-            )
-            return render_template('platforms/upload.html', form=form)
+    return render_template('platforms/upload.html', form=form)
 
-        imported = 0
-        skipped = []
-        for row_num, row in enumerate(rows[1:], start=2):
-            if len(row) < len(headers):
-                row += [''] * (len(headers) - len(row))
-
-            name = _get_mapped(row, headers, col_map, 'name')
-            url = _get_mapped(row, headers, col_map, 'url')
-
-            if not name and not url:
-                continue  # skip blank rows
-
-            if not name:
-                name = url
-            if not url:
-                skipped.append(f'Row {row_num}: missing URL')
-                continue
-
-            if not url.startswith(('http://', 'https://')):
-                url = 'https://' + url
-
-            platform = Platform(
-                tier=(_get_mapped(row, headers, col_map, 'tier') or '').strip() or None,
-                name=name.strip(),
-                url=url.strip(),
-                submission_type=(_get_mapped(row, headers, col_map, 'submission_type') or '').strip() or None,
-                topic_to_submit=(_get_mapped(row, headers, col_map, 'topic_to_submit') or '').strip() or None,
-                difficulty=(_get_mapped(row, headers, col_map, 'difficulty') or '').strip() or None,
-                contact_name=(_get_mapped(row, headers, col_map, 'contact_name') or '').strip() or None,
-                contact_email=(_get_mapped(row, headers, col_map, 'contact_email') or '').strip() or None,
-                pitch_sent_date=_parse_date(_get_mapped(row, headers, col_map, 'pitch_sent_date')),
-                article_sent_date=_parse_date(_get_mapped(row, headers, col_map, 'article_sent_date')),
-                follow_up_1=_parse_date(_get_mapped(row, headers, col_map, 'follow_up_1')),
-                follow_up_2=_parse_date(_get_mapped(row, headers, col_map, 'follow_up_2')),
-                response_date=_parse_date(_get_mapped(row, headers, col_map, 'response_date')),
-                status=(_get_mapped(row, headers, col_map, 'status') or '').strip() or 'Not Started',
-                notes=(_get_mapped(row, headers, col_map, 'notes') or '').strip() or None,
-                publication_date=_parse_date(_get_mapped(row, headers, col_map, 'publication_date')),
-                live_url=(_get_mapped(row, headers, col_map, 'live_url') or '').strip() or None,
-                backlink_confirmed=_parse_bool(_get_mapped(row, headers, col_map, 'backlink_confirmed')),
-            )
-            db.session.add(platform)
-            imported += 1
 
-        db.session.commit()
+@main_bp.route('/platforms/upload/confirm', methods=['POST'])
+def platform_upload_confirm():
+    from app.services.platform_import import import_platforms, discard_staged_upload
+    from app.services.import_profiles import (DATE_FORMATS, build_parsers, detect_profile,
+                                              save_profile)
+
+    form = ConfirmImportForm()
+    if not form.validate_on_submit():
+        flash('The import could not be confirmed. Please upload the file again.', 'warning')
+        return redirect(url_for('main.platform_upload'))
+
+    token = form.token.data
+    opened = _read_staged_upload(token)
+    if opened is None:
+        discard_staged_upload(token)
+        return redirect(url_for('main.platform_upload'))
+    rows, headers, col_map = opened
+
+    # Start from the detected profile, then apply the user's choices
+    profile = detect_profile(headers, col_map, [])
+    known_formats = {fmt for fmt, _ in DATE_FORMATS}
+    for field_name in profile['date_formats']:
+        chosen = request.form.get(f'date_format_{field_name}', '')
+        profile['date_formats'][field_name] = chosen if chosen in known_formats else ''
+    if profile['true_values']:
+        profile['true_values'] = [v.strip().lower() for v in (form.true_values.data or '').split(',')
+                                  if v.strip()]
 
-        msg = f'Imported {imported} platform{"s" if imported != 1 else ""}.'
-        if skipped:
-            msg += f' Skipped {len(skipped)}: {"; ".join(skipped[:5])}'
-        flash(msg, 'success')
+    try:
+        result = import_platforms(rows, col_map, mode=form.mode.data,
+                                  parsers=build_parsers(profile))
+        save_profile(profile)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Import stopped: {e}', 'danger')
         return redirect(url_for('main.platforms_list'))
+    finally:
+        rows.close()
+        discard_staged_upload(token)
+
+    inserted = result.inserted
+    msg = (f'Imported {inserted} new platform{"s" if inserted != 1 else ""}, '
+           f'updated {result.updated}, {result.unchanged} unchanged.')
+    if result.duplicates:
+        msg += f' {result.duplicates} repeated domains in the file were merged.'
+    if result.skipped:
+        msg += f' Skipped {result.skipped}: {"; ".join(result.errors[:5])}'
+    flash(msg, 'success')
+    return redirect(url_for('main.platforms_list'))
 
-    return render_template('platforms/upload.html', form=form)
 
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+@main_bp.route('/export/<kind>.<fmt>')
+def export(kind, fmt):
+    from flask import Response, abort, stream_with_context
+    from app.services.export import (COLUMNS, FORMATS, export_filename, stream_csv,
+                                     stream_xlsx)
 
-def _parse_upload_file(file, filename):
-    """Parse CSV or Excel file and return list of rows (each row is a list of strings)."""
-    import csv
-    import io
+    if kind not in COLUMNS or fmt not in FORMATS:
+        abort(404)
 
-    if filename.endswith('.csv'):
-        content = file.read().decode('utf-8-sig')
-        reader = csv.reader(io.StringIO(content))
-        return [row for row in reader if any(cell.strip() for cell in row)]
+    filters = request.args.to_dict()
+    if fmt == 'csv':
+        body = stream_with_context(stream_csv(kind, filters))
+        mimetype = 'text/csv; charset=utf-8'
     else:
-        import openpyxl
-        wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
-        ws = wb.active
-        rows = []
-        for row in ws.iter_rows(values_only=True):
-            str_row = [str(cell) if cell is not None else '' for cell in row]
-            if any(cell.strip() for cell in str_row):
-                rows.append(str_row)
-        wb.close()
-        return rows
-
-
-def _auto_map_columns(headers):
-    """Map Platform fields to column indices based on common header names."""
-    mapping = {}
-
-    patterns = {
-        'tier': ['tier'],
-        'name': ['name', 'platform', 'website', 'site', 'site name', 'platform name', 'website name', 'blog'],
-        'url': ['url', 'website url', 'link', 'domain', 'site url', 'platform url', 'web address'],
-        'submission_type': ['submission type', 'submission_type', 'type', 'submit type'],
-        'topic_to_submit': ['topic to submit', 'topic_to_submit', 'topic', 'article topic'],
-        'difficulty': ['difficulty', 'level'],
-        'contact_name': ['contact', 'contact name', 'contact_name', 'person', 'editor', 'author', 'contact/editor'],
-        'contact_email': ['email', 'contact email', 'contact_email', 'e-mail', 'email address'],
-        'pitch_sent_date': ['pitch sent date', 'pitch_sent_date', 'pitch sent', 'pitch date'],
-        'article_sent_date': ['article sent date', 'article_sent_date', 'article sent', 'article date'],
-        'follow_up_1': ['follow-up 1', 'follow_up_1', 'followup 1', 'follow up 1'],
-        'follow_up_2': ['follow-up 2', 'follow_up_2', 'followup 2', 'follow up 2'],
-        'response_date': ['response date', 'response_date', 'response'],
-        'status': ['status'],
-        'notes': ['notes', 'comments', 'note', 'comment', 'remarks'],
-        'publication_date': ['publication date', 'publication_date', 'published date', 'pub date'],
-        'live_url': ['live url', 'live_url', 'published url', 'article url', 'live link'],
-        'backlink_confirmed': ['backlink confirmed', 'backlink_confirmed', 'backlink', 'confirmed'],
-    }
-
-    for field, keywords in patterns.items():
-        for idx, header in enumerate(headers):
-            if header in keywords:
-                mapping[field] = idx
-                break
-
-    return mapping
-
-
-def _get_mapped(row, headers, col_map, field):
-    """Get a value from a row using the column mapping."""
-    idx = col_map.get(field)
-    if idx is not None and idx < len(row):
-        return row[idx]
-    return None
-
-
-def _parse_date(value):
-    """Try to parse a date string from various formats."""
-    if not value or not value.strip():
-        return None
-    from dateutil import parser as dateutil_parser
+        body = stream_with_context(stream_xlsx(kind, filters))
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+    response = Response(body, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={export_filename(kind, fmt)}'
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Bulk actions (list page selections)
+# ---------------------------------------------------------------------------
+
+BULK_LIST_ENDPOINTS = {
+    'platforms': 'main.platforms_list',
+    'targets': 'main.targets_list',
+    'campaigns': 'main.campaigns_list',
+    'emails': 'main.emails_list',
+}
+
+
+@main_bp.route('/bulk/<any(platforms, targets, campaigns, emails):kind>', methods=['POST'])
+def bulk_action(kind):
+    filters = {arg: request.form.get(arg) for arg in bulk_actions.FILTERS[kind]
+               if request.form.get(arg)}
+    back = redirect(url_for(BULK_LIST_ENDPOINTS[kind], **filters))
+
+    if request.form.get('scope') == 'filter':
+        ids = None
+    else:
+        ids = request.form.getlist('ids', type=int)
+        if not ids:
+            flash('Select at least one row.', 'warning')
+            return back
+
+    action = request.form.get('action', '')
     try:
-        return dateutil_parser.parse(value.strip()).date()
-    except (ValueError, TypeError):
-        return None
+        if action == 'delete':
+            affected = bulk_actions.bulk_delete(kind, ids, filters)
+            message = f'Deleted {affected} {kind}.'
+        else:
+            field, sep, value = action.partition(':')
+            if not sep:
+                value = request.form.get('value')
+            affected = bulk_actions.bulk_update(kind, field, value, ids, filters)
+            message = f'Updated {affected} {kind}.'
+    except bulk_actions.BulkActionError as e:
+        db.session.rollback()
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(error=str(e)), 400
+        flash(str(e), 'danger')
+        return back
+
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(action=action, affected=affected)
+    flash(message, 'success')
+    return back
 
 
-def _parse_bool(value):
-    """Parse a boolean from common truthy strings."""
-    if not value:
-        return False
-    return value.strip().lower() in ('yes', 'true', '1', 'y', 'confirmed')
+# ---------------------------------------------------------------------------
+# Typeahead lookups (platform / target pickers)
+# ---------------------------------------------------------------------------
+
+@main_bp.route('/lookup/<any(platforms, targets):kind>')
+@query_budget(1)
+def lookup(kind):
+    limit = current_app.config.get('TYPEAHEAD_LIMIT', 20)
+    limit = min(max(request.args.get('limit', limit, type=int), 1), limit)
+    return jsonify(results=typeahead.search(kind, request.args.get('q', ''), limit))
+
+
+# ---------------------------------------------------------------------------
+# Full-text search
+# ---------------------------------------------------------------------------
+
+SEARCH_LABELS = {'platforms': 'Platforms', 'targets': 'Targets', 'emails': 'Emails'}
+SEARCH_PREVIEW_ROWS = 5
+
+
+@main_bp.route('/search')
+@query_budget(3)
+def search():
+    from app.services import search as fulltext
+
+    q = request.args.get('q', '').strip()
+    kind = request.args.get('kind')
+    if kind not in SEARCH_LABELS:
+        kind = None
+    if kind:
+        page = max(request.args.get('page', 1, type=int), 1)
+        results = {kind: fulltext.search(kind, q, page,
+                                         current_app.config.get('SEARCH_PER_PAGE', 20))}
+    else:
+        # Everything: the best few of each kind, with a link to the rest
+        results = {k: fulltext.search(k, q, 1, SEARCH_PREVIEW_ROWS) for k in SEARCH_LABELS}
+    return render_template('search.html', q=q, current_kind=kind, results=results,
+                           labels=SEARCH_LABELS)
 
 
 # ---------------------------------------------------------------------------
@@ -282,22 +386,33 @@ def _parse_bool(value):
 # ---------------------------------------------------------------------------
 
 @main_bp.route('/targets')
+@query_budget(4)
+@cached_response('targets', 'platforms', 'outreach_emails')
 def targets_list():
     status_filter = request.args.get('status')
-    query = Target.query
+    query = read_models.target_list()
     if status_filter:
-        query = query.filter_by(status=status_filter)
-    targets = query.order_by(Target.created_at.desc()).all()
-    return render_template('targets/list.html', targets=targets,
-                           current_status=status_filter)
+        query = query.where(choice_equals(Target.status, status_filter))
+    targets = keyset_page(query, Target, **page_args())
+    return render_stream('targets/list.html', targets=targets,
+                         email_counts=_email_counts(OutreachEmail.target_id, targets),
+                         current_status=status_filter,
+                         bulk_actions=bulk_actions.action_choices('targets'))
+
+
+def _email_counts(fk_column, parents):
+    """Outreach email count per parent row, from one grouped query."""
+    ids = [parent.id for parent in parents]
+    if not ids:
+        return {}
+    return dict(db.session.execute(
+        select(fk_column, func.count()).where(fk_column.in_(ids)).group_by(fk_column)
+    ).all())
 
 
 @main_bp.route('/targets/new', methods=['GET', 'POST'])
 def target_create():
     form = TargetForm()
-    form.platform_id.choices = [
-        (p.id, p.name) for p in Platform.query.order_by(Platform.name).all()
-    ]
     if form.validate_on_submit():
         target = Target(
             platform_id=form.platform_id.data,
@@ -313,22 +428,21 @@ def target_create():
         db.session.commit()
         flash('Target created.', 'success')
         return redirect(url_for('main.targets_list'))
-    return render_template('targets/form.html', form=form, title='Add Target')
+    return render_template('targets/form.html', form=form, title='Add Target',
+                           platform_label=typeahead.label('platforms', form.platform_id.data))
 
 
 @main_bp.route('/targets/<int:id>/edit', methods=['GET', 'POST'])
 def target_edit(id):
     target = Target.query.get_or_404(id)
     form = TargetForm(obj=target)
-    form.platform_id.choices = [
-        (p.id, p.name) for p in Platform.query.order_by(Platform.name).all()
-    ]
     if form.validate_on_submit():
         form.populate_obj(target)
         db.session.commit()
         flash('Target updated.', 'success')
         return redirect(url_for('main.targets_list'))
-    return render_template('targets/form.html', form=form, title='Edit Target')
+    return render_template('targets/form.html', form=form, title='Edit Target',
+                           platform_label=typeahead.label('platforms', form.platform_id.data))
 
 
 @main_bp.route('/targets/<int:id>/delete', methods=['POST'])
@@ -345,9 +459,13 @@ def target_delete(id):
 # ---------------------------------------------------------------------------
 
 @main_bp.route('/campaigns')
+@query_budget(4)
+@cached_response('campaigns', 'outreach_emails')
 def campaigns_list():
-    campaigns = Campaign.query.order_by(Campaign.created_at.desc()).all()
-    return render_template('campaigns/list.html', campaigns=campaigns)
+    campaigns = keyset_page(read_models.campaign_list(), Campaign, **page_args())
+    return render_stream('campaigns/list.html', campaigns=campaigns,
+                         email_counts=_email_counts(OutreachEmail.campaign_id, campaigns),
+                         bulk_actions=bulk_actions.action_choices('campaigns'))
 
 
 @main_bp.route('/campaigns/new', methods=['GET', 'POST'])
@@ -392,30 +510,30 @@ def campaign_delete(id):
 # ---------------------------------------------------------------------------
 
 @main_bp.route('/emails')
+@query_budget(4)
+@cached_response('outreach_emails', 'targets', 'platforms', 'campaigns')
 def emails_list():
     status_filter = request.args.get('status')
-    query = OutreachEmail.query
+    query = read_models.email_list()
     if status_filter:
-        query = query.filter_by(status=status_filter)
-    emails = query.order_by(OutreachEmail.created_at.desc()).all()
-    return render_template('emails/list.html', emails=emails,
-                           current_status=status_filter)
+        query = query.where(choice_equals(OutreachEmail.status, status_filter))
+    emails = keyset_page(query, OutreachEmail, **page_args())
+    return render_stream('emails/list.html', emails=emails,
+                         current_status=status_filter,
+                         bulk_actions=bulk_actions.action_choices('emails'))
 
 
 @main_bp.route('/emails/new', methods=['GET', 'POST'])
+@query_budget(7)
 def email_create():
     form = OutreachEmailForm()
-    form.target_id.choices = [
-        (t.id, f'{t.target_page_title or t.target_url} ({t.platform.name})')
-        for t in Target.query.order_by(Target.created_at.desc()).all()
-    ]
     form.campaign_id.choices = [(0, '-- No Campaign --')] + [
         (c.id, c.name) for c in Campaign.query.order_by(Campaign.name).all()
     ]
 
     # Pre-fill recipient from target's platform contact
-    if request.method == 'GET' and request.args.get('target_id'):
-        target = Target.query.get(request.args.get('target_id'))
+    if request.method == 'GET' and request.args.get('target_id', type=int):
+        target = db.session.get(Target, request.args.get('target_id', type=int))
         if target and target.platform.contact_email:
             form.recipient_email.data = target.platform.contact_email
             form.target_id.data = target.id
@@ -432,10 +550,12 @@ def email_create():
         db.session.commit()
         flash('Email draft saved.', 'success')
         return redirect(url_for('main.emails_list'))
-    return render_template('emails/form.html', form=form, title='Compose Email')
+    return render_template('emails/form.html', form=form, title='Compose Email',
+                           target_label=typeahead.label('targets', form.target_id.data))
 
 
 @main_bp.route('/emails/<int:id>/edit', methods=['GET', 'POST'])
+@query_budget(9)
 def email_edit(id):
     email = OutreachEmail.query.get_or_404(id)
     if email.status == 'sent':
@@ -443,10 +563,6 @@ def email_edit(id):
         return redirect(url_for('main.emails_list'))
 
     form = OutreachEmailForm(obj=email)
-    form.target_id.choices = [
-        (t.id, f'{t.target_page_title or t.target_url} ({t.platform.name})')
-        for t in Target.query.order_by(Target.created_at.desc()).all()
-    ]
     form.campaign_id.choices = [(0, '-- No Campaign --')] + [
         (c.id, c.name) for c in Campaign.query.order_by(Campaign.name).all()
     ]
@@ -462,7 +578,8 @@ def email_edit(id):
         db.session.commit()
         flash('Email draft updated.', 'success')
         return redirect(url_for('main.emails_list'))
-    return render_template('emails/form.html', form=form, title='Edit Email')
+    return render_template('emails/form.html', form=form, title='Edit Email',
+                           target_label=typeahead.label('targets', form.target_id.data))
 
 
 @main_bp.route('/emails/<int:id>/send', methods=['POST'])
@@ -472,17 +589,16 @@ def email_send(id):
         flash('Email already sent.', 'warning')
         return redirect(url_for('main.emails_list'))
 
-    gmail = GmailService(
-        credentials_file=current_app.config.get('GMAIL_CREDENTIALS_FILE'),
-        token_file=current_app.config.get('GMAIL_TOKEN_FILE'),
-        sender_email=current_app.config.get('GMAIL_SENDER_EMAIL'),
-    )
+    gmail = GmailService.from_config(current_app.config)
 
-    result = gmail.send_email(
-        to=email.recipient_email,
-        subject=email.subject,
-        body_html=email.body,
-    )
+    if email.follow_up_stage:
+        result = send_follow_up(gmail, email)
+    else:
+        result = gmail.send_email(
+            to=email.recipient_email,
+            subject=email.subject,
+            body_html=email.body,
+        )
 
     if 'error' in result:
         flash(f'Failed to send: {result["error"]}', 'danger')
@@ -490,15 +606,38 @@ def email_send(id):
         email.status = 'sent'
         email.sent_at = datetime.now(timezone.utc)
         email.gmail_message_id = result.get('id')
+        email.gmail_thread_id = result.get('thread_id') or email.gmail_thread_id
         # Also update the target status to contacted if it was just identified
-        if email.target.status == 'identified':
+        if email.target and email.target.status == 'identified':
             email.target.status = 'contacted'
+        if email.follow_up_stage and email.platform_id:
+            mark_follow_ups_sent({email.follow_up_stage: [email.platform_id]})
         db.session.commit()
         flash('Email sent successfully!', 'success')
 
     return redirect(url_for('main.emails_list'))
 
 
+@main_bp.route('/emails/sync-replies', methods=['POST'])
+def emails_sync_replies():
+    from app.services.reply_sync import sync_replies
+
+    gmail = GmailService.from_config(current_app.config)
+    try:
+        result = sync_replies(gmail)
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Reply sync failed: {e}', 'danger')
+        return redirect(url_for('main.emails_list'))
+
+    if result.reset:
+        flash('Reply sync started — replies from now on will be picked up.', 'info')
+    else:
+        flash(f'Checked {result.messages_seen} new messages — '
+              f'{result.replied} replied, {result.bounced} bounced.', 'success')
+    return redirect(url_for('main.emails_list'))
+
+
 @main_bp.route('/emails/<int:id>/delete', methods=['POST'])
 def email_delete(id):
     email = OutreachEmail.query.get_or_404(id)
@@ -513,9 +652,11 @@ def email_delete(id):
 # ---------------------------------------------------------------------------
 
 @main_bp.route('/templates')
+@query_budget(3)
+@cached_response('email_templates')
 def templates_list():
-    templates = EmailTemplate.query.order_by(EmailTemplate.created_at.desc()).all()
-    return render_template('templates/list.html', templates=templates)
+    templates = keyset_page(read_models.template_list(), EmailTemplate, **page_args())
+    return render_stream('templates/list.html', templates=templates)
 
 
 @main_bp.route('/templates/new', methods=['GET', 'POST'])
@@ -623,86 +764,158 @@ def bulk_send():
         (c.id, c.name) for c in Campaign.query.order_by(Campaign.name).all()
     ]
 
-    # Platforms that have a contact email
-    platforms = Platform.query.filter(
-        Platform.contact_email.isnot(None),
-        Platform.contact_email != '',
-    ).order_by(Platform.name).all()
-
     if request.method == 'POST' and form.validate_on_submit():
         selected_ids = request.form.getlist('platform_ids', type=int)
         if not selected_ids:
             flash('Select at least one platform to send to.', 'warning')
-            return render_template('bulk_send/form.html', form=form, platforms=platforms)
+            return render_template('bulk_send/form.html', form=form,
+                                   platforms=_bulk_send_platforms(),
+                                   preview_max_batch=PREVIEW_MAX_BATCH)
 
         template = EmailTemplate.query.get_or_404(form.template_id.data)
         campaign_id = form.campaign_id.data if form.campaign_id.data != 0 else None
 
-        gmail = GmailService(
-            credentials_file=current_app.config.get('GMAIL_CREDENTIALS_FILE'),
-            token_file=current_app.config.get('GMAIL_TOKEN_FILE'),
-            sender_email=current_app.config.get('GMAIL_SENDER_EMAIL'),
-        )
+        gmail = GmailService.from_config(current_app.config)
 
         sent = 0
         errors = 0
-        for pid in selected_ids:
-            platform = Platform.query.get(pid)
-            if not platform or not platform.contact_email:
-                continue
+        chunk_size = current_app.config.get('BULK_SEND_CHUNK_SIZE', 200)
+        for chunk_ids in chunked(dict.fromkeys(selected_ids), chunk_size):
+            # One IN query per chunk; plain rows, nothing tracked by the session
+            chunk = db.session.execute(
+                read_models.render_rows()
+                .where(Platform.id.in_(chunk_ids),
+                       Platform.contact_email.isnot(None),
+                       Platform.contact_email != '')
+            ).all()
+
+            records = []
+            sent_ids = []
+            # Each email stores the template's body once plus its placeholder values
+            stored = email_bodies.store_rendered(template, chunk)
+            for platform, (subject, body), (body_id, body_context) in zip(
+                    chunk, template.render_many(chunk), stored):
+                result = gmail.send_email(
+                    to=platform.contact_email,
+                    subject=subject,
+                    body_html=body,
+                )
+
+                record = {
+                    'platform_id': platform.id,
+                    'template_id': template.id,
+                    'campaign_id': campaign_id,
+                    'recipient_email': platform.contact_email,
+                    'subject': subject,
+                    'body_id': body_id,
+                    'body_context': body_context,
+                    'status': 'bounced',
+                    'sent_at': None,
+                    'gmail_message_id': None,
+                    'gmail_thread_id': None,
+                }
+                if 'error' in result:
+                    errors += 1
+                else:
+                    record.update(
+                        status='sent',
+                        sent_at=datetime.now(timezone.utc),
+                        gmail_message_id=result.get('id'),
+                        gmail_thread_id=result.get('thread_id'),
+                    )
+                    sent_ids.append(platform.id)
+                    sent += 1
+                records.append(record)
+
+            if records:
+                db.session.execute(insert(OutreachEmail), records)
+                by_status = Counter(r['status'] for r in records)
+                stats.adjust({'outreach_emails': len(records),
+                              **{stats.status_key('outreach_emails', s): n
+                                 for s, n in by_status.items()}})
+            if sent_ids:
+                now = datetime.now(timezone.utc)
+                db.session.execute(
+                    update(Platform)
+                    .where(Platform.id.in_(sent_ids))
+                    .values(status='Pitch Sent', pitch_sent_date=now.date(), updated_at=now)
+                )
+            # Commit per chunk so a long send never holds one huge transaction
+            db.session.commit()
 
-            subject, body = template.render(platform)
-
-            result = gmail.send_email(
-                to=platform.contact_email,
-                subject=subject,
-                body_html=body,
-            )
-
-            email_record = OutreachEmail(
-                platform_id=platform.id,
-                template_id=template.id,
-                campaign_id=campaign_id,
-                recipient_email=platform.contact_email,
-                subject=subject,
-                body=body,
-            )
-
-            if 'error' in result:
-                email_record.status = 'bounced'
-                errors += 1
-            else:
-                email_record.status = 'sent'
-                email_record.sent_at = datetime.now(timezone.utc)
-                email_record.gmail_message_id = result.get('id')
-                platform.status = 'Pitch Sent'
-                platform.pitch_sent_date = datetime.now(timezone.utc).date()
-                sent += 1
-
-            db.session.add(email_record)
-
-        db.session.commit()
         flash(f'Sent {sent} emails ({errors} failed).', 'success' if sent else 'danger')
         return redirect(url_for('main.emails_list'))
 
-    return render_template('bulk_send/form.html', form=form, platforms=platforms)
+    return render_template('bulk_send/form.html', form=form,
+                           platforms=_bulk_send_platforms(),
+                           preview_max_batch=PREVIEW_MAX_BATCH)
+
 
+def _bulk_send_platforms():
+    """Platforms that have a contact email (plain rows)."""
+    return db.session.execute(read_models.bulk_send_recipients()).all()
 
-@main_bp.route('/bulk-send/preview', methods=['POST'])
+
+@main_bp.route('/bulk-send/preview', methods=['GET', 'POST'])
 def bulk_send_preview():
-    """AJAX endpoint: render a template for a specific platform (live preview)."""
-    template_id = request.form.get('template_id', type=int)
-    platform_id = request.form.get('platform_id', type=int)
-    if not template_id or not platform_id:
-        return jsonify({'subject': '', 'body': ''})
-
-    template = EmailTemplate.query.get(template_id)
-    platform = Platform.query.get(platform_id)
-    if not template or not platform:
-        return jsonify({'subject': '', 'body': ''})
-
-    subject, body = template.render(platform)
-    return jsonify({'subject': subject, 'body': body})
+    """AJAX endpoint: render a template for one or more platforms (live preview).
+
+    Pass ``platform_id`` for a single preview or repeat ``platform_ids`` for a
+    batch. Responses carry an ETag built from the template's and platforms'
+    ``updated_at`` so the browser can revalidate with If-None-Match, and
+    rendered output is kept in a bounded LRU keyed on the same versions.
+    """
+    template_id = request.values.get('template_id', type=int)
+    batch = 'platform_ids' in request.values
+    if batch:
+        platform_ids = request.values.getlist('platform_ids', type=int)
+        platform_ids = list(dict.fromkeys(platform_ids))[:PREVIEW_MAX_BATCH]
+    else:
+        platform_id = request.values.get('platform_id', type=int)
+        platform_ids = [platform_id] if platform_id else []
+    empty = {'previews': {}} if batch else {'subject': '', 'body': ''}
+    if not template_id or not platform_ids:
+        return jsonify(empty)
+
+    template_version = db.session.execute(
+        select(EmailTemplate.updated_at).where(EmailTemplate.id == template_id)
+    ).first()
+    versions = dict(db.session.execute(
+        select(Platform.id, Platform.updated_at).where(Platform.id.in_(platform_ids))
+    ).all())
+    if template_version is None or not versions:
+        return jsonify(empty)
+
+    etag_source = f'{template_id}:{template_version[0]}|' + ','.join(
+        f'{pid}:{versions[pid]}' for pid in sorted(versions))
+    etag = hashlib.sha1(etag_source.encode()).hexdigest()
+    # Weak comparison: compression hands out a weak form of the ETag
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        keys = {pid: (template_id, template_version[0], pid, versions[pid]) for pid in versions}
+        previews = {pid: _preview_cache.get(key) for pid, key in keys.items()}
+        missing = [pid for pid, preview in previews.items() if preview is None]
+        if missing:
+            template = db.session.get(EmailTemplate, template_id)
+            platforms = db.session.execute(
+                read_models.render_rows().where(Platform.id.in_(missing))).all()
+            for platform, rendered in zip(platforms, template.render_many(platforms)):
+                previews[platform.id] = rendered
+                _preview_cache.set(keys[platform.id], rendered)
+
+        if batch:
+            response = jsonify({'previews': {
+                pid: {'subject': subject, 'body': body}
+                for pid, (subject, body) in previews.items() if pid in versions
+            }})
+        else:
+            subject, body = previews[platform_ids[0]]
+            response = jsonify({'subject': subject, 'body': body})
+
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 # ---------------------------------------------------------------------------
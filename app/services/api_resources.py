@@ -0,0 +1,421 @@
+"""
+Resource definitions, serialization and bulk writes for the JSON API.
+
+Reads are column-projected selects of just the requested fields. Bulk
+creates and updates validate every record first (types, lengths, allowed
+values, referenced rows and platform domains, each checked with one
+set-based query per batch), then write the whole batch in one transaction
+as executemany INSERT/UPDATE statements of API_WRITE_CHUNK rows. Stat
+counters are adjusted the way the other bulk paths do.
+
+An email's ``body`` reads and writes as plain text; its storage columns
+(``body_id``, ``body_context``) are not exposed.
+"""
+import hashlib
+import secrets
+from collections import Counter, defaultdict
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import (Boolean, Date, DateTime, Enum, Integer, SmallInteger, String, insert,
+                        select, update)
+
+from app import db
+from app.models import (AppSetting, Campaign, EmailBody, EmailTemplate, OutreachEmail, Platform,
+                        Target, normalize_domain)
+from app.services import email_bodies, stats
+from app.services.bulk import chunked
+from app.services.bulk_actions import SETTABLE
+
+# resource -> (model, bulk_actions kind whose value lists apply, filterable fields)
+RESOURCES = {
+    'platforms': (Platform, 'platforms', ('tier', 'status', 'domain', 'difficulty',
+                                          'submission_type', 'contact_email')),
+    'targets': (Target, 'targets', ('platform_id', 'status', 'priority')),
+    'campaigns': (Campaign, 'campaigns', ('status',)),
+    'emails': (OutreachEmail, 'emails', ('target_id', 'campaign_id', 'platform_id',
+                                         'template_id', 'status', 'follow_up_stage',
+                                         'gmail_thread_id')),
+    'templates': (EmailTemplate, None, ('name',)),
+}
+
+# Set by the server, never by clients
+READ_ONLY = frozenset({'id', 'created_at', 'updated_at', 'domain'})
+
+# Storage behind OutreachEmail.body, which clients see instead
+HIDDEN = frozenset({'body_id', 'body_context'})
+
+# Columns whose value must name an existing row
+REFERENCES = {
+    'platform_id': Platform,
+    'target_id': Target,
+    'campaign_id': Campaign,
+    'template_id': EmailTemplate,
+}
+
+TOKEN_PREFIX = 'API_TOKEN.'
+
+
+class ApiError(Exception):
+    """An error reported to the client as JSON with ``status``."""
+
+    def __init__(self, message: str, status: int = 400, errors: Optional[list] = None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.errors = errors or []
+
+
+# ---------------------------------------------------------------------------
+# Tokens
+# ---------------------------------------------------------------------------
+
+def _token_key(token: str) -> str:
+    return TOKEN_PREFIX + hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_token(name: str) -> str:
+    """Issue a new token labelled ``name``; only its hash is stored (caller commits)."""
+    token = secrets.token_urlsafe(32)
+    AppSetting.set(_token_key(token), name)
+    return token
+
+
+def token_name(token: str) -> Optional[str]:
+    """The label of a valid token, or None."""
+    if not token:
+        return None
+    row = db.session.get(AppSetting, _token_key(token))
+    return row.value if row else None
+
+
+def list_tokens() -> List[Tuple[str, str]]:
+    """``[(hash prefix, name)]`` of every issued token."""
+    rows = db.session.execute(
+        select(AppSetting.key, AppSetting.value).where(AppSetting.key.startswith(TOKEN_PREFIX))
+    ).all()
+    return [(key[len(TOKEN_PREFIX):][:12], name) for key, name in rows]
+
+
+def revoke_tokens(name: str) -> int:
+    """Revoke every token labelled ``name`` (caller commits)."""
+    rows = AppSetting.query.filter(AppSetting.key.startswith(TOKEN_PREFIX),
+                                   AppSetting.value == name).all()
+    for row in rows:
+        db.session.delete(row)
+    return len(rows)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def resource(name: str):
+    if name not in RESOURCES:
+        raise ApiError(f'Unknown resource {name!r}.', 404)
+    return RESOURCES[name]
+
+
+def columns(model) -> Dict[str, object]:
+    cols = {c.key: c for c in model.__table__.columns if c.key not in HIDDEN}
+    if model is OutreachEmail:
+        cols['body'] = EmailBody.__table__.c.body
+    return cols
+
+
+def select_columns(model, fields: Iterable[str]) -> list:
+    """What to SELECT for ``fields``; an email body brings what rendering it needs."""
+    available = columns(model)
+    selected = []
+    for field in fields:
+        if model is OutreachEmail and field == 'body':
+            selected += [
+                select(EmailBody.body).where(EmailBody.id == OutreachEmail.body_id)
+                .scalar_subquery().label('body'),
+                OutreachEmail.body_id, OutreachEmail.body_context,
+            ]
+        else:
+            selected.append(available[field])
+    return selected
+
+
+def select_fields(model, fields: Optional[str]) -> List[str]:
+    """The requested sparse fieldset (always including ``id``), or every column."""
+    available = columns(model)
+    if not fields:
+        return list(available)
+    wanted = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [f for f in wanted if f not in available]
+    if unknown:
+        raise ApiError(f'Unknown fields: {", ".join(unknown)}.', 400)
+    return ['id'] + [f for f in dict.fromkeys(wanted) if f != 'id']
+
+
+def list_query(model, fields: List[str], filters: Dict[str, str], filterable: Iterable[str]):
+    """Column-projected SELECT with exact-match filters and ``updated_since``."""
+    table_columns = columns(model)
+    # created_at is needed for the keyset cursor even if not requested
+    stmt = select(*select_columns(model, dict.fromkeys(fields + ['created_at'])))
+    for field in filterable:
+        if field in filters:
+            stmt = stmt.where(table_columns[field] == _filter_value(table_columns[field],
+                                                                   field, filters[field]))
+    if filters.get('updated_since'):
+        since = _filter_value(model.__table__.c.updated_at, 'updated_since',
+                              filters['updated_since'])
+        stmt = stmt.where(model.updated_at >= since)
+    return stmt
+
+
+def _filter_value(column, name: str, value):
+    try:
+        return _convert(column, value)
+    except ValueError as e:
+        raise ApiError(f'{name} {e}.', 400)
+
+
+def serialize(row, fields: List[str]) -> dict:
+    out = {}
+    for field in fields:
+        value = getattr(row, field)
+        if field == 'body' and 'body_context' in row._fields:
+            value = email_bodies.materialize(row.body_id, value, row.body_context)
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        out[field] = value
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Validation
+# ---------------------------------------------------------------------------
+
+def _convert(column, value):
+    """Coerce a JSON value to ``column``'s type; raises ValueError."""
+    if value is None:
+        if not column.nullable:
+            raise ValueError('may not be null')
+        return None
+    kind = column.type
+    if isinstance(kind, Boolean):
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.lower() in ('true', 'false', '1', '0'):
+            return value.lower() in ('true', '1')
+        raise ValueError('must be a boolean')
+    if isinstance(kind, (Integer, SmallInteger)):
+        if isinstance(value, bool) or not str(value).lstrip('-').isdigit():
+            raise ValueError('must be an integer')
+        return int(value)
+    if isinstance(kind, DateTime):
+        try:
+            parsed = datetime.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError('must be an ISO 8601 date-time')
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    if isinstance(kind, Date):
+        try:
+            return date.fromisoformat(str(value))
+        except ValueError:
+            raise ValueError('must be an ISO 8601 date')
+    if not isinstance(value, str):
+        raise ValueError('must be a string')
+    if isinstance(kind, Enum) and value not in kind.enums:
+        raise ValueError(f'must be one of {", ".join(kind.enums)}')
+    if isinstance(kind, String) and kind.length and len(value) > kind.length:
+        raise ValueError(f'is longer than {kind.length} characters')
+    return value
+
+
+def _clean(name: str, index: int, record, partial: bool, errors: list) -> dict:
+    model, kind, _ = RESOURCES[name]
+    if not isinstance(record, dict):
+        errors.append({'index': index, 'field': None, 'message': 'must be an object'})
+        return {}
+    table_columns = columns(model)
+    allowed_values = SETTABLE.get(kind, {}) if kind else {}
+    clean = {}
+    for field, value in record.items():
+        if field == 'id' and partial:
+            continue
+        if field not in table_columns or field in READ_ONLY:
+            errors.append({'index': index, 'field': field, 'message': 'is not writable'})
+            continue
+        try:
+            value = _convert(table_columns[field], value)
+        except (TypeError, ValueError) as e:
+            errors.append({'index': index, 'field': field, 'message': str(e)})
+            continue
+        choices = allowed_values.get(field)
+        if isinstance(choices, list) and value is not None and value not in choices:
+            errors.append({'index': index, 'field': field,
+                           'message': f'must be one of {", ".join(choices)}'})
+            continue
+        clean[field] = value
+
+    if not partial:
+        for field, column in table_columns.items():
+            if (field not in READ_ONLY and not column.nullable and column.default is None
+                    and clean.get(field) in (None, '')):
+                errors.append({'index': index, 'field': field, 'message': 'is required'})
+    if model is Platform and 'url' in clean:
+        clean['domain'] = normalize_domain(clean['url'])
+    return clean
+
+
+def _check_references(records: List[dict], errors: list) -> None:
+    """One query per referenced table for every ID the batch mentions."""
+    for field, target in REFERENCES.items():
+        wanted = {r[field] for r in records if r.get(field) is not None}
+        if not wanted:
+            continue
+        found = set()
+        for chunk in chunked(sorted(wanted), 1000):
+            found.update(db.session.scalars(select(target.id).where(target.id.in_(chunk))))
+        for index, record in enumerate(records):
+            if record.get(field) is not None and record[field] not in found:
+                errors.append({'index': index, 'field': field,
+                               'message': f'no {target.__name__} with id {record[field]}'})
+
+
+def _check_domains(records: List[dict], ids: List[Optional[int]], errors: list) -> None:
+    """Platform domains must be unique, within the batch and against the table."""
+    seen = {}
+    for index, record in enumerate(records):
+        domain = record.get('domain')
+        if domain is None:
+            continue
+        if domain in seen:
+            errors.append({'index': index, 'field': 'url',
+                           'message': f'same domain as record {seen[domain]}'})
+        seen[domain] = index
+    if not seen:
+        return
+    taken = {}
+    for chunk in chunked(sorted(seen), 1000):
+        taken.update(db.session.execute(
+            select(Platform.domain, Platform.id).where(Platform.domain.in_(chunk))).all())
+    for domain, index in seen.items():
+        if domain in taken and taken[domain] != ids[index]:
+            errors.append({'index': index, 'field': 'url',
+                           'message': f'platform {taken[domain]} already has domain {domain}'})
+
+
+def _validate(name: str, payload, partial: bool) -> Tuple[List[dict], List[Optional[int]]]:
+    if not isinstance(payload, list) or not payload:
+        raise ApiError('Send a non-empty JSON array of records.', 400)
+    limit = current_app.config.get('API_MAX_BATCH', 5000)
+    if len(payload) > limit:
+        raise ApiError(f'At most {limit} records per request.', 413)
+
+    errors = []
+    records = [_clean(name, i, r, partial, errors) for i, r in enumerate(payload)]
+    ids: List[Optional[int]] = [None] * len(records)
+    if partial:
+        for index, record in enumerate(payload):
+            raw = record.get('id') if isinstance(record, dict) else None
+            if not isinstance(raw, int) or isinstance(raw, bool):
+                errors.append({'index': index, 'field': 'id', 'message': 'is required'})
+            else:
+                ids[index] = raw
+        if len(set(filter(None, ids))) != len(list(filter(None, ids))):
+            errors.append({'index': None, 'field': 'id', 'message': 'ids must be unique'})
+    if not errors:
+        _check_references(records, errors)
+        if RESOURCES[name][0] is Platform:
+            _check_domains(records, ids, errors)
+    if errors:
+        raise ApiError('Validation failed; nothing was written.', 422,
+                       sorted(errors, key=lambda e: (e['index'] is None, e['index'] or 0)))
+    return records, ids
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def _fill(model, records: List[dict]) -> None:
+    """Give every record the same keys (executemany needs them), using column defaults."""
+    keys = set().union(*records)
+    defaults = {}
+    for column in model.__table__.columns:
+        default = column.default
+        if column.key not in READ_ONLY and default is not None and default.is_scalar:
+            defaults[column.key] = default.arg
+    for key in keys | set(defaults):
+        for record in records:
+            record.setdefault(key, defaults.get(key))
+
+
+def _store_bodies(model, records: List[dict]) -> None:
+    """Replace each email record's ``body`` text with a stored body reference."""
+    if model is not OutreachEmail:
+        return
+    with_body = [r for r in records if 'body' in r]
+    body_ids = email_bodies.store([r.pop('body') for r in with_body])
+    for record, body_id in zip(with_body, body_ids):
+        record.update(body_id=body_id, body_context=None)
+
+
+def bulk_create(name: str, payload) -> List[int]:
+    """Insert every record (all or nothing); returns the new IDs in order."""
+    model = RESOURCES[name][0]
+    records, _ = _validate(name, payload, partial=False)
+    _store_bodies(model, records)
+    _fill(model, records)
+    now = datetime.now(timezone.utc)
+    for record in records:
+        record.update(created_at=now, updated_at=now)
+
+    size = current_app.config.get('API_WRITE_CHUNK', 1000)
+    new_ids = []
+    for chunk in chunked(records, size):
+        new_ids.extend(db.session.scalars(
+            insert(model).returning(model.id, sort_by_parameter_order=True), chunk))
+
+    if model in stats.TRACKED:
+        table = model.__tablename__
+        deltas = Counter({table: len(records)})
+        if stats.TRACKED[model]:
+            for record in records:
+                deltas[stats.status_key(table, record.get('status'))] += 1
+        stats.adjust(deltas)
+    db.session.commit()
+    return new_ids
+
+
+def bulk_update(name: str, payload) -> int:
+    """Apply each record's fields to the row with its ``id`` (all or nothing)."""
+    model = RESOURCES[name][0]
+    records, ids = _validate(name, payload, partial=True)
+
+    existing = {}
+    tracked = stats.TRACKED.get(model)
+    for chunk in chunked(ids, 1000):
+        existing.update(db.session.execute(
+            select(model.id, getattr(model, tracked) if tracked else model.id)
+            .where(model.id.in_(chunk))).all())
+    missing = [{'index': i, 'field': 'id', 'message': f'no {model.__name__} with id {row_id}'}
+               for i, row_id in enumerate(ids) if row_id not in existing]
+    if missing:
+        raise ApiError('Validation failed; nothing was written.', 422, missing)
+    _store_bodies(model, records)
+
+    now = datetime.now(timezone.utc)
+    deltas = Counter()
+    # executemany needs the same columns in every row: group records by shape
+    groups = defaultdict(list)
+    for row_id, record in zip(ids, records):
+        if tracked and 'status' in record and record['status'] != existing[row_id]:
+            deltas[stats.status_key(model.__tablename__, existing[row_id])] -= 1
+            deltas[stats.status_key(model.__tablename__, record['status'])] += 1
+        groups[tuple(sorted(record))].append({**record, 'id': row_id, 'updated_at': now})
+
+    size = current_app.config.get('API_WRITE_CHUNK', 1000)
+    for rows in groups.values():
+        for chunk in chunked(rows, size):
+            db.session.execute(update(model), chunk)
+    stats.adjust(deltas)
+    db.session.commit()
+    return len(records)
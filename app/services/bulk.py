@@ -0,0 +1,26 @@
+"""Helpers for chunked, set-based database writes."""
+from itertools import islice
+
+from app import db
+
+
+def chunked(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``."""
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def dialect_insert(model):
+    """INSERT construct for the session's dialect, with ON CONFLICT support."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f'ON CONFLICT upserts are not supported on {dialect}')
+    return insert(model)
@@ -0,0 +1,214 @@
+"""
+Bulk actions on many rows at once: set a field, reassign, or delete.
+
+A selection is either a list of IDs or "everything matching these
+filters" (the list page's filters). It is processed in ID order, a chunk
+of BULK_ACTION_CHUNK_SIZE rows at a time, with one set-based UPDATE or
+DELETE per chunk and a commit after each, so a large selection never
+holds locks for long. Updates stamp ``updated_at``; deletes remove
+dependent rows first, matching the ORM cascades of a single-row delete.
+Stat counters are adjusted in the same transaction as each chunk.
+"""
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from flask import current_app
+from sqlalchemy import delete, select, update
+
+from app import db
+from app.models import (CAMPAIGN_STATUSES, EMAIL_STATUSES, PLATFORM_STATUSES, PRIORITIES,
+                        TARGET_STATUSES, TIERS, Campaign, OutreachEmail, Platform, Target,
+                        choice_equals)
+from app.services import stats
+from app.services.bulk import chunked
+from app.services.export import FILTERS as EXPORT_FILTERS
+
+logger = logging.getLogger(__name__)
+
+MODELS = {
+    'platforms': Platform,
+    'targets': Target,
+    'campaigns': Campaign,
+    'emails': OutreachEmail,
+}
+
+FILTERS = {**EXPORT_FILTERS, 'campaigns': {'status': Campaign.status}}
+
+# kind -> field -> allowed values, or the model a reassigned ID must exist in
+SETTABLE = {
+    'platforms': {'status': list(PLATFORM_STATUSES), 'tier': list(TIERS)},
+    'targets': {'status': list(TARGET_STATUSES), 'priority': list(PRIORITIES),
+                'platform_id': Platform},
+    'campaigns': {'status': list(CAMPAIGN_STATUSES)},
+    'emails': {'status': list(EMAIL_STATUSES), 'campaign_id': Campaign},
+}
+
+
+class BulkActionError(ValueError):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Selection
+# ---------------------------------------------------------------------------
+
+def _chunk_size() -> int:
+    return current_app.config.get('BULK_ACTION_CHUNK_SIZE', 500)
+
+
+def iter_id_chunks(kind: str, ids: Optional[Iterable[int]] = None,
+                   filters: Optional[Dict[str, str]] = None) -> Iterator[List[int]]:
+    """Yield the selected IDs in ascending chunks.
+
+    With ``ids`` the chunks are taken straight from the list; otherwise
+    every row matching ``filters`` is selected, paging through the table
+    by ID so each chunk is a bounded index range scan.
+    """
+    model = MODELS[kind]
+    size = _chunk_size()
+    if ids is not None:
+        yield from chunked(sorted(set(ids)), size)
+        return
+
+    criteria = [choice_equals(column, filters[arg]) for arg, column in FILTERS[kind].items()
+                if filters and filters.get(arg)]
+    after_id = 0
+    while True:
+        chunk = db.session.scalars(
+            select(model.id).where(model.id > after_id, *criteria)
+            .order_by(model.id).limit(size)
+        ).all()
+        if not chunk:
+            return
+        yield chunk
+        after_id = chunk[-1]
+
+
+# ---------------------------------------------------------------------------
+# Actions
+# ---------------------------------------------------------------------------
+
+def _coerce(kind: str, field: str, value):
+    allowed = SETTABLE.get(kind, {}).get(field)
+    if allowed is None:
+        raise BulkActionError(f'{field} cannot be bulk-edited on {kind}.')
+    if isinstance(allowed, list):
+        if value not in allowed:
+            raise BulkActionError(f'{value!r} is not a valid {field}.')
+        return value
+    # Reassignment: 0/blank clears it where the column is nullable
+    try:
+        ref_id = int(value) if str(value or '').strip() else None
+    except ValueError:
+        raise BulkActionError(f'{value!r} is not a valid ID.')
+    column = getattr(MODELS[kind], field)
+    if not ref_id:
+        if not column.nullable:
+            raise BulkActionError(f'{field} is required.')
+        return None
+    if db.session.get(allowed, ref_id) is None:
+        raise BulkActionError(f'No {allowed.__name__.lower()} with ID {ref_id}.')
+    return ref_id
+
+
+def bulk_update(kind: str, field: str, value, ids=None, filters=None) -> int:
+    """Set ``field`` to ``value`` on the selection; returns rows updated."""
+    model = MODELS[kind]
+    value = _coerce(kind, field, value)
+    tracked = field == stats.TRACKED.get(model)
+    table = model.__tablename__
+
+    affected = 0
+    for chunk in iter_id_chunks(kind, ids, filters):
+        criteria = [model.id.in_(chunk), getattr(model, field).is_distinct_from(value)]
+        if tracked:
+            counts = stats.status_counts(model, *criteria)
+        result = db.session.execute(
+            update(model).where(*criteria)
+            .values({field: value, 'updated_at': datetime.now(timezone.utc)}),
+            execution_options={'synchronize_session': False},
+        )
+        if tracked:
+            stats.adjust(stats.status_moves(table, counts, value))
+        db.session.commit()
+        affected += result.rowcount
+    logger.info('Bulk set %s.%s=%r on %d rows', table, field, value, affected)
+    return affected
+
+
+def delete_where(model, *criteria) -> int:
+    """DELETE matching rows, adjusting the stat counters; returns the count."""
+    deltas = Counter()
+    table = model.__tablename__
+    attr = stats.TRACKED.get(model)
+    if attr:
+        for status, n in stats.status_counts(model, *criteria).items():
+            deltas[stats.status_key(table, status)] -= n
+    result = db.session.execute(delete(model).where(*criteria),
+                                execution_options={'synchronize_session': False})
+    if model in stats.TRACKED:
+        deltas[table] -= result.rowcount
+    stats.adjust(deltas)
+    return result.rowcount
+
+
+def _delete_chunk(kind: str, chunk: List[int]) -> int:
+    if kind == 'platforms':
+        targets = select(Target.id).where(Target.platform_id.in_(chunk))
+        delete_where(OutreachEmail, OutreachEmail.target_id.in_(targets))
+        delete_where(Target, Target.platform_id.in_(chunk))
+        # Emails sent to the platform without a target just lose the link
+        db.session.execute(
+            update(OutreachEmail).where(OutreachEmail.platform_id.in_(chunk))
+            .values(platform_id=None, updated_at=datetime.now(timezone.utc)),
+            execution_options={'synchronize_session': False},
+        )
+    elif kind == 'targets':
+        delete_where(OutreachEmail, OutreachEmail.target_id.in_(chunk))
+    elif kind == 'campaigns':
+        delete_where(OutreachEmail, OutreachEmail.campaign_id.in_(chunk))
+
+    model = MODELS[kind]
+    return delete_where(model, model.id.in_(chunk))
+
+
+def bulk_delete(kind: str, ids=None, filters=None) -> int:
+    """Delete the selection and its dependent rows; returns rows deleted."""
+    affected = 0
+    for chunk in iter_id_chunks(kind, ids, filters):
+        affected += _delete_chunk(kind, chunk)
+        db.session.commit()
+    logger.info('Bulk deleted %d %s', affected, kind)
+    return affected
+
+
+# ---------------------------------------------------------------------------
+# UI
+# ---------------------------------------------------------------------------
+
+_LABELS = {'status': 'Set status', 'tier': 'Set tier', 'priority': 'Set priority'}
+
+
+def action_choices(kind: str) -> List[tuple]:
+    """``[(group label, [(action, option label)])]`` for a list page's bulk bar.
+
+    Actions are ``field:value``; a bare ``field`` takes its value from the
+    bar's separate ``value`` input (e.g. a platform picker).
+    """
+    groups = []
+    for field, allowed in SETTABLE[kind].items():
+        if isinstance(allowed, list):
+            groups.append((_LABELS[field],
+                           [(f'{field}:{v}', v.capitalize() if v.islower() else v)
+                            for v in allowed]))
+        elif allowed is Campaign:
+            campaigns = db.session.execute(
+                select(Campaign.id, Campaign.name).order_by(Campaign.name)).all()
+            groups.append(('Assign to campaign',
+                           [(f'{field}:0', '-- No Campaign --')]
+                           + [(f'{field}:{c.id}', c.name) for c in campaigns]))
+        else:
+            groups.append(('Reassign', [(field, f'Move to {allowed.__name__.lower()}...')]))
+    return groups
@@ -0,0 +1,185 @@
+"""
+Response compression (Brotli or gzip) and long-cached static assets.
+
+HTML, JSON, CSV, CSS and JS responses are compressed with Brotli when the
+client accepts it and the ``brotli`` package is installed, otherwise with
+gzip. Streamed responses are compressed chunk by chunk with a sync flush
+after each one, so streaming still delivers rows as they render.
+
+Static files are fingerprinted: ``url_for('static', ...)`` adds
+``?v=<content hash>``, and a request carrying the current hash is served
+with a one-year immutable Cache-Control, so browsers never revalidate
+until the file changes. Their compressed bodies are cached per process,
+keyed on path, modification time and encoding.
+"""
+import gzip
+import hashlib
+import os
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import current_app, request
+
+from app.services.cache import LRUCache
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE = frozenset({'text/html', 'text/css', 'text/csv', 'text/plain',
+                          'text/javascript', 'application/javascript', 'application/json'})
+
+STATIC_MAX_AGE = 365 * 24 * 3600
+
+_static_bodies = LRUCache(maxsize=64)
+_fingerprints = {}
+
+
+# ---------------------------------------------------------------------------
+# Encoders
+# ---------------------------------------------------------------------------
+
+def _encoding() -> Optional[str]:
+    accepted = request.accept_encodings
+    if brotli is not None and accepted.quality('br') > 0:
+        return 'br'
+    if accepted.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == 'br':
+        # Brotli quality runs 0-11; scale the gzip-style 1-9 level onto it
+        return brotli.compress(data, quality=min(11, level + 2))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _compress_stream(chunks: Iterable, encoding: str, level: int) -> Iterator[bytes]:
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=min(11, level + 2))
+        flush = compressor.flush
+        finish = compressor.finish
+        process = compressor.process
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        process = compressor.compress
+
+        def flush():
+            return compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        def finish():
+            return compressor.flush(zlib.Z_FINISH)
+
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = process(chunk) + flush()
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+# ---------------------------------------------------------------------------
+# Static fingerprints
+# ---------------------------------------------------------------------------
+
+def _static_path(filename: str) -> Optional[str]:
+    root = current_app.static_folder
+    path = os.path.realpath(os.path.join(root, filename))
+    if not path.startswith(os.path.realpath(root) + os.sep) or not os.path.isfile(path):
+        return None
+    return path
+
+
+def fingerprint(filename: str) -> Optional[str]:
+    """Short content hash of a static file (cached until it is modified)."""
+    path = _static_path(filename)
+    if path is None:
+        return None
+    mtime = os.stat(path).st_mtime_ns
+    cached = _fingerprints.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as f:
+            cached = (mtime, hashlib.sha256(f.read()).hexdigest()[:12])
+        _fingerprints[path] = cached
+    return cached[1]
+
+
+def _add_fingerprint(endpoint: str, values: dict) -> None:
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        version = fingerprint(values['filename'])
+        if version:
+            values['v'] = version
+
+
+def _static_body(filename: str, encoding: str) -> Optional[bytes]:
+    path = _static_path(filename)
+    if path is None:
+        return None
+    key = (path, os.stat(path).st_mtime_ns, encoding)
+    body = _static_bodies.get(key)
+    if body is None:
+        with open(path, 'rb') as f:
+            # Compressed once per file version, so spend the extra CPU
+            body = compress(f.read(), encoding, 9)
+        _static_bodies.set(key, body)
+    return body
+
+
+# ---------------------------------------------------------------------------
+# Hook
+# ---------------------------------------------------------------------------
+
+def _after_request(response):
+    config = current_app.config
+    is_static = request.endpoint == 'static'
+    if is_static and request.args.get('v') and (
+            request.args['v'] == fingerprint(request.view_args.get('filename', ''))):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+
+    level = config.get('COMPRESS_LEVEL', 6)
+    if (not level or response.status_code != 200 or response.mimetype not in COMPRESSIBLE
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = _encoding()
+    if encoding is None:
+        return response
+
+    if is_static:
+        body = _static_body(request.view_args.get('filename', ''), encoding)
+        if body is None:
+            return response
+        response.response.close()
+        response.direct_passthrough = False
+        response.set_data(body)
+        response.headers.pop('Accept-Ranges', None)
+    elif response.is_streamed:
+        response.response = _compress_stream(response.response, encoding, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        if response.content_length is not None and \
+                response.content_length < config.get('COMPRESS_MIN_SIZE', 500):
+            return response
+        response.set_data(compress(response.get_data(), encoding, level))
+
+    response.headers['Content-Encoding'] = encoding
+    # The compressed body differs byte for byte, so a strong ETag must not match it
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app) -> None:
+    app.url_defaults(_add_fingerprint)
+    app.after_request(_after_request)
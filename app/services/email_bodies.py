@@ -0,0 +1,177 @@
+"""
+Content-addressed storage for outreach email bodies.
+
+Bodies live in ``email_bodies``, one row per distinct text keyed by its
+SHA-256, and every OutreachEmail points at one (``body_id``). Bulk sends
+and follow-ups are personalised, so their final HTML differs per
+recipient: those emails point at the template's body text instead and
+keep only the placeholder values it reads in ``body_context``, so a whole
+send shares one body row and each email carries a few dozen bytes rather
+than the full HTML. Emails written or edited by hand store their own text
+(``body_context`` NULL), and identical texts are still stored once.
+
+``OutreachEmail.body`` rebuilds the text when it is read, with the same
+engine and values that rendered it for sending. Stored bodies never
+change, so editing a template later does not alter emails already made
+from it.
+
+``flask email-bodies compact`` moves emails saved as full text onto their
+template's body where re-rendering reproduces them exactly, and ``flask
+email-bodies prune`` deletes bodies no email refers to any more.
+"""
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import delete, exists, select, update
+
+from app import db
+from app.models import EmailBody, EmailTemplate, OutreachEmail, Platform
+from app.services.bulk import chunked, dialect_insert
+from app.services.cache import LRUCache
+from app.services.read_models import RENDER_COLUMNS
+from app.services.template_engine import (FIELDS, compile_text, compiled_template,
+                                          fields_used, platform_context, render_many,
+                                          render_segments)
+
+logger = logging.getLogger(__name__)
+
+# Parsed template bodies, keyed on EmailBody id (a stored body never changes)
+_compiled = LRUCache(maxsize=128)
+
+_BLANK_CONTEXT = dict.fromkeys(FIELDS, '')
+
+
+def digest(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _ids_by_hash(hashes: Iterable[str]) -> Dict[str, int]:
+    found = {}
+    for chunk in chunked(hashes, 1000):
+        found.update(db.session.execute(
+            select(EmailBody.hash, EmailBody.id).where(EmailBody.hash.in_(chunk))).all())
+    return found
+
+
+def store(texts: Iterable[str]) -> List[int]:
+    """The ``email_bodies`` id of each text, in order, adding any not stored yet."""
+    texts = list(texts)
+    hashes = [digest(t) for t in texts]
+    distinct = dict(zip(hashes, texts))
+    ids = _ids_by_hash(distinct)
+
+    missing = [h for h in distinct if h not in ids]
+    if missing:
+        now = datetime.now(timezone.utc)
+        stmt = (dialect_insert(EmailBody).on_conflict_do_nothing(index_elements=['hash'])
+                .returning(EmailBody.hash, EmailBody.id))
+        for chunk in chunked(missing, 1000):
+            ids.update(db.session.execute(
+                stmt, [{'hash': h, 'body': distinct[h], 'created_at': now} for h in chunk]).all())
+        # Stored by a concurrent writer in the meantime (DO NOTHING returns no row)
+        raced = [h for h in missing if h not in ids]
+        if raced:
+            ids.update(_ids_by_hash(raced))
+    return [ids[h] for h in hashes]
+
+
+def store_rendered(template, platforms: List) -> List[Tuple[int, Optional[dict]]]:
+    """``(body_id, body_context)`` for ``template`` rendered for each platform.
+
+    Matches ``template.render_many(platforms)``: the template's body is
+    stored once and each email keeps the placeholder values it reads.
+    """
+    _, segments = compiled_template(template)
+    body_id = store([template.body_html])[0]
+    fields = fields_used(segments)
+    if not fields:
+        return [(body_id, None)] * len(platforms)
+    result = []
+    for platform in platforms:
+        ctx = platform_context(platform)
+        result.append((body_id, {f: ctx[f] for f in fields}))
+    return result
+
+
+def materialize(body_id: Optional[int], text: str, context: Optional[dict]) -> str:
+    """The full body from a stored body and an email's ``body_context``."""
+    if context is None:
+        return text
+    segments = _compiled.get(body_id) if body_id else None
+    if segments is None:
+        segments = compile_text(text)
+        if body_id:
+            _compiled.set(body_id, segments)
+    return render_segments(segments, {**_BLANK_CONTEXT, **context})
+
+
+# ---------------------------------------------------------------------------
+# Maintenance
+# ---------------------------------------------------------------------------
+
+def compact(chunk_size: Optional[int] = None) -> int:
+    """Point full-text emails at their template's body where that renders
+    the same text; returns how many emails were moved."""
+    chunk_size = chunk_size or current_app.config.get('EMAIL_BODY_CHUNK_SIZE', 1000)
+    templates: Dict[int, Optional[EmailTemplate]] = {}
+    moved = 0
+
+    after_id = 0
+    while True:
+        rows = db.session.execute(
+            select(OutreachEmail.id.label('email_id'), OutreachEmail.template_id,
+                   EmailBody.body.label('stored_body'), *RENDER_COLUMNS)
+            .join(EmailBody, OutreachEmail.body_id == EmailBody.id)
+            .join(Platform, OutreachEmail.platform_id == Platform.id)
+            .where(OutreachEmail.template_id.isnot(None), OutreachEmail.body_context.is_(None),
+                   OutreachEmail.id > after_id)
+            .order_by(OutreachEmail.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        after_id = rows[-1].email_id
+
+        by_template = {}
+        for row in rows:
+            if row.template_id not in templates:
+                templates[row.template_id] = db.session.get(EmailTemplate, row.template_id)
+            template = templates[row.template_id]
+            # Only where today's template and platform reproduce the email exactly
+            if template and render_many(template, [row])[0][1] == row.stored_body:
+                by_template.setdefault(template, []).append(row)
+
+        updates = []
+        for template, matched in by_template.items():
+            for row, (body_id, context) in zip(matched, store_rendered(template, matched)):
+                updates.append({'id': row.email_id, 'body_id': body_id, 'body_context': context})
+        if updates:
+            db.session.execute(update(OutreachEmail), updates)
+        db.session.commit()
+        moved += len(updates)
+
+    logger.info('Compacted %d email bodies', moved)
+    return moved
+
+
+def prune(chunk_size: Optional[int] = None) -> int:
+    """Delete bodies no email refers to; returns how many were deleted."""
+    chunk_size = chunk_size or current_app.config.get('EMAIL_BODY_CHUNK_SIZE', 1000)
+    unused = ~exists().where(OutreachEmail.body_id == EmailBody.id)
+    removed = 0
+    while True:
+        ids = db.session.scalars(select(EmailBody.id).where(unused).limit(chunk_size)).all()
+        if not ids:
+            break
+        # Checked again in the DELETE, in case an email started using one meanwhile
+        removed += db.session.execute(
+            delete(EmailBody).where(EmailBody.id.in_(ids), unused),
+            execution_options={'synchronize_session': False},
+        ).rowcount
+        db.session.commit()
+
+    logger.info('Pruned %d unused email bodies', removed)
+    return removed
@@ -0,0 +1,171 @@
+"""
+Streaming CSV/XLSX export of platforms, targets and emails.
+
+Each export is a single column-projected SELECT run with ``yield_per``
+(a server-side cursor on PostgreSQL), so rows are fetched and written a
+chunk at a time and memory stays flat however large the table is. Both
+formats are streamed straight into the response as rows arrive: CSV line
+by line, XLSX through ``xlsx_writer``, which deflates the worksheet into
+the zip as it goes, so the first byte leaves long before the last row is
+read and nothing is written to disk.
+
+Platform headers are the ones ``auto_map_columns`` recognises, so an
+exported CSV can be uploaded again as-is.
+"""
+import csv
+import io
+from datetime import date, datetime
+from typing import Dict, Iterator
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import Campaign, EmailBody, OutreachEmail, Platform, Target, choice_equals
+from app.services import xlsx_writer
+from app.services.email_bodies import materialize
+
+FORMATS = ('csv', 'xlsx')
+
+# kind -> [(header, column)]; platform headers round-trip through the importer
+COLUMNS = {
+    'platforms': [
+        ('Name', Platform.name),
+        ('URL', Platform.url),
+        ('Tier', Platform.tier),
+        ('Submission Type', Platform.submission_type),
+        ('Topic to Submit', Platform.topic_to_submit),
+        ('Difficulty', Platform.difficulty),
+        ('Contact Name', Platform.contact_name),
+        ('Contact Email', Platform.contact_email),
+        ('Pitch Sent Date', Platform.pitch_sent_date),
+        ('Article Sent Date', Platform.article_sent_date),
+        ('Follow-up 1', Platform.follow_up_1),
+        ('Follow-up 2', Platform.follow_up_2),
+        ('Response Date', Platform.response_date),
+        ('Status', Platform.status),
+        ('Notes', Platform.notes),
+        ('Publication Date', Platform.publication_date),
+        ('Live URL', Platform.live_url),
+        ('Backlink Confirmed', Platform.backlink_confirmed),
+    ],
+    'targets': [
+        ('ID', Target.id),
+        ('Platform', Platform.name),
+        ('Platform URL', Platform.url),
+        ('Target URL', Target.target_url),
+        ('Page Title', Target.target_page_title),
+        ('Our URL', Target.our_url),
+        ('Anchor Text', Target.anchor_text),
+        ('Status', Target.status),
+        ('Priority', Target.priority),
+        ('Notes', Target.notes),
+        ('Created', Target.created_at),
+    ],
+    'emails': [
+        ('ID', OutreachEmail.id),
+        ('Platform', Platform.name),
+        ('Recipient', OutreachEmail.recipient_email),
+        ('Subject', OutreachEmail.subject),
+        ('Body', EmailBody.body),
+        ('Status', OutreachEmail.status),
+        ('Follow-up Stage', OutreachEmail.follow_up_stage),
+        ('Campaign', Campaign.name),
+        ('Sent', OutreachEmail.sent_at),
+        ('Created', OutreachEmail.created_at),
+        ('Gmail Thread ID', OutreachEmail.gmail_thread_id),
+    ],
+}
+
+# kind -> {query-string argument: column it filters on}
+FILTERS = {
+    'platforms': {'status': Platform.status, 'tier': Platform.tier},
+    'targets': {'status': Target.status, 'priority': Target.priority,
+                'platform_id': Target.platform_id},
+    'emails': {'status': OutreachEmail.status, 'campaign_id': OutreachEmail.campaign_id,
+               'platform_id': OutreachEmail.platform_id},
+}
+
+
+def export_query(kind: str, filters: Dict[str, str]):
+    """The SELECT for an export, with any recognised filters applied."""
+    columns = [column for _, column in COLUMNS[kind]]
+    if kind == 'platforms':
+        stmt = select(*columns).order_by(Platform.id)
+    elif kind == 'targets':
+        stmt = (select(*columns).join(Platform, Target.platform_id == Platform.id)
+                .order_by(Target.id))
+    else:
+        # The stored body and context go last; _iter_rows renders them into Body
+        stmt = (select(*columns, OutreachEmail.body_id, OutreachEmail.body_context)
+                .join(EmailBody, OutreachEmail.body_id == EmailBody.id)
+                .outerjoin(Platform, OutreachEmail.platform_id == Platform.id)
+                .outerjoin(Campaign, OutreachEmail.campaign_id == Campaign.id)
+                .order_by(OutreachEmail.id))
+    for arg, column in FILTERS[kind].items():
+        value = filters.get(arg)
+        if value:
+            stmt = stmt.where(choice_equals(column, value))
+    return stmt
+
+
+def _iter_rows(kind: str, filters: Dict[str, str]) -> Iterator[tuple]:
+    yield_per = current_app.config.get('EXPORT_YIELD_PER', 1000)
+    stmt = export_query(kind, filters).execution_options(yield_per=yield_per)
+    if kind != 'emails':
+        yield from db.session.execute(stmt)
+        return
+    body = [header for header, _ in COLUMNS[kind]].index('Body')
+    for row in db.session.execute(stmt):
+        values = list(row[:-2])
+        values[body] = materialize(row.body_id, values[body], row.body_context)
+        yield values
+
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'Yes' if value else 'No'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def stream_csv(kind: str, filters: Dict[str, str]) -> Iterator[str]:
+    """Yield the CSV export in chunks of ``EXPORT_YIELD_PER`` rows."""
+    chunk_rows = current_app.config.get('EXPORT_YIELD_PER', 1000)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # BOM so Excel opens it as UTF-8; the importer strips it
+    buffer.write('\ufeff')
+    writer.writerow([header for header, _ in COLUMNS[kind]])
+    for i, row in enumerate(_iter_rows(kind, filters), start=1):
+        writer.writerow([_csv_value(v) for v in row])
+        if i % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _xlsx_value(value):
+    if isinstance(value, bool):
+        return 'Yes' if value else 'No'
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.replace(tzinfo=None)  # Excel has no time zones
+    return value
+
+
+def stream_xlsx(kind: str, filters: Dict[str, str]) -> Iterator[bytes]:
+    """Yield the XLSX export as it is written."""
+    rows = ([_xlsx_value(v) for v in row] for row in _iter_rows(kind, filters))
+    return xlsx_writer.stream_xlsx(kind.capitalize(), [header for header, _ in COLUMNS[kind]], rows)
+
+
+def export_filename(kind: str, fmt: str) -> str:
+    return f'{kind}-{date.today().isoformat()}.{fmt}'
+
@@ -0,0 +1,259 @@
+"""
+Follow-up automation — finds pitches due for a follow-up and creates them.
+
+A platform is due for follow-up 1 once ``pitch_sent_date`` is
+FOLLOW_UP_1_DAYS old, and for follow-up 2 once ``follow_up_1`` is
+FOLLOW_UP_2_DAYS old, as long as nobody has responded. Each stage is one
+set-based query served by a partial index on the pending rows only
+(``ix_platforms_follow_up_*_due``), so a tick never scans settled pitches.
+
+Follow-ups are created in bulk as drafts (reviewed and sent from the Emails
+page) or as ``queued`` rows that ``send_queued`` delivers. Both reply in the
+original Gmail thread. The platform's ``follow_up_N`` date is only set once
+the follow-up actually goes out; a send that fails (expired token, rate
+limit, network) leaves the email ``queued`` for the next run. Platforms
+whose contact replied or whose mail bounced get no further follow-ups.
+"""
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import and_, exists, insert, or_, select, update
+
+from app import db
+from app.models import EmailBody, OutreachEmail, Platform
+from app.services import email_bodies, stats
+
+logger = logging.getLogger(__name__)
+
+# stage -> (date the previous email went out, date this follow-up went out)
+STAGES = {
+    1: (Platform.pitch_sent_date, Platform.follow_up_1),
+    2: (Platform.follow_up_1, Platform.follow_up_2),
+}
+
+CLOSED_PLATFORM_STATUSES = ('Published', 'Rejected')
+SENT_STATUSES = ('sent', 'delivered')
+PENDING_STATUSES = ('draft', 'queued')
+# Any email to the platform in one of these ends its follow-ups
+STOP_STATUSES = ('replied', 'bounced')
+
+
+@dataclass
+class FollowUpResult:
+    created: int = 0
+    sent: int = 0
+    failed: int = 0
+
+
+def _wait_days(stage: int) -> int:
+    return current_app.config.get(f'FOLLOW_UP_{stage}_DAYS', 7)
+
+
+def due_platforms(stage: int, today: Optional[date] = None, after_id: int = 0, limit: int = 500):
+    """Build the set-based query for platforms due for ``stage``.
+
+    Selects only the columns a follow-up render needs, plus the ID of the
+    latest email sent to the platform so the follow-up can join its thread.
+    """
+    previous_sent, this_sent = STAGES[stage]
+    today = today or date.today()
+    cutoff = today - timedelta(days=_wait_days(stage))
+
+    last_sent = (
+        select(OutreachEmail.id)
+        .where(OutreachEmail.platform_id == Platform.id,
+               OutreachEmail.status.in_(SENT_STATUSES))
+        .order_by(OutreachEmail.sent_at.desc(), OutreachEmail.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    # Anyone who replied or bounced, or who already has this follow-up pending
+    skip = exists().where(
+        OutreachEmail.platform_id == Platform.id,
+        or_(OutreachEmail.status.in_(STOP_STATUSES),
+            and_(OutreachEmail.follow_up_stage == stage,
+                 OutreachEmail.status.in_(PENDING_STATUSES))),
+    )
+
+    return (
+        select(Platform.id, Platform.name, Platform.url, Platform.tier,
+               Platform.topic_to_submit, Platform.contact_name, Platform.contact_email,
+               last_sent.label('parent_id'))
+        .where(
+            # These three predicates match the partial index exactly
+            this_sent.is_(None),
+            Platform.response_date.is_(None),
+            previous_sent <= cutoff,
+            Platform.contact_email.isnot(None),
+            Platform.contact_email != '',
+            or_(Platform.status.is_(None), Platform.status.notin_(CLOSED_PLATFORM_STATUSES)),
+            Platform.id > after_id,
+            ~skip,
+        )
+        .order_by(Platform.id)
+        .limit(limit)
+    )
+
+
+def _reply_subject(subject: str) -> str:
+    return subject if subject.lower().startswith('re:') else f'Re: {subject}'
+
+
+def create_follow_ups(template, stage: int, queue: bool = False,
+                      today: Optional[date] = None, chunk_size: Optional[int] = None) -> FollowUpResult:
+    """Create follow-up emails from ``template`` for every platform due.
+
+    Rows are inserted with bulk INSERTs, one chunk per transaction.
+    """
+    chunk_size = chunk_size or current_app.config.get('FOLLOW_UP_CHUNK_SIZE', 500)
+    status = 'queued' if queue else 'draft'
+    result = FollowUpResult()
+
+    after_id = 0
+    while True:
+        due = db.session.execute(due_platforms(stage, today, after_id, chunk_size)).all()
+        if not due:
+            break
+        after_id = due[-1].id
+
+        parent_ids = [row.parent_id for row in due if row.parent_id]
+        parents = {}
+        if parent_ids:
+            parents = {
+                p.id: p for p in db.session.execute(
+                    select(OutreachEmail.id, OutreachEmail.subject, OutreachEmail.target_id,
+                           OutreachEmail.campaign_id, OutreachEmail.gmail_thread_id,
+                           OutreachEmail.gmail_message_id)
+                    .where(OutreachEmail.id.in_(parent_ids))
+                ).all()
+            }
+
+        records = []
+        stored = email_bodies.store_rendered(template, due)
+        for row, (subject, _), (body_id, body_context) in zip(
+                due, template.render_many(due), stored):
+            parent = parents.get(row.parent_id)
+            record = {
+                'platform_id': row.id,
+                'template_id': template.id,
+                'recipient_email': row.contact_email,
+                'subject': subject,
+                'body_id': body_id,
+                'body_context': body_context,
+                'status': status,
+                'follow_up_stage': stage,
+            }
+            if parent:
+                record.update(
+                    subject=_reply_subject(parent.subject),
+                    target_id=parent.target_id,
+                    campaign_id=parent.campaign_id,
+                    gmail_thread_id=parent.gmail_thread_id or parent.gmail_message_id,
+                )
+            records.append(record)
+
+        db.session.execute(insert(OutreachEmail), records)
+        stats.adjust({'outreach_emails': len(records),
+                      stats.status_key('outreach_emails', status): len(records)})
+        db.session.commit()
+        result.created += len(records)
+
+    logger.info('Created %d follow-up %d %ss', result.created, stage, status)
+    return result
+
+
+def mark_follow_ups_sent(platform_ids_by_stage, sent_on: Optional[date] = None) -> None:
+    """Record sent follow-ups on their platforms, one UPDATE per stage."""
+    sent_on = sent_on or date.today()
+    now = datetime.now(timezone.utc)
+    for stage, platform_ids in platform_ids_by_stage.items():
+        if not platform_ids:
+            continue
+        _, this_sent = STAGES[stage]
+        db.session.execute(
+            update(Platform)
+            .where(Platform.id.in_(platform_ids))
+            .values({this_sent: sent_on, Platform.status: 'Follow-up', Platform.updated_at: now})
+        )
+
+
+def send_follow_up(gmail, email, body: Optional[str] = None) -> dict:
+    """Send one follow-up in its original thread; returns the Gmail result.
+
+    ``body`` defaults to ``email.body`` (pass it for plain rows).
+    """
+    in_reply_to = None
+    if email.gmail_thread_id:
+        try:
+            in_reply_to = gmail.get_thread_last_message_id(email.gmail_thread_id)
+        except Exception as exc:
+            logger.warning('Could not load thread %s: %s', email.gmail_thread_id, exc)
+    return gmail.send_email(
+        to=email.recipient_email,
+        subject=email.subject,
+        body_html=email.body if body is None else body,
+        thread_id=email.gmail_thread_id,
+        in_reply_to=in_reply_to,
+    )
+
+
+def send_queued(gmail, chunk_size: Optional[int] = None) -> FollowUpResult:
+    """Send every queued follow-up, committing once per chunk.
+
+    Emails that fail to send stay ``queued`` (and keep blocking a duplicate
+    follow-up for their platform) and are counted in ``failed``; the next
+    run tries them again.
+    """
+    chunk_size = chunk_size or current_app.config.get('FOLLOW_UP_CHUNK_SIZE', 500)
+    result = FollowUpResult()
+
+    after_id = 0
+    while True:
+        queued = db.session.execute(
+            select(OutreachEmail.id, OutreachEmail.platform_id, OutreachEmail.recipient_email,
+                   OutreachEmail.subject, OutreachEmail.body_id, OutreachEmail.body_context,
+                   EmailBody.body.label('stored_body'), OutreachEmail.gmail_thread_id,
+                   OutreachEmail.follow_up_stage)
+            .join(EmailBody, OutreachEmail.body_id == EmailBody.id)
+            .where(OutreachEmail.status == 'queued', OutreachEmail.id > after_id)
+            .order_by(OutreachEmail.id)
+            .limit(chunk_size)
+        ).all()
+        if not queued:
+            break
+        after_id = queued[-1].id
+
+        updates = []
+        sent_by_stage = {stage: [] for stage in STAGES}
+        for email in queued:
+            body = email_bodies.materialize(email.body_id, email.stored_body, email.body_context)
+            sent = send_follow_up(gmail, email, body)
+            if 'error' in sent:
+                logger.warning('Follow-up %d to %s not sent, left queued: %s',
+                               email.id, email.recipient_email, sent['error'])
+                result.failed += 1
+                continue
+            updates.append({
+                'id': email.id,
+                'status': 'sent',
+                'sent_at': datetime.now(timezone.utc),
+                'gmail_message_id': sent.get('id'),
+                'gmail_thread_id': sent.get('thread_id') or email.gmail_thread_id,
+            })
+            if email.platform_id and email.follow_up_stage in sent_by_stage:
+                sent_by_stage[email.follow_up_stage].append(email.platform_id)
+            result.sent += 1
+
+        if updates:
+            # Bulk UPDATE by primary key (executemany)
+            db.session.execute(update(OutreachEmail), updates)
+            stats.adjust({stats.status_key('outreach_emails', 'sent'): len(updates),
+                          stats.status_key('outreach_emails', 'queued'): -len(updates)})
+        mark_follow_ups_sent(sent_by_stage)
+        db.session.commit()
+
+    logger.info('Sent %d queued follow-ups (%d failed, left queued)', result.sent, result.failed)
+    return result
@@ -7,28 +7,59 @@ from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
-SCOPES = ['https://www.googleapis.com/auth/gmail.send']
+SCOPES = [
+    'https://www.googleapis.com/auth/gmail.send',
+    'https://www.googleapis.com/auth/gmail.readonly',
+]
+
+
+class HistoryExpiredError(Exception):
+    """The stored historyId is too old for Gmail to return changes since it."""
 
 
 class GmailService:
-    """Handles sending emails via the Gmail API."""
+    """Handles sending and reading emails via the Gmail API."""
 
-    def __init__(self, credentials_file=None, token_file=None, sender_email=None):
+    def __init__(self, credentials_file=None, token_file=None, sender_email=None,
+                 api_endpoint=None):
         self.credentials_file = credentials_file or os.environ.get(
             'GMAIL_CREDENTIALS_FILE', 'credentials.json')
         self.token_file = token_file or os.environ.get(
             'GMAIL_TOKEN_FILE', 'token.json')
         self.sender_email = sender_email or os.environ.get(
             'GMAIL_SENDER_EMAIL', 'anna@writeitgreat.com')
+        # Point at a local fake Gmail server in development/testing
+        self.api_endpoint = api_endpoint or os.environ.get('GMAIL_API_ENDPOINT') or None
         self.service = None
 
+    @classmethod
+    def from_config(cls, config):
+        """Build a service from a Flask config mapping."""
+        return cls(
+            credentials_file=config.get('GMAIL_CREDENTIALS_FILE'),
+            token_file=config.get('GMAIL_TOKEN_FILE'),
+            sender_email=config.get('GMAIL_SENDER_EMAIL'),
+            api_endpoint=config.get('GMAIL_API_ENDPOINT'),
+        )
+
     def authenticate(self):
         """Authenticate with Gmail API using OAuth2 credentials."""
+        if self.api_endpoint and not os.path.exists(self.token_file):
+            # A fake server doesn't check OAuth tokens
+            from google.auth.credentials import AnonymousCredentials
+            self.service = build('gmail', 'v1', credentials=AnonymousCredentials(),
+                                 client_options={'api_endpoint': self.api_endpoint})
+            return self.service
+
         creds = None
 
         if os.path.exists(self.token_file):
             creds = Credentials.from_authorized_user_file(self.token_file, SCOPES)
+            # Tokens issued before the readonly scope was added must be re-authorized
+            if not creds.has_scopes(SCOPES):
+                creds = None
 
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
@@ -46,10 +77,12 @@ class GmailService:
             with open(self.token_file, 'w') as token:
                 token.write(creds.to_json())
 
-        self.service = build('gmail', 'v1', credentials=creds)
+        client_options = {'api_endpoint': self.api_endpoint} if self.api_endpoint else None
+        self.service = build('gmail', 'v1', credentials=creds, client_options=client_options)
         return self.service
 
-    def send_email(self, to, subject, body_html, body_text=None):
+    def send_email(self, to, subject, body_html, body_text=None,
+                   thread_id=None, in_reply_to=None):
         """Send an email via the Gmail API.
 
         Args:
@@ -57,10 +90,13 @@ class GmailService:
             subject: Email subject line.
             body_html: HTML body content.
             body_text: Optional plain text fallback.
+            thread_id: Gmail thread to add the message to (follow-ups).
+            in_reply_to: RFC 822 Message-ID being replied to, so the
+                recipient's client threads the message too.
 
         Returns:
-            dict with 'id' (Gmail message ID) and 'status' on success,
-            or dict with 'error' on failure.
+            dict with 'id' (Gmail message ID), 'thread_id' and 'status' on
+            success, or dict with 'error' on failure.
         """
         if not self.service:
             self.authenticate()
@@ -69,17 +105,91 @@ class GmailService:
         message['to'] = to
         message['from'] = self.sender_email
         message['subject'] = subject
+        if in_reply_to:
+            message['In-Reply-To'] = in_reply_to
+            message['References'] = in_reply_to
 
         if body_text:
             message.attach(MIMEText(body_text, 'plain'))
         message.attach(MIMEText(body_html, 'html'))
 
         raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
+        body = {'raw': raw}
+        if thread_id:
+            body['threadId'] = thread_id
 
         try:
             sent = self.service.users().messages().send(
-                userId='me', body={'raw': raw}
+                userId='me', body=body
             ).execute()
-            return {'id': sent['id'], 'status': 'sent'}
+            return {'id': sent['id'], 'thread_id': sent.get('threadId'), 'status': 'sent'}
         except Exception as e:
             return {'error': str(e)}
+
+    def get_history_id(self):
+        """Return the mailbox's current historyId (the starting checkpoint)."""
+        if not self.service:
+            self.authenticate()
+        profile = self.service.users().getProfile(userId='me').execute()
+        return profile['historyId']
+
+    def iter_history_pages(self, start_history_id, history_types=('messageAdded',)):
+        """Yield pages of history records added since ``start_history_id``.
+
+        Each page is the raw ``history.list`` response: a ``history`` list
+        plus the mailbox's current ``historyId``. Follows ``nextPageToken``
+        so callers only ever hold one page at a time.
+
+        Raises HistoryExpiredError if Gmail no longer has history that old.
+        """
+        if not self.service:
+            self.authenticate()
+
+        page_token = None
+        while True:
+            try:
+                resp = self.service.users().history().list(
+                    userId='me',
+                    startHistoryId=start_history_id,
+                    historyTypes=list(history_types),
+                    pageToken=page_token,
+                    maxResults=500,
+                ).execute()
+            except HttpError as e:
+                if e.resp.status == 404:
+                    raise HistoryExpiredError(str(e)) from e
+                raise
+
+            yield resp
+
+            page_token = resp.get('nextPageToken')
+            if not page_token:
+                break
+
+    def get_message_headers(self, message_id, names):
+        """Fetch selected headers of a message without downloading its body.
+
+        Returns a dict of lower-cased header name -> value.
+        """
+        if not self.service:
+            self.authenticate()
+        msg = self.service.users().messages().get(
+            userId='me', id=message_id, format='metadata', metadataHeaders=list(names),
+        ).execute()
+        headers = msg.get('payload', {}).get('headers', [])
+        return {h['name'].lower(): h['value'] for h in headers}
+
+    def get_thread_last_message_id(self, thread_id):
+        """Return the RFC 822 Message-ID of the newest message in a thread."""
+        if not self.service:
+            self.authenticate()
+        thread = self.service.users().threads().get(
+            userId='me', id=thread_id, format='metadata', metadataHeaders=['Message-ID'],
+        ).execute()
+        messages = thread.get('messages', [])
+        if not messages:
+            return None
+        for h in messages[-1].get('payload', {}).get('headers', []):
+            if h['name'].lower() == 'message-id':
+                return h['value']
+        return None
@@ -0,0 +1,164 @@
+"""
+Import profiles — per-column type inference for platform uploads.
+
+Instead of handing every date cell to dateutil, the importer samples each
+date column once, picks the strptime format most of its values match, and
+parses the whole column with that one format (dateutil is only the
+fallback for cells that don't fit). The boolean column's vocabulary is
+detected the same way.
+
+The chosen mapping is shown to the user before the import runs and saved
+in app_settings under the sheet's header signature, so the next upload
+with the same headers starts from the confirmed choices.
+"""
+import hashlib
+import json
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional
+
+from app.models import AppSetting
+from app.services.platform_import import BOOL_FIELDS, DATE_FIELDS, parse_date
+
+PROFILE_SAMPLE_ROWS = 200
+
+# Candidate formats in preference order (ties go to the earlier one)
+DATE_FORMATS = [
+    ('%Y-%m-%d', '2024-01-31'),
+    ('%Y-%m-%d %H:%M:%S', '2024-01-31 00:00:00 (Excel dates)'),
+    ('%m/%d/%Y', '01/31/2024'),
+    ('%d/%m/%Y', '31/01/2024'),
+    ('%m/%d/%y', '01/31/24'),
+    ('%d/%m/%y', '31/01/24'),
+    ('%d.%m.%Y', '31.01.2024'),
+    ('%b %d, %Y', 'Jan 31, 2024'),
+    ('%B %d, %Y', 'January 31, 2024'),
+    ('%d %b %Y', '31 Jan 2024'),
+    ('%d %B %Y', '31 January 2024'),
+]
+ISO_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S')
+
+TRUE_WORDS = ('yes', 'true', '1', 'y', 'confirmed', 'x', '✓', '✔', 'done', 'live')
+
+_KEY_PREFIX = 'IMPORT_PROFILE_'
+
+
+def header_signature(headers: List[str]) -> str:
+    """Stable key for a sheet layout (normalized header names, in order)."""
+    joined = '\x1f'.join(h.strip().lower() for h in headers)
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()
+
+
+def _matches(value: str, fmt: str) -> bool:
+    try:
+        datetime.strptime(value, fmt)
+        return True
+    except ValueError:
+        return False
+
+
+def infer_date_format(values: List[str]) -> str:
+    """Pick the candidate format matching the most sampled values ('' if none)."""
+    best, best_count = '', 0
+    for fmt, _ in DATE_FORMATS:
+        count = sum(1 for v in values if _matches(v, fmt))
+        if count > best_count:
+            best, best_count = fmt, count
+    return best
+
+
+def infer_true_values(values: List[str]) -> List[str]:
+    """Distinct sampled values that read as "true"."""
+    seen = {v.strip().lower() for v in values if v and v.strip()}
+    found = [v for v in TRUE_WORDS if v in seen]
+    return found or ['yes', 'true', '1', 'y', 'confirmed']
+
+
+def infer_profile(headers: List[str], col_map: Dict[str, int], sample: List[List[str]]) -> dict:
+    """Build a profile from a sample of data rows."""
+    def column(field_name):
+        idx = col_map[field_name]
+        return [row[idx].strip() for row in sample if idx < len(row) and row[idx].strip()]
+
+    profile = {
+        'signature': header_signature(headers),
+        'date_formats': {},
+        'true_values': [],
+        'samples': {},
+        'saved': False,
+    }
+    for field_name in DATE_FIELDS:
+        if field_name in col_map:
+            values = column(field_name)
+            profile['date_formats'][field_name] = infer_date_format(values)
+            profile['samples'][field_name] = values[:3]
+    for field_name in BOOL_FIELDS:
+        if field_name in col_map:
+            values = column(field_name)
+            profile['true_values'] = infer_true_values(values)
+            profile['samples'][field_name] = sorted(set(values))[:5]
+    return profile
+
+
+def load_profile(signature: str) -> Optional[dict]:
+    raw = AppSetting.get(_KEY_PREFIX + signature, '')
+    return json.loads(raw) if raw else None
+
+
+def save_profile(profile: dict) -> None:
+    """Store the confirmed choices (caller commits)."""
+    stored = {'date_formats': profile['date_formats'], 'true_values': profile['true_values']}
+    AppSetting.set(_KEY_PREFIX + profile['signature'], json.dumps(stored))
+
+
+def detect_profile(headers: List[str], col_map: Dict[str, int], sample: List[List[str]]) -> dict:
+    """Infer a profile, then overlay any saved choices for this header layout."""
+    profile = infer_profile(headers, col_map, sample)
+    saved = load_profile(profile['signature'])
+    if saved:
+        for field_name, fmt in saved.get('date_formats', {}).items():
+            if field_name in profile['date_formats']:
+                profile['date_formats'][field_name] = fmt
+        if profile['true_values'] and saved.get('true_values'):
+            profile['true_values'] = saved['true_values']
+        profile['saved'] = True
+    return profile
+
+
+def _date_parser(fmt: str) -> Callable[[Optional[str]], Optional[date]]:
+    if not fmt:
+        return parse_date
+    if fmt in ISO_FORMATS:
+        def parse(value):
+            if not value or not value.strip():
+                return None
+            try:
+                return date.fromisoformat(value.strip()[:10])
+            except ValueError:
+                return parse_date(value)
+        return parse
+
+    strptime = datetime.strptime
+
+    def parse(value):
+        if not value or not value.strip():
+            return None
+        try:
+            return strptime(value.strip(), fmt).date()
+        except ValueError:
+            return parse_date(value)
+    return parse
+
+
+def build_parsers(profile: Optional[dict]) -> Dict[str, Callable]:
+    """Compile a profile into one parser per date/boolean field."""
+    parsers: Dict[str, Callable] = {}
+    if not profile:
+        return parsers
+    for field_name, fmt in profile.get('date_formats', {}).items():
+        parsers[field_name] = _date_parser(fmt)
+    true_values = frozenset(v.strip().lower() for v in profile.get('true_values', []))
+    if true_values:
+        for field_name in BOOL_FIELDS:
+            parsers[field_name] = lambda value: bool(value) and value.strip().lower() in true_values
+    return parsers
+
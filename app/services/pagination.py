@@ -0,0 +1,118 @@
+"""
+Keyset pagination for the list views.
+
+Lists are ordered newest first on ``(created_at, id)``. Instead of an
+OFFSET, each page link carries an opaque cursor holding the boundary
+row's ``(created_at, id)``, and the next page is fetched with a WHERE on
+that tuple, served by the ``(created_at, id)`` indexes. Every page costs
+the same however deep it is, and only one page of rows is ever loaded.
+"""
+import base64
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+
+from flask import current_app, request
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import Select
+
+from app import db
+
+
+class Page:
+    """One page of rows plus the cursors for its neighbours.
+
+    Iterable and truthy like the list it replaces, so templates can keep
+    ``{% for row in rows %}`` and ``{% if rows %}``.
+    """
+
+    def __init__(self, items: list, per_page: int, next_cursor: Optional[str] = None,
+                 prev_cursor: Optional[str] = None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_cursor is not None
+
+    def __iter__(self) -> Iterator:
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __bool__(self) -> bool:
+        return bool(self.items)
+
+
+def encode_cursor(row) -> str:
+    raw = f'{row.created_at.isoformat()}|{row.id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """Parse a cursor; a missing or malformed one means "first page"."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def page_args() -> dict:
+    """Cursor and page size from the query string."""
+    default = current_app.config.get('PAGE_SIZE', 50)
+    maximum = current_app.config.get('MAX_PAGE_SIZE', 500)
+    per_page = request.args.get('per_page', default, type=int)
+    return {
+        'after': request.args.get('after'),
+        'before': request.args.get('before'),
+        'per_page': min(max(per_page, 1), maximum),
+    }
+
+
+def _fetch(query, criteria, order, limit) -> list:
+    if isinstance(query, Select):
+        return db.session.execute(query.where(*criteria).order_by(*order).limit(limit)).all()
+    return query.filter(*criteria).order_by(*order).limit(limit).all()
+
+
+def keyset_page(query, model, after: Optional[str] = None, before: Optional[str] = None,
+                per_page: int = 50) -> Page:
+    """Fetch one newest-first page of ``query`` (a Model.query or a select()).
+
+    ``after`` pages towards older rows, ``before`` towards newer ones.
+    Rows must expose ``created_at`` and ``id``.
+    """
+    created_at, row_id = model.created_at, model.id
+    newer_cursor = decode_cursor(before)
+    older_cursor = None if newer_cursor else decode_cursor(after)
+
+    if newer_cursor:
+        c, i = newer_cursor
+        rows = _fetch(query,
+                      [or_(created_at > c, and_(created_at == c, row_id > i))],
+                      [created_at.asc(), row_id.asc()], per_page + 1)
+        more_newer = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        return Page(items, per_page,
+                    next_cursor=encode_cursor(items[-1]) if items else None,
+                    prev_cursor=encode_cursor(items[0]) if items and more_newer else None)
+
+    criteria = []
+    if older_cursor:
+        c, i = older_cursor
+        criteria.append(or_(created_at < c, and_(created_at == c, row_id < i)))
+    rows = _fetch(query, criteria, [created_at.desc(), row_id.desc()], per_page + 1)
+    items = rows[:per_page]
+    return Page(items, per_page,
+                next_cursor=encode_cursor(items[-1]) if len(rows) > per_page else None,
+                prev_cursor=encode_cursor(items[0]) if items and older_cursor else None)
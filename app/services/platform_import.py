@@ -0,0 +1,565 @@
+"""
+Platform import — streams rows out of an uploaded CSV/Excel file and writes
+them in fixed-size batches with core bulk upserts keyed on the normalized
+domain, so re-importing an updated sheet updates rows instead of
+duplicating them.
+
+Nothing holds more than one batch in memory: the file is read row by row,
+each row is normalized into a plain dict, and a batch is flushed and
+committed as soon as it fills up.
+
+On PostgreSQL the normalized rows are instead streamed into a temporary
+staging table with COPY FROM STDIN and moved into ``platforms`` with a
+single INSERT ... SELECT ... ON CONFLICT.
+
+Between the upload and confirm steps the file is kept in
+``staged_upload_chunks``, so the confirm request can be served by any
+web dyno; each dyno caches the file in IMPORT_UPLOAD_DIR while reading it.
+"""
+import csv
+import io
+import logging
+import os
+import re
+import secrets
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, or_, select
+
+from app import db
+from app.models import (DIFFICULTIES, PLATFORM_STATUSES, TIERS, Platform, StagedUploadChunk,
+                        normalize_choice, normalize_domain)
+from app.services import response_cache, stats
+from app.services.bulk import chunked, dialect_insert
+
+logger = logging.getLogger(__name__)
+
+# Only the first few per-row errors are kept for display; all are logged
+MAX_REPORTED_ERRORS = 20
+
+# Columns written by an import, in COPY order
+TEXT_FIELDS = ('tier', 'submission_type', 'topic_to_submit', 'difficulty',
+               'contact_name', 'contact_email', 'notes', 'live_url')
+DATE_FIELDS = ('pitch_sent_date', 'article_sent_date', 'follow_up_1', 'follow_up_2',
+               'response_date', 'publication_date')
+BOOL_FIELDS = ('backlink_confirmed',)
+IMPORT_COLUMNS = ('name', 'url', 'status') + TEXT_FIELDS + DATE_FIELDS + BOOL_FIELDS
+# What a new platform gets for a blank cell. On an existing platform (upsert)
+# a blank cell leaves the stored value alone, as for every other column.
+INSERT_DEFAULTS = {'status': 'Not Started', 'backlink_confirmed': False}
+# Enumerated columns: spelling variants are matched to the allowed values
+CHOICE_FIELDS = {'tier': TIERS, 'difficulty': DIFFICULTIES, 'status': PLATFORM_STATUSES}
+
+STAGING_TABLE = 'platforms_import_staging'
+
+# Uploads waiting for the user to confirm their import profile
+_STAGED_NAME_RE = re.compile(r'^[0-9a-f]{32}\.(csv|xlsx|xls)$')
+# Bytes per staged_upload_chunks row
+STAGED_CHUNK_SIZE = 1024 * 1024
+
+# What happens to a row whose domain already exists
+MODE_SKIP = 'skip'
+MODE_UPSERT = 'upsert'
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    duplicates: int = 0   # repeated domains within the file
+    skipped: int = 0      # rows that couldn't be imported
+    errors: List[str] = field(default_factory=list)
+
+    def add_error(self, message: str) -> None:
+        self.skipped += 1
+        logger.info('Platform import: %s', message)
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def iter_upload_rows(file, filename: str) -> Iterator[List[str]]:
+    """Yield the non-blank rows of a CSV or Excel upload as lists of strings.
+
+    Large .xlsx files go through the streaming XML reader (same output,
+    much less CPU); small ones and .xls through openpyxl.
+    """
+    if filename.endswith('.csv'):
+        stream = io.TextIOWrapper(file.stream if hasattr(file, 'stream') else file,
+                                  encoding='utf-8-sig', newline='')
+        try:
+            for row in csv.reader(stream):
+                if any(cell.strip() for cell in row):
+                    yield row
+        finally:
+            stream.detach()  # leave the underlying upload open
+    elif filename.endswith('.xlsx') and _file_size(file) >= current_app.config.get(
+            'IMPORT_FAST_XLSX_MIN_BYTES', 1024 * 1024):
+        from app.services.xlsx_reader import iter_xlsx_rows
+        for row in iter_xlsx_rows(file.stream if hasattr(file, 'stream') else file):
+            if any(cell.strip() for cell in row):
+                yield row
+    else:
+        import openpyxl
+        wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        try:
+            for row in wb.active.iter_rows(values_only=True):
+                str_row = [str(cell) if cell is not None else '' for cell in row]
+                if any(cell.strip() for cell in str_row):
+                    yield str_row
+        finally:
+            wb.close()
+
+
+def _file_size(file) -> int:
+    stream = file.stream if hasattr(file, 'stream') else file
+    position = stream.tell()
+    size = stream.seek(0, io.SEEK_END)
+    stream.seek(position)
+    return size
+
+
+def iter_staged_rows(path: str) -> Iterator[List[str]]:
+    """Like iter_upload_rows, for a staged upload on disk (closed with the generator)."""
+    with open(path, 'rb') as file:
+        yield from iter_upload_rows(file, path)
+
+
+def auto_map_columns(headers: List[str]) -> Dict[str, int]:
+    """Map Platform fields to column indices based on common header names."""
+    mapping = {}
+
+    patterns = {
+        'tier': ['tier'],
+        'name': ['name', 'platform', 'website', 'site', 'site name', 'platform name', 'website name', 'blog'],
+        'url': ['url', 'website url', 'link', 'domain', 'site url', 'platform url', 'web address'],
+        'submission_type': ['submission type', 'submission_type', 'type', 'submit type'],
+        'topic_to_submit': ['topic to submit', 'topic_to_submit', 'topic', 'article topic'],
+        'difficulty': ['difficulty', 'level'],
+        'contact_name': ['contact', 'contact name', 'contact_name', 'person', 'editor', 'author', 'contact/editor'],
+        'contact_email': ['email', 'contact email', 'contact_email', 'e-mail', 'email address'],
+        'pitch_sent_date': ['pitch sent date', 'pitch_sent_date', 'pitch sent', 'pitch date'],
+        'article_sent_date': ['article sent date', 'article_sent_date', 'article sent', 'article date'],
+        'follow_up_1': ['follow-up 1', 'follow_up_1', 'followup 1', 'follow up 1'],
+        'follow_up_2': ['follow-up 2', 'follow_up_2', 'followup 2', 'follow up 2'],
+        'response_date': ['response date', 'response_date', 'response'],
+        'status': ['status'],
+        'notes': ['notes', 'comments', 'note', 'comment', 'remarks'],
+        'publication_date': ['publication date', 'publication_date', 'published date', 'pub date'],
+        'live_url': ['live url', 'live_url', 'published url', 'article url', 'live link'],
+        'backlink_confirmed': ['backlink confirmed', 'backlink_confirmed', 'backlink', 'confirmed'],
+    }
+
+    for field_name, keywords in patterns.items():
+        for idx, header in enumerate(headers):
+            if header in keywords:
+                mapping[field_name] = idx
+                break
+
+    return mapping
+
+
+def _get_mapped(row: List[str], col_map: Dict[str, int], field_name: str) -> Optional[str]:
+    """Get a value from a row using the column mapping."""
+    idx = col_map.get(field_name)
+    if idx is not None and idx < len(row):
+        return row[idx]
+    return None
+
+
+def parse_date(value):
+    """Try to parse a date string from various formats."""
+    if not value or not value.strip():
+        return None
+    from dateutil import parser as dateutil_parser
+    try:
+        return dateutil_parser.parse(value.strip()).date()
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def parse_bool(value) -> bool:
+    """Parse a boolean from common truthy strings."""
+    if not value:
+        return False
+    return value.strip().lower() in ('yes', 'true', '1', 'y', 'confirmed')
+
+
+# ---------------------------------------------------------------------------
+# Staged uploads
+# ---------------------------------------------------------------------------
+
+def _staging_dir() -> str:
+    path = current_app.config.get('IMPORT_UPLOAD_DIR') or os.path.join(
+        tempfile.gettempdir(), 'platform-imports')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def stage_upload(file, filename: str) -> str:
+    """Store an upload until the import is confirmed; returns its token.
+
+    The file goes into ``staged_upload_chunks`` (so the confirm request
+    finds it on any dyno, or after a restart) and into the local staging
+    directory, which serves as this process's cache of it.
+    """
+    directory = _staging_dir()
+    _purge_stale_uploads(directory)
+    ext = filename.rsplit('.', 1)[-1]
+    token = f'{secrets.token_hex(16)}.{ext}'
+    source = file.stream if hasattr(file, 'stream') else file
+    now = datetime.now(timezone.utc)
+    with open(os.path.join(directory, token), 'wb') as out:
+        for seq, data in enumerate(iter(lambda: source.read(STAGED_CHUNK_SIZE), b'')):
+            out.write(data)
+            # Core INSERT per chunk, so only one chunk is in memory at a time
+            db.session.execute(insert(StagedUploadChunk).values(
+                token=token, seq=seq, data=data, created_at=now))
+    db.session.commit()
+    return token
+
+
+def staged_upload_path(token: str) -> Optional[str]:
+    """Local path of a staged upload, or None if the token is unknown or expired.
+
+    A dyno that didn't receive the upload copies it from the database first.
+    """
+    if not token or not _STAGED_NAME_RE.match(token):
+        return None
+    path = os.path.join(_staging_dir(), token)
+    if os.path.exists(path):
+        return path
+
+    chunks = db.session.scalars(
+        select(StagedUploadChunk.data).where(StagedUploadChunk.token == token)
+        .order_by(StagedUploadChunk.seq)
+        .execution_options(yield_per=1))
+    partial = f'{path}.{secrets.token_hex(4)}.part'
+    found = False
+    with open(partial, 'wb') as out:
+        for data in chunks:
+            out.write(data)
+            found = True
+    if not found:
+        os.remove(partial)
+        return None
+    os.replace(partial, path)
+    return path
+
+
+def discard_staged_upload(token: str) -> None:
+    if not token or not _STAGED_NAME_RE.match(token):
+        return
+    path = os.path.join(_staging_dir(), token)
+    if os.path.exists(path):
+        os.remove(path)
+    db.session.execute(delete(StagedUploadChunk).where(StagedUploadChunk.token == token))
+    db.session.commit()
+
+
+def _purge_stale_uploads(directory: str) -> None:
+    max_age = current_app.config.get('IMPORT_UPLOAD_MAX_AGE', 86400)
+    db.session.execute(delete(StagedUploadChunk).where(
+        StagedUploadChunk.created_at < datetime.now(timezone.utc) - timedelta(seconds=max_age)))
+    cutoff = time.time() - max_age
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if _STAGED_NAME_RE.match(name) and os.path.getmtime(path) < cutoff:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# ---------------------------------------------------------------------------
+# Normalizing
+# ---------------------------------------------------------------------------
+
+def _max_length(column_name: str) -> Optional[int]:
+    return getattr(Platform.__table__.c[column_name].type, 'length', None)
+
+
+def row_to_record(row: List[str], col_map: Dict[str, int],
+                  parsers: Optional[Dict[str, Callable]] = None) -> Optional[dict]:
+    """Turn one spreadsheet row into a column dict for the platforms table.
+
+    ``parsers`` maps date/boolean fields to per-column parsers (see
+    import_profiles.build_parsers); fields without one use parse_date and
+    parse_bool. Returns None for blank rows; raises RowError for rows that
+    can't be imported.
+    """
+    parsers = parsers or {}
+    name = (_get_mapped(row, col_map, 'name') or '').strip()
+    url = (_get_mapped(row, col_map, 'url') or '').strip()
+
+    if not name and not url:
+        return None
+    if not url:
+        raise RowError('missing URL')
+    if not name:
+        name = url
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+
+    record = {'name': name, 'url': url, 'domain': normalize_domain(url)}
+    for field_name in TEXT_FIELDS:
+        record[field_name] = (_get_mapped(row, col_map, field_name) or '').strip() or None
+    for field_name in DATE_FIELDS:
+        parse = parsers.get(field_name, parse_date)
+        record[field_name] = parse(_get_mapped(row, col_map, field_name))
+    for field_name in BOOL_FIELDS:
+        parse = parsers.get(field_name, parse_bool)
+        value = _get_mapped(row, col_map, field_name)
+        record[field_name] = parse(value) if value and value.strip() else None
+    # Blank status and booleans stay None here; see INSERT_DEFAULTS
+    record['status'] = (_get_mapped(row, col_map, 'status') or '').strip() or None
+    for field_name, choices in CHOICE_FIELDS.items():
+        value = record[field_name]
+        if value is not None:
+            record[field_name] = normalize_choice(value, choices)
+            if record[field_name] is None:
+                raise RowError(f'{field_name} must be one of {", ".join(choices)}, not {value!r}')
+
+    for column_name, value in record.items():
+        limit = _max_length(column_name)
+        if limit and isinstance(value, str) and len(value) > limit:
+            raise RowError(f'{column_name} is longer than {limit} characters')
+    return record
+
+
+def iter_records(rows: Iterator[List[str]], col_map: Dict[str, int], result: ImportResult,
+                 parsers: Optional[Dict[str, Callable]] = None,
+                 first_row_num: int = 2) -> Iterator[dict]:
+    """Yield importable records, reporting bad rows on ``result`` as they come."""
+    for row_num, row in enumerate(rows, start=first_row_num):
+        try:
+            record = row_to_record(row, col_map, parsers)
+        except RowError as e:
+            result.add_error(f'Row {row_num}: {e}')
+            continue
+        if record is not None:
+            yield record
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def import_platforms(rows: Iterator[List[str]], col_map: Dict[str, int],
+                     mode: str = MODE_SKIP, batch_size: Optional[int] = None,
+                     parsers: Optional[Dict[str, Callable]] = None) -> ImportResult:
+    """Write platforms from the data rows (header already consumed).
+
+    Rows are keyed on their normalized domain. In ``skip`` mode existing
+    domains are left alone; in ``upsert`` mode they are updated, but only
+    the columns present in the sheet, never from a blank cell, and only
+    when a value differs.
+
+    Each batch is one executemany INSERT ... ON CONFLICT and its own commit,
+    so a failure part-way keeps the batches already written.
+    """
+    if _use_copy():
+        return copy_import_platforms(rows, col_map, mode, parsers)
+
+    batch_size = batch_size or current_app.config.get('IMPORT_BATCH_SIZE', 1000)
+    update_columns = _update_columns(col_map) if mode == MODE_UPSERT else []
+    result = ImportResult()
+    for batch in chunked(iter_records(rows, col_map, result, parsers), batch_size):
+        _write_batch(batch, update_columns, result)
+    return result
+
+
+def _update_columns(col_map: Dict[str, int]) -> List[str]:
+    """Columns an upsert may overwrite: those the sheet actually provides."""
+    return [c for c in IMPORT_COLUMNS if c in col_map]
+
+
+def _write_batch(batch: List[dict], update_columns: List[str], result: ImportResult) -> None:
+    # The last occurrence of a domain in the batch wins
+    by_domain: Dict[str, dict] = {}
+    no_domain: List[dict] = []
+    for record in batch:
+        if record['domain']:
+            by_domain[record['domain']] = record
+        else:
+            no_domain.append(record)
+    result.duplicates += len(batch) - len(by_domain) - len(no_domain)
+    records = list(by_domain.values()) + no_domain
+
+    existing = set(db.session.scalars(
+        select(Platform.domain).where(Platform.domain.in_(list(by_domain)))))
+    for record in records:
+        if record['domain'] not in existing:
+            for column, default in INSERT_DEFAULTS.items():
+                if record[column] is None:
+                    record[column] = default
+
+    table = Platform.__table__
+    stmt = dialect_insert(table)
+    if update_columns:
+        # A blank (NULL) cell keeps the stored value
+        merged = {c: func.coalesce(stmt.excluded[c], table.c[c]) for c in update_columns}
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['domain'],
+            set_={**merged, 'updated_at': datetime.now(timezone.utc)},
+            where=or_(*(table.c[c].is_distinct_from(merged[c]) for c in update_columns)),
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=['domain'])
+
+    # RETURNING only yields rows actually inserted or changed
+    written = len(db.session.execute(stmt.returning(table.c.id), records).all())
+    inserted = len(by_domain.keys() - existing) + len(no_domain)
+    stats.adjust({'platforms': inserted})
+    db.session.commit()
+
+    result.inserted += inserted
+    result.updated += max(written - inserted, 0)
+    result.unchanged += len(records) - max(written, inserted)
+    logger.info('Platform import: %d inserted, %d updated so far',
+                result.inserted, result.updated)
+
+
+# ---------------------------------------------------------------------------
+# PostgreSQL COPY fast path
+# ---------------------------------------------------------------------------
+
+def _use_copy() -> bool:
+    return (current_app.config.get('IMPORT_USE_COPY', True)
+            and db.session.get_bind().dialect.name == 'postgresql')
+
+
+class _CopyStream:
+    """File-like object that renders records as CSV on demand for COPY."""
+
+    def __init__(self, records: Iterator[dict], columns):
+        self._records = records
+        self._columns = columns
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator='\n')
+        self._pending = ''
+        self.count = 0
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._pending) < size:
+            record = next(self._records, None)
+            if record is None:
+                break
+            # Unquoted empty fields are NULL in COPY's CSV format
+            self._writer.writerow([record[c] for c in self._columns])
+            self.count += 1
+            self._pending += self._buffer.getvalue()
+            self._buffer.seek(0)
+            self._buffer.truncate()
+        if size < 0:
+            size = len(self._pending)
+        chunk, self._pending = self._pending[:size], self._pending[size:]
+        return chunk
+
+
+def _staged_values(columns, new_only: bool) -> str:
+    """SELECT list from the staging table with INSERT_DEFAULTS filled in.
+
+    With ``new_only`` the defaults apply only to domains not stored yet, so
+    a conflicting row keeps its NULLs and the upsert keeps stored values.
+    """
+    values = []
+    for c in columns:
+        if c not in INSERT_DEFAULTS:
+            values.append(c)
+            continue
+        default = INSERT_DEFAULTS[c]
+        default = str(default).upper() if isinstance(default, bool) else f"'{default}'"
+        if new_only:
+            values.append(f'CASE WHEN {c} IS NULL AND NOT EXISTS (SELECT 1 FROM platforms p '
+                          f'WHERE p.domain = {STAGING_TABLE}.domain) THEN {default} '
+                          f'ELSE {c} END AS {c}')
+        else:
+            values.append(f'COALESCE({c}, {default}) AS {c}')
+    return ', '.join(values)
+
+
+def copy_import_platforms(rows: Iterator[List[str]], col_map: Dict[str, int],
+                          mode: str = MODE_SKIP,
+                          parsers: Optional[Dict[str, Callable]] = None) -> ImportResult:
+    """Stream records into a staging table with COPY, then upsert set-based."""
+    result = ImportResult()
+    copy_columns = IMPORT_COLUMNS + ('domain',)
+    stream = _CopyStream(iter_records(rows, col_map, result, parsers), copy_columns)
+
+    connection = db.session.connection()
+    dialect = connection.dialect
+    column_defs = ', '.join(
+        f'{c} {Platform.__table__.c[c].type.compile(dialect=dialect)}' for c in copy_columns)
+    columns = ', '.join(copy_columns)
+    now = "timezone('utc', now())"
+
+    update_columns = _update_columns(col_map) if mode == MODE_UPSERT else []
+    if update_columns:
+        # A blank (NULL) cell keeps the stored value
+        merged = {c: f'COALESCE(EXCLUDED.{c}, platforms.{c})' for c in update_columns}
+        assignments = ', '.join(f'{c} = {merged[c]}' for c in update_columns)
+        changed = ' OR '.join(f'platforms.{c} IS DISTINCT FROM {merged[c]}'
+                              for c in update_columns)
+        on_conflict = f'DO UPDATE SET {assignments}, updated_at = {now} WHERE {changed}'
+    else:
+        on_conflict = 'DO NOTHING'
+
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        # seq keeps file order so the last row for a domain wins
+        cursor.execute(f'CREATE TEMP TABLE {STAGING_TABLE} '
+                       f'(seq bigserial, {column_defs}) ON COMMIT DROP')
+        cursor.copy_expert(f'COPY {STAGING_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv)',
+                           stream)
+
+        cursor.execute(f'SELECT count(domain), count(DISTINCT domain) FROM {STAGING_TABLE}')
+        with_domain, distinct_domains = cursor.fetchone()
+        result.duplicates = with_domain - distinct_domains
+
+        # Rows without a domain can never conflict
+        cursor.execute(
+            f'INSERT INTO platforms ({columns}, created_at, updated_at) '
+            f'SELECT {_staged_values(copy_columns, new_only=False)}, {now}, {now} '
+            f'FROM {STAGING_TABLE} WHERE domain IS NULL'
+        )
+        result.inserted = cursor.rowcount
+
+        cursor.execute(
+            f'WITH written AS ('
+            f'  INSERT INTO platforms ({columns}, created_at, updated_at)'
+            f'  SELECT DISTINCT ON (domain) {_staged_values(copy_columns, new_only=True)},'
+            f'  {now}, {now} FROM {STAGING_TABLE}'
+            f'  WHERE domain IS NOT NULL ORDER BY domain, seq DESC'
+            f'  ON CONFLICT (domain) {on_conflict}'
+            f'  RETURNING (xmax = 0) AS inserted'
+            f') SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) '
+            f'FROM written'
+        )
+        inserted, updated = cursor.fetchone()
+        result.inserted += inserted
+        result.updated = updated
+        result.unchanged = distinct_domains - inserted - updated
+    finally:
+        cursor.close()
+
+    stats.adjust({'platforms': result.inserted})
+    response_cache.bump(['platforms'])  # COPY bypasses the session's write hooks
+    db.session.commit()
+    logger.info('Platform import (COPY): %d rows staged, %d inserted, %d updated',
+                stream.count, result.inserted, result.updated)
+    return result
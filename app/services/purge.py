@@ -0,0 +1,203 @@
+"""
+Chunked background purge ("Delete All" and other large cascades).
+
+Deleting every platform in one statement would lock platforms, targets
+and outreach_emails for as long as the whole cascade takes. A purge
+instead works through the dependent tables in order (a platform's
+targets' emails, its targets, then the platforms), deleting at most
+PURGE_BATCH_SIZE rows per transaction, so reads and sends carry on
+between batches.
+
+Only rows that existed when the purge started are removed: the highest
+ID is captured up front and every stage is bounded by it. Progress lives
+in the ``PURGE_JOB`` app setting, written in the same transaction as each
+batch, so a purge interrupted by a restart resumes where it stopped
+(``flask purge --resume``).
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from flask import current_app
+from sqlalchemy import func, or_, select, update
+
+from app import db
+from app.models import AppSetting, Campaign, OutreachEmail, Platform, Target
+from app.services.bulk_actions import delete_where
+
+logger = logging.getLogger(__name__)
+
+JOB_KEY = 'PURGE_JOB'
+
+MODELS = {'platforms': Platform, 'campaigns': Campaign}
+
+
+class PurgeError(RuntimeError):
+    pass
+
+
+def _stages(kind: str, max_id: int) -> List[tuple]:
+    """``[(name, model, criteria, values)]`` in dependency order.
+
+    ``values`` is None for a DELETE, or the columns an UPDATE sets to
+    detach rows that are kept.
+    """
+    if kind == 'platforms':
+        targets = select(Target.id).where(Target.platform_id <= max_id)
+        return [
+            ('emails', OutreachEmail, [OutreachEmail.target_id.in_(targets)], None),
+            ('targets', Target, [Target.platform_id <= max_id], None),
+            # Emails sent to a platform without a target just lose the link
+            ('unlinked emails', OutreachEmail,
+             [OutreachEmail.platform_id <= max_id,
+              or_(OutreachEmail.target_id.is_(None), OutreachEmail.target_id.not_in(targets))],
+             {'platform_id': None}),
+            ('platforms', Platform, [Platform.id <= max_id], None),
+        ]
+    if kind == 'campaigns':
+        return [
+            ('emails', OutreachEmail, [OutreachEmail.campaign_id <= max_id], None),
+            ('campaigns', Campaign, [Campaign.id <= max_id], None),
+        ]
+    raise PurgeError(f'Cannot purge {kind}.')
+
+
+# ---------------------------------------------------------------------------
+# Job state
+# ---------------------------------------------------------------------------
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def status() -> Optional[dict]:
+    """The current (or last) purge job, or None if there has never been one."""
+    raw = AppSetting.get(JOB_KEY, '')
+    return json.loads(raw) if raw else None
+
+
+def _save(job: dict) -> None:
+    job['updated_at'] = _now()
+    AppSetting.set(JOB_KEY, json.dumps(job))
+
+
+def is_running(job: Optional[dict]) -> bool:
+    """A job is running if it isn't finished and has reported progress recently."""
+    if not job or job['status'] != 'running':
+        return False
+    stale_after = current_app.config.get('PURGE_STALE_SECONDS', 300)
+    updated = datetime.fromisoformat(job['updated_at'])
+    return (datetime.now(timezone.utc) - updated).total_seconds() < stale_after
+
+
+def start(kind: str) -> dict:
+    """Record a new purge of every ``kind`` row that exists now (caller runs it)."""
+    model = MODELS.get(kind)
+    if model is None:
+        raise PurgeError(f'Cannot purge {kind}.')
+    if is_running(status()):
+        raise PurgeError('A purge is already running.')
+
+    max_id = db.session.scalar(select(func.max(model.id))) or 0
+    stages = _stages(kind, max_id)
+    job = {
+        'kind': kind,
+        'max_id': max_id,
+        'status': 'running',
+        'stage': stages[0][0],
+        'total': {name: db.session.scalar(select(func.count()).select_from(m).where(*criteria))
+                  for name, m, criteria, _ in stages},
+        'done': {name: 0 for name, _, _, _ in stages},
+        'started_at': _now(),
+        'finished_at': None,
+        'error': None,
+    }
+    _save(job)
+    db.session.commit()
+    logger.info('Purge of %s up to id %d started: %s', kind, max_id, job['total'])
+    return job
+
+
+# ---------------------------------------------------------------------------
+# Running
+# ---------------------------------------------------------------------------
+
+def run(job: dict, progress=None) -> dict:
+    """Work through ``job``'s stages a batch at a time until done.
+
+    Safe to call again on an interrupted job; finished stages match no
+    rows. ``progress(job)`` is called after every batch.
+    """
+    size = current_app.config.get('PURGE_BATCH_SIZE', 1000)
+    pause = current_app.config.get('PURGE_BATCH_PAUSE', 0)
+    try:
+        for name, model, criteria, values in _stages(job['kind'], job['max_id']):
+            job['stage'] = name
+            while True:
+                ids = db.session.scalars(
+                    select(model.id).where(*criteria).order_by(model.id).limit(size)
+                ).all()
+                if not ids:
+                    break
+                if values is None:
+                    affected = delete_where(model, model.id.in_(ids))
+                else:
+                    affected = db.session.execute(
+                        update(model).where(model.id.in_(ids))
+                        .values(**values, updated_at=datetime.now(timezone.utc)),
+                        execution_options={'synchronize_session': False},
+                    ).rowcount
+                job['done'][name] += affected
+                _save(job)
+                db.session.commit()
+                if progress:
+                    progress(job)
+                if pause:
+                    time.sleep(pause)
+    except Exception as exc:
+        db.session.rollback()
+        job.update(status='failed', error=str(exc))
+        _save(job)
+        db.session.commit()
+        logger.exception('Purge of %s failed', job['kind'])
+        raise
+
+    job.update(status='done', finished_at=_now())
+    _save(job)
+    db.session.commit()
+    logger.info('Purge of %s finished: %s', job['kind'], job['done'])
+    return job
+
+
+def _run_in_thread(app, job: dict) -> None:
+    with app.app_context():
+        try:
+            run(job)
+        except Exception:
+            pass  # recorded on the job and logged by run()
+        finally:
+            db.session.remove()
+
+
+def start_in_background(kind: str) -> dict:
+    """Start a purge and run it on a daemon thread; returns the new job."""
+    job = start(kind)
+    threading.Thread(target=_run_in_thread, daemon=True,
+                     args=(current_app._get_current_object(), dict(job))).start()
+    return job
+
+
+def resume(progress=None) -> dict:
+    """Carry on with an interrupted purge in the foreground."""
+    job = status()
+    if not job or job['status'] == 'done':
+        raise PurgeError('There is no unfinished purge.')
+    if is_running(job):
+        raise PurgeError('The purge is still running.')
+    job.update(status='running', error=None)
+    _save(job)
+    db.session.commit()
+    return run(job, progress)
@@ -0,0 +1,92 @@
+"""
+Per-request SQL statement budgets.
+
+Decorate a view with ``@query_budget(n)`` to declare how many SQL
+statements it may issue (template rendering included). Every statement
+executed while the view runs is counted; going over budget raises
+QueryBudgetExceeded when QUERY_BUDGET_ENFORCE is set (TestingConfig), and
+is logged as a warning otherwise. An N+1 shows up as a budget failure as
+soon as a page holds more rows than the budget allows for.
+
+For a streamed response the count carries on while the body is generated
+and is checked once it has been sent.
+"""
+import functools
+import logging
+
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_listening = False
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class _Counter:
+    def __init__(self):
+        self.used = 0
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and g.get('query_budget') is not None:
+        g.query_budget.used += 1
+
+
+def init_app(app) -> None:
+    """Start counting statements (once per process)."""
+    global _listening
+    if not _listening:
+        event.listen(Engine, 'before_cursor_execute', _count_statement)
+        _listening = True
+
+
+def _check(used: int, limit: int, endpoint: str, enforce: bool) -> None:
+    if used > limit:
+        message = f'{endpoint} issued {used} SQL statements (budget {limit})'
+        if enforce:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def _counted(chunks, counter: _Counter, *check_args):
+    """Yield a streamed body, checking the budget once it is complete.
+
+    The request context may already be gone by then, so everything the
+    check needs is passed in.
+    """
+    try:
+        yield from chunks
+    finally:
+        if has_app_context() and g.get('query_budget') is counter:
+            g.query_budget = None
+    _check(counter.used, *check_args)
+
+
+def query_budget(limit: int):
+    """Declare the most SQL statements a view may issue."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            counter = g.query_budget = _Counter()
+            try:
+                response = view(*args, **kwargs)
+            except BaseException:
+                g.query_budget = None
+                raise
+
+            check_args = (limit, request.endpoint,
+                          current_app.config.get('QUERY_BUDGET_ENFORCE', False))
+            if getattr(response, 'is_streamed', False):
+                response.response = _counted(response.response, counter, *check_args)
+                return response
+            g.query_budget = None
+            _check(counter.used, *check_args)
+            return response
+        wrapper.query_budget = limit
+        return wrapper
+    return decorator
@@ -0,0 +1,87 @@
+"""
+Column-projected read models for the list and bulk pages.
+
+Each function returns a ``select()`` of just the columns a page shows,
+with related names joined in as labelled columns instead of loaded
+objects. Executing one yields plain ``Row`` tuples: nothing goes into the
+session's identity map, no attribute instrumentation or change tracking
+is set up per row, and wide Text columns are either left out or cut to a
+preview in SQL, so they never leave the database in full.
+
+Rows keep attribute access (``row.name``) and always carry ``id`` and
+``created_at``, so they page with ``keyset_page`` like ORM queries do.
+"""
+from sqlalchemy import func, select
+
+from app.models import Campaign, EmailTemplate, OutreachEmail, Platform, Target
+
+# Characters of Text columns fetched for list-page previews and tooltips
+PREVIEW_CHARS = 300
+
+
+def _preview(column, length: int = PREVIEW_CHARS):
+    return func.substr(column, 1, length).label(column.key)
+
+
+def platform_list():
+    return select(
+        Platform.id, Platform.tier, Platform.name, Platform.url, Platform.submission_type,
+        Platform.topic_to_submit, Platform.difficulty, Platform.contact_name,
+        Platform.contact_email, Platform.pitch_sent_date, Platform.article_sent_date,
+        Platform.follow_up_1, Platform.follow_up_2, Platform.response_date, Platform.status,
+        _preview(Platform.notes), Platform.publication_date, Platform.live_url,
+        Platform.backlink_confirmed, Platform.created_at,
+    )
+
+
+def target_list():
+    return (
+        select(Target.id, Target.target_url, Target.target_page_title, Target.our_url,
+               Target.status, Target.priority, Target.created_at,
+               Platform.name.label('platform_name'))
+        .join(Platform, Target.platform_id == Platform.id)
+    )
+
+
+def campaign_list():
+    return select(Campaign.id, Campaign.name, _preview(Campaign.description), Campaign.status,
+                  Campaign.created_at)
+
+
+def email_list():
+    return (
+        select(OutreachEmail.id, OutreachEmail.subject, OutreachEmail.recipient_email,
+               OutreachEmail.target_id, OutreachEmail.platform_id, OutreachEmail.status,
+               OutreachEmail.sent_at, OutreachEmail.created_at,
+               Target.target_page_title, Target.target_url,
+               Platform.name.label('platform_name'), Campaign.name.label('campaign_name'))
+        .outerjoin(Target, OutreachEmail.target_id == Target.id)
+        .outerjoin(Platform, OutreachEmail.platform_id == Platform.id)
+        .outerjoin(Campaign, OutreachEmail.campaign_id == Campaign.id)
+    )
+
+
+def template_list():
+    # Enough of the body for a 150-character text preview once tags are stripped
+    return select(EmailTemplate.id, EmailTemplate.name, EmailTemplate.subject,
+                  _preview(EmailTemplate.body_html, 2000), EmailTemplate.created_at)
+
+
+# Platform fields the email template engine reads
+RENDER_COLUMNS = (Platform.id, Platform.name, Platform.url, Platform.tier,
+                  Platform.topic_to_submit, Platform.contact_name, Platform.contact_email)
+
+
+def render_rows():
+    """Platforms with just what rendering and sending a template needs."""
+    return select(*RENDER_COLUMNS)
+
+
+def bulk_send_recipients():
+    """Platforms with a contact email, for the bulk send checklist."""
+    return (
+        select(Platform.id, Platform.name, Platform.tier, Platform.status,
+               Platform.contact_name, Platform.contact_email)
+        .where(Platform.contact_email.isnot(None), Platform.contact_email != '')
+        .order_by(Platform.name)
+    )
@@ -0,0 +1,202 @@
+"""
+Reply / bounce sync — incremental Gmail mailbox scan.
+
+Uses Gmail's history.list with a stored historyId checkpoint so each run
+only sees messages added since the previous one. New inbound messages are
+matched to OutreachEmail rows by thread ID (and by gmail_message_id, since
+Gmail reuses the first message's ID as the thread ID for older rows that
+never stored a thread ID), then statuses are updated with a handful of
+set-based UPDATEs: replied emails and their targets and platforms (which
+get a response date and the 'Responded' status), and bounced emails.
+
+``GMAIL_API_ENDPOINT`` points the Gmail client at a local fake server, as
+tests/test_reply_sync.py does.
+"""
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Set
+
+from sqlalchemy import or_, select, update
+
+from app import db
+from app.models import AppSetting, OutreachEmail, Target, Platform
+from app.services import stats
+from app.services.gmail_service import HistoryExpiredError
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_KEY = 'GMAIL_HISTORY_ID'
+
+# Thread IDs matched against outreach_emails per query
+MATCH_BATCH_SIZE = 500
+
+# Labels on messages we added ourselves; never a reply
+OWN_LABELS = {'SENT', 'DRAFT'}
+
+BOUNCE_SENDERS = ('mailer-daemon@', 'postmaster@')
+
+# Statuses a reply or bounce may overwrite
+OPEN_STATUSES = ('sent', 'delivered')
+
+# Platform statuses a reply moves on to 'Responded' (Published/Rejected stay)
+AWAITING_PLATFORM_STATUSES = ('Not Started', 'Pitch Sent', 'Article Sent', 'Follow-up')
+
+
+@dataclass
+class SyncResult:
+    messages_seen: int = 0
+    replied: int = 0
+    bounced: int = 0
+    history_id: str = ''
+    reset: bool = False
+
+
+def _classify(headers: Dict[str, str]) -> str:
+    """Return 'bounce', 'reply' or '' (ignore) for an inbound message."""
+    sender = headers.get('from', '').lower()
+    content_type = headers.get('content-type', '').lower()
+    if any(s in sender for s in BOUNCE_SENDERS) or 'report-type=delivery-status' in content_type:
+        return 'bounce'
+    # Out-of-office and other auto-responders aren't real replies
+    auto = headers.get('auto-submitted', '').lower()
+    if auto and auto != 'no':
+        return ''
+    return 'reply'
+
+
+def _match_threads(thread_ids: List[str]) -> Dict[str, list]:
+    """Map thread ID -> outreach rows sent in that thread."""
+    matches: Dict[str, list] = {}
+    for i in range(0, len(thread_ids), MATCH_BATCH_SIZE):
+        batch = thread_ids[i:i + MATCH_BATCH_SIZE]
+        rows = db.session.execute(
+            select(OutreachEmail.id, OutreachEmail.target_id, OutreachEmail.platform_id,
+                   OutreachEmail.gmail_thread_id, OutreachEmail.gmail_message_id)
+            .where(or_(OutreachEmail.gmail_thread_id.in_(batch),
+                       OutreachEmail.gmail_message_id.in_(batch)))
+        ).all()
+        for row in rows:
+            thread = row.gmail_thread_id or row.gmail_message_id
+            matches.setdefault(thread, []).append(row)
+    return matches
+
+
+def _apply(replied_rows: list, bounced_rows: list) -> None:
+    """Write the collected status changes in set-based statements."""
+    now = datetime.now(timezone.utc)
+
+    replied_ids = sorted({r.id for r in replied_rows})
+    # A reply in the same thread wins over a bounce notification
+    bounced_ids = sorted({r.id for r in bounced_rows} - set(replied_ids))
+
+    deltas = Counter()
+    for i in range(0, len(replied_ids), MATCH_BATCH_SIZE):
+        criteria = (OutreachEmail.id.in_(replied_ids[i:i + MATCH_BATCH_SIZE]),
+                    OutreachEmail.status.in_(OPEN_STATUSES + ('bounced',)))
+        deltas.update(stats.status_moves(
+            'outreach_emails', stats.status_counts(OutreachEmail, *criteria), 'replied'))
+        db.session.execute(
+            update(OutreachEmail).where(*criteria).values(status='replied', updated_at=now)
+        )
+    for i in range(0, len(bounced_ids), MATCH_BATCH_SIZE):
+        criteria = (OutreachEmail.id.in_(bounced_ids[i:i + MATCH_BATCH_SIZE]),
+                    OutreachEmail.status.in_(OPEN_STATUSES))
+        deltas.update(stats.status_moves(
+            'outreach_emails', stats.status_counts(OutreachEmail, *criteria), 'bounced'))
+        db.session.execute(
+            update(OutreachEmail).where(*criteria).values(status='bounced', updated_at=now)
+        )
+
+    target_ids = sorted({r.target_id for r in replied_rows if r.target_id})
+    for i in range(0, len(target_ids), MATCH_BATCH_SIZE):
+        criteria = (Target.id.in_(target_ids[i:i + MATCH_BATCH_SIZE]),
+                    Target.status.in_(('identified', 'contacted')))
+        deltas.update(stats.status_moves(
+            'targets', stats.status_counts(Target, *criteria), 'negotiating'))
+        db.session.execute(
+            update(Target).where(*criteria).values(status='negotiating', updated_at=now)
+        )
+    stats.adjust(deltas)
+
+    platform_ids = sorted({r.platform_id for r in replied_rows if r.platform_id})
+    for i in range(0, len(platform_ids), MATCH_BATCH_SIZE):
+        batch = Platform.id.in_(platform_ids[i:i + MATCH_BATCH_SIZE])
+        db.session.execute(
+            update(Platform)
+            .where(batch, Platform.response_date.is_(None))
+            .values(response_date=now.date(), updated_at=now)
+        )
+        db.session.execute(
+            update(Platform)
+            .where(batch, or_(Platform.status.is_(None),
+                              Platform.status.in_(AWAITING_PLATFORM_STATUSES)))
+            .values(status='Responded', updated_at=now)
+        )
+
+
+def sync_replies(gmail) -> SyncResult:
+    """Pull mailbox changes since the last checkpoint and update statuses.
+
+    The first run (or a run whose checkpoint Gmail has expired) only
+    records the current historyId; nothing older is scanned.
+    """
+    result = SyncResult()
+    checkpoint = AppSetting.get(CHECKPOINT_KEY, '')
+
+    if not checkpoint:
+        result.history_id = str(gmail.get_history_id())
+        result.reset = True
+        AppSetting.set(CHECKPOINT_KEY, result.history_id)
+        db.session.commit()
+        return result
+
+    # thread ID -> inbound message IDs, in arrival order
+    inbound: Dict[str, List[str]] = {}
+    seen: Set[str] = set()
+    latest = checkpoint
+    try:
+        for page in gmail.iter_history_pages(checkpoint):
+            latest = page.get('historyId', latest)
+            for record in page.get('history', []):
+                for added in record.get('messagesAdded', []):
+                    msg = added.get('message', {})
+                    if msg.get('id') in seen or OWN_LABELS & set(msg.get('labelIds', [])):
+                        continue
+                    seen.add(msg['id'])
+                    inbound.setdefault(msg['threadId'], []).append(msg['id'])
+    except HistoryExpiredError:
+        logger.warning('Gmail history checkpoint %s expired; resetting', checkpoint)
+        result.history_id = str(gmail.get_history_id())
+        result.reset = True
+        AppSetting.set(CHECKPOINT_KEY, result.history_id)
+        db.session.commit()
+        return result
+
+    result.messages_seen = len(seen)
+    matches = _match_threads(list(inbound))
+
+    replied_rows, bounced_rows = [], []
+    for thread_id, rows in matches.items():
+        kinds = {
+            _classify(gmail.get_message_headers(
+                message_id, ('From', 'Content-Type', 'Auto-Submitted')))
+            for message_id in inbound.get(thread_id, [])
+        }
+        if 'reply' in kinds:
+            replied_rows.extend(rows)
+        elif 'bounce' in kinds:
+            bounced_rows.extend(rows)
+
+    _apply(replied_rows, bounced_rows)
+    result.replied = len({r.id for r in replied_rows})
+    result.bounced = len({r.id for r in bounced_rows} - {r.id for r in replied_rows})
+    result.history_id = str(latest)
+
+    # Status updates and the new checkpoint land in the same transaction
+    AppSetting.set(CHECKPOINT_KEY, result.history_id)
+    db.session.commit()
+    logger.info('Reply sync: %d new messages, %d replied, %d bounced',
+                result.messages_seen, result.replied, result.bounced)
+    return result
@@ -0,0 +1,186 @@
+"""
+Server-side cache for rendered pages, invalidated by table version stamps.
+
+Every content table has a version stamp (``version.<table>`` in
+``stat_counters``), bumped in the same transaction as any write to it:
+
+* ORM flushes are picked up by an ``after_flush`` hook;
+* Core INSERT/UPDATE/DELETE run through the session by ``do_orm_execute``;
+* raw-connection writes (the COPY import) call ``bump`` themselves.
+
+A stamp is the write time in microseconds (or the previous stamp + 1 if
+that is later), so it is both a version and a last-modified time, and
+it also moves on deletes, which ``max(updated_at)`` would miss.
+
+Views decorated with ``@cached_response(*tables)`` read the stamps of the
+tables they show (one query). The page is cached in a per-process LRU
+keyed on the route, its query args, those stamps, the session's CSRF
+token and a time bucket of half WTF_CSRF_TIME_LIMIT (pages embed forms,
+and their signed tokens expire). The response carries an ETag built
+from the same key and a Last-Modified header, so browsers revalidate
+with a 304 that needs no rendering at all, but never keep a page whose
+CSRF token another session or the clock has made invalid. Pages rendered with pending flash messages are never
+cached. A streamed page is cached as it goes out, once the whole body has
+been sent.
+"""
+import functools
+import hashlib
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable
+
+from flask import current_app, request, session
+from sqlalchemy import case, event, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import StatCounter
+from app.services.bulk import dialect_insert
+from app.services.cache import LRUCache
+
+# Tables whose writes invalidate cached pages
+TABLES = frozenset({'platforms', 'targets', 'campaigns', 'outreach_emails',
+                    'email_templates', 'app_settings'})
+
+_cache = LRUCache(maxsize=256)
+_listening = False
+
+
+def version_key(table: str) -> str:
+    return f'version.{table}'
+
+
+# ---------------------------------------------------------------------------
+# Version stamps
+# ---------------------------------------------------------------------------
+
+def bump(tables: Iterable[str], connection=None) -> None:
+    """Move the version stamp of each table forward (caller commits)."""
+    tables = sorted(set(tables) & TABLES)
+    if not tables:
+        return
+    now = time.time_ns() // 1000
+    table = StatCounter.__table__
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(index_elements=['key'], set_={'value': case(
+        (table.c.value + 1 > stmt.excluded.value, table.c.value + 1),
+        else_=stmt.excluded.value,
+    )})
+    (connection or db.session).execute(stmt, [{'key': version_key(t), 'value': now}
+                                              for t in tables])
+
+
+def versions(tables: Iterable[str]) -> Dict[str, int]:
+    """Current stamp per table (0 if it was never written)."""
+    tables = sorted(tables)
+    stored = dict(db.session.execute(
+        select(StatCounter.key, StatCounter.value)
+        .where(StatCounter.key.in_([version_key(t) for t in tables]))
+    ).all())
+    return {t: stored.get(version_key(t), 0) for t in tables}
+
+
+def _after_flush(session, flush_context) -> None:
+    written = {obj.__tablename__ for obj in session.new | session.deleted}
+    written |= {obj.__tablename__ for obj in session.dirty if session.is_modified(obj)}
+    if written & TABLES:
+        bump(written, connection=session.connection())
+
+
+def _do_orm_execute(state) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, 'table', None)
+        if table is not None and table.name in TABLES:
+            bump([table.name], connection=state.session.connection())
+
+
+def init_app(app) -> None:
+    """Register the write hooks (once per process) and size the cache."""
+    global _listening
+    _cache.maxsize = app.config.get('RESPONSE_CACHE_SIZE', 256)
+    if _listening:
+        return
+    event.listen(Session, 'after_flush', _after_flush)
+    event.listen(Session, 'do_orm_execute', _do_orm_execute)
+    _listening = True
+
+
+# ---------------------------------------------------------------------------
+# Cached views
+# ---------------------------------------------------------------------------
+
+def _csrf_session_token() -> str:
+    """The session's raw CSRF token, created now if the page would create it."""
+    from flask_wtf.csrf import generate_csrf
+    generate_csrf()
+    field = current_app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token')
+    return session.get(field, '')
+
+
+def _csrf_bucket() -> int:
+    """Changes every half WTF_CSRF_TIME_LIMIT, so a page reused within one
+    bucket still has at least half the limit left on its token."""
+    limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600)
+    return int(time.time() // max(limit // 2, 1)) if limit else 0
+
+
+def _store_when_sent(chunks, key, mimetype):
+    """Pass a streamed body through, caching it if it completes."""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    body = b''.join(p.encode() if isinstance(p, str) else p for p in parts)
+    _cache.set(key, (time.monotonic(), body, mimetype))
+
+
+def cached_response(*tables: str):
+    """Cache a GET view's page until one of ``tables`` is written."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            ttl = current_app.config.get('RESPONSE_CACHE_TTL', 0)
+            if not ttl or request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            stamps = versions(tables)
+            csrf_token = hashlib.sha1(_csrf_session_token().encode()).hexdigest()
+            key_source = '|'.join([
+                request.path,
+                '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True))),
+                ','.join(f'{t}:{v}' for t, v in sorted(stamps.items())),
+                csrf_token,
+                str(_csrf_bucket()),
+            ])
+            etag = hashlib.sha1(key_source.encode()).hexdigest()
+            newest = max(stamps.values())
+            last_modified = (datetime.fromtimestamp(newest / 1e6, timezone.utc)
+                             if newest else None)
+
+            # Weak comparison: compression hands out a weak form of the ETag
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                key = etag
+                entry = _cache.get(key)
+                if entry is not None and time.monotonic() - entry[0] < ttl:
+                    response = current_app.response_class(entry[1], mimetype=entry[2])
+                else:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code == 200 and not session.get('_flashes'):
+                        if response.is_streamed:
+                            response.response = _store_when_sent(response.response, key,
+                                                                 response.mimetype)
+                        else:
+                            _cache.set(key, (time.monotonic(), response.get_data(),
+                                             response.mimetype))
+
+            if response.status_code in (200, 304):
+                response.set_etag(etag)
+                if last_modified:
+                    response.last_modified = last_modified
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,235 @@
+"""
+Full-text search over platforms, targets and outreach emails.
+
+The indexes are maintained by the database itself, so every write path
+(ORM, Core bulk INSERT/UPDATE, COPY, deletes) keeps them current:
+
+* PostgreSQL: each table has a stored generated ``search_vector``
+  tsvector column with a GIN index (migration 012). Queries are parsed
+  with ``websearch_to_tsquery`` (quotes, OR, -exclusions) and ranked with
+  ``ts_rank_cd``.
+* SQLite: an external-content FTS5 table per model (``<table>_fts``)
+  kept in sync by triggers, ranked with ``bm25``.
+
+Email bodies are stored once per distinct text in ``email_bodies``
+(see app/services/email_bodies.py), which is indexed as a document of
+its own: an email matches on its subject and recipient or on its stored
+body, and its rank is the sum of both. For templated emails the stored
+body is the template text, so the per-recipient placeholder values are
+not searchable there (they are the platform's fields, found by a
+platform search).
+
+Columns are weighted: the name/title/subject counts most, then URLs and
+contacts, then free text (notes, email body). On PostgreSQL only the
+SEARCH_MAX_CANDIDATES most recent matches (found via the GIN index) are
+ranked, which keeps very common terms fast on large tables. Past that
+many matches the ranking is approximate: an older row is left out even
+if it would rank higher, so narrow the query to reach it.
+"""
+import re
+from typing import List, Optional
+
+from flask import current_app
+from sqlalchemy import column, event, func, literal_column, select, table, union_all
+
+from app import db
+from app.models import EmailBody, OutreachEmail, Platform, Target
+
+TS_CONFIG = 'english'
+
+# kind -> (model, [(column, weight)]); weights A (highest) to C
+DOCUMENTS = {
+    'platforms': (Platform, [('name', 'A'), ('url', 'B'), ('contact_name', 'B'),
+                             ('contact_email', 'B'), ('notes', 'C')]),
+    'targets': (Target, [('target_page_title', 'A'), ('target_url', 'B')]),
+    'emails': (OutreachEmail, [('subject', 'A'), ('recipient_email', 'B')]),
+}
+
+# kind -> (model, [(column, weight)], foreign key to it): a document whose
+# matches also count for the kind's rows that reference it
+LINKED = {
+    'emails': (EmailBody, [('body', 'C')], OutreachEmail.body_id),
+}
+
+# bm25 column weights standing in for the tsvector A/B/C weights
+BM25_WEIGHTS = {'A': 10.0, 'B': 5.0, 'C': 1.0}
+
+
+class SearchPage:
+    """One page of ``(row, rank)`` results."""
+
+    def __init__(self, items: list, page: int, per_page: int, has_next: bool):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.has_next = has_next
+
+    @property
+    def has_prev(self) -> bool:
+        return self.page > 1
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __bool__(self) -> bool:
+        return bool(self.items)
+
+
+# ---------------------------------------------------------------------------
+# SQLite FTS5 objects
+# ---------------------------------------------------------------------------
+
+def fts_table(table: str) -> str:
+    return f'{table}_fts'
+
+
+def sqlite_ddl(table: str, columns: List[str]) -> List[str]:
+    """Statements creating the FTS5 table and sync triggers for ``table``."""
+    fts = fts_table(table)
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{c}' for c in columns)
+    old = ', '.join(f'old.{c}' for c in columns)
+    delete_old = (f"INSERT INTO {fts}({fts}, rowid, {cols}) "
+                  f"VALUES ('delete', old.id, {old});")
+    insert_new = f'INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{cols}, content='{table}', content_rowid='id', tokenize='porter unicode61')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} '
+        f'BEGIN {delete_old} {insert_new} END',
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _indexed():
+    """(model, columns) of every table with a full-text index."""
+    return [(model, columns) for model, columns in DOCUMENTS.values()] + \
+        [(model, columns) for model, columns, _ in LINKED.values()]
+
+
+def _create_sqlite_fts(target, connection, **kw) -> None:
+    if connection.dialect.name != 'sqlite':
+        return
+    for model, columns in _indexed():
+        for statement in sqlite_ddl(model.__tablename__, [c for c, _ in columns]):
+            connection.exec_driver_sql(statement)
+
+
+def init_app(app) -> None:
+    """Have db.create_all() build the FTS5 tables too (tests, scratch
+    databases); migrated databases get them from migrations 012 and 014."""
+    if not event.contains(db.metadata, 'after_create', _create_sqlite_fts):
+        event.listen(db.metadata, 'after_create', _create_sqlite_fts)
+
+
+def database_managed(name: Optional[str]) -> bool:
+    """Whether a reflected object is one of ours that the models don't declare.
+
+    Used by migrations/env.py so autogenerate leaves them alone.
+    """
+    if not name:
+        return False
+    if name == 'search_vector' or name.endswith('_search_vector'):
+        return True
+    return any(name.startswith(fts_table(model.__tablename__)) for model, _ in _indexed())
+
+
+# ---------------------------------------------------------------------------
+# Querying
+# ---------------------------------------------------------------------------
+
+_TERM = re.compile(r'\w[\w@.\-]*', re.UNICODE)
+
+
+def fts5_query(q: str) -> str:
+    """Turn free text into a safe FTS5 query: every term, last one as a prefix."""
+    terms = [t.strip('.-') for t in _TERM.findall(q)]
+    terms = ['"{}"'.format(t.replace('"', '')) for t in terms if t]
+    if terms:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _summed(model, matches):
+    """Rows of ``model`` with the summed rank of their ``(id, rank)`` matches."""
+    if len(matches) == 1:
+        return matches[0].subquery()
+    matched = union_all(*matches).subquery()
+    return (select(matched.c.id, func.sum(matched.c.rank).label('rank'))
+            .group_by(matched.c.id).subquery())
+
+
+def _ranked_postgres(model, q: str, linked=None):
+    query = func.websearch_to_tsquery(TS_CONFIG, q)
+    limit = current_app.config.get('SEARCH_MAX_CANDIDATES', 5000)
+
+    def vector(owner):
+        return literal_column(f'{owner.__tablename__}.search_vector')
+
+    # The cap keeps the newest matches, not whichever the scan found first
+    newest = (model.created_at.desc(), model.id.desc())
+    matches = [select(model.id.label('id'), func.ts_rank_cd(vector(model), query).label('rank'))
+               .where(vector(model).bool_op('@@')(query))
+               .order_by(*newest).limit(limit)]
+    if linked:
+        other, _, foreign_key = linked
+        matches.append(
+            select(model.id.label('id'), func.ts_rank_cd(vector(other), query).label('rank'))
+            .join(other, foreign_key == other.id)
+            .where(vector(other).bool_op('@@')(query))
+            .order_by(*newest).limit(limit))
+    candidates = _summed(model, matches)
+    return (select(model, candidates.c.rank)
+            .join(candidates, candidates.c.id == model.id)
+            .order_by(candidates.c.rank.desc(), model.id.desc()))
+
+
+def _bm25_matches(indexed, columns, match, model, key):
+    """``(id, bm25)`` of ``model`` rows whose ``key`` is a matching ``indexed`` row."""
+    fts = fts_table(indexed.__tablename__)
+    weights = ', '.join(str(BM25_WEIGHTS[w]) for _, w in columns)
+    fts_rows = table(fts, column('rowid'))
+    return (select(model.id.label('id'), literal_column(f'bm25({fts}, {weights})').label('rank'))
+            .join(fts_rows, fts_rows.c.rowid == key)
+            .where(literal_column(fts).op('MATCH')(match)))
+
+
+def _ranked_sqlite(model, q: str, columns, linked=None):
+    match = fts5_query(q)
+    if not match:
+        return None
+    matches = [_bm25_matches(model, columns, match, model, model.id)]
+    if linked:
+        other, other_columns, foreign_key = linked
+        matches.append(_bm25_matches(other, other_columns, match, model, foreign_key))
+    # bm25 is lower for better matches, so summing and sorting ascending works
+    candidates = _summed(model, matches)
+    return (select(model, candidates.c.rank)
+            .join(candidates, candidates.c.id == model.id)
+            .order_by(candidates.c.rank, model.id.desc()))
+
+
+def search(kind: str, q: str, page: int = 1, per_page: int = 20) -> SearchPage:
+    """One page of ``kind`` rows matching ``q``, best match first."""
+    model, columns = DOCUMENTS[kind]
+    linked = LINKED.get(kind)
+    q = (q or '').strip()
+    if not q:
+        return SearchPage([], page, per_page, False)
+
+    if db.engine.dialect.name == 'postgresql':
+        stmt = _ranked_postgres(model, q, linked)
+    else:
+        stmt = _ranked_sqlite(model, q, columns, linked)
+    if stmt is None:
+        return SearchPage([], page, per_page, False)
+
+    rows = db.session.execute(
+        stmt.limit(per_page + 1).offset((page - 1) * per_page)).all()
+    return SearchPage([tuple(r) for r in rows[:per_page]], page, per_page,
+                      has_next=len(rows) > per_page)
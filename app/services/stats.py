@@ -0,0 +1,256 @@
+"""
+Dashboard statistics — precomputed row counts in ``stat_counters``.
+
+Counters are keyed ``<table>`` (total rows) and ``<table>.status.<status>``
+(rows per status). They are adjusted in the same transaction as the write
+that changes them:
+
+* ORM writes are picked up automatically by an ``after_flush`` hook that
+  diffs new, deleted and status-changed objects.
+* Core bulk INSERT/UPDATE paths bypass the ORM, so they call ``adjust``
+  (or ``status_counts`` + ``status_moves``) themselves.
+
+``reconcile`` recomputes everything from the real tables; run it
+periodically (``flask reconcile-stats``) to correct any drift, e.g. from
+database-level cascades or manual SQL.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from flask import current_app
+from sqlalchemy import delete, event, func, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Campaign, OutreachEmail, Platform, StatCounter, Target
+from app.services.bulk import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+# model -> attribute counted per value (None: total only)
+TRACKED = {
+    Platform: None,
+    Campaign: None,
+    Target: 'status',
+    OutreachEmail: 'status',
+}
+
+_listening = False
+
+
+def status_key(table: str, status) -> str:
+    return f'{table}.status.{status}'
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def adjust(deltas: Dict[str, int], connection=None) -> None:
+    """Add each delta to its counter (one upsert; caller commits)."""
+    rows = [{'key': key, 'value': delta} for key, delta in sorted(deltas.items()) if delta]
+    if not rows:
+        return
+    table = StatCounter.__table__
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['key'], set_={'value': table.c.value + stmt.excluded.value})
+    (connection or db.session).execute(stmt, rows)
+
+
+def status_counts(model, *criteria) -> Dict[str, int]:
+    """Rows per status matching ``criteria`` (run before a set-based UPDATE)."""
+    return dict(db.session.execute(
+        select(model.status, func.count()).where(*criteria).group_by(model.status)
+    ).all())
+
+
+def status_moves(table: str, counts: Dict[str, int], new_status: str) -> Counter:
+    """Deltas for moving ``counts`` rows (by old status) to ``new_status``."""
+    deltas = Counter()
+    for old_status, n in counts.items():
+        deltas[status_key(table, old_status)] -= n
+        deltas[status_key(table, new_status)] += n
+    return deltas
+
+
+def _committed_value(obj, attr: str):
+    state = inspect(obj)
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return state.dict.get(attr)
+
+
+def _after_flush(session, flush_context) -> None:
+    deltas = Counter()
+    for obj in session.new:
+        attr = TRACKED.get(type(obj), False)
+        if attr is False:
+            continue
+        table = obj.__tablename__
+        deltas[table] += 1
+        if attr:
+            deltas[status_key(table, getattr(obj, attr))] += 1
+
+    for obj in session.deleted:
+        attr = TRACKED.get(type(obj), False)
+        if attr is False:
+            continue
+        table = obj.__tablename__
+        deltas[table] -= 1
+        if attr:
+            deltas[status_key(table, _committed_value(obj, attr))] -= 1
+
+    for obj in session.dirty:
+        attr = TRACKED.get(type(obj))
+        if not attr or obj in session.deleted:
+            continue
+        history = inspect(obj).attrs[attr].history
+        if history.added and history.deleted and history.added[0] != history.deleted[0]:
+            table = obj.__tablename__
+            deltas[status_key(table, history.deleted[0])] -= 1
+            deltas[status_key(table, history.added[0])] += 1
+
+    if deltas:
+        adjust(deltas, connection=session.connection())
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+def init_app(app) -> None:
+    """Register the flush hook (once per process)."""
+    global _listening
+    if _listening:
+        return
+    event.listen(Session, 'after_flush', _after_flush)
+    for model, attr in TRACKED.items():
+        if attr:
+            # Load the old value on assignment so the hook can see what changed
+            event.listen(getattr(model, attr), 'set', _load_old_value, active_history=True)
+    _listening = True
+
+
+# ---------------------------------------------------------------------------
+# Reconciling
+# ---------------------------------------------------------------------------
+
+def reconcile() -> Dict[str, int]:
+    """Recompute every counter from the real tables (caller commits).
+
+    Returns the keys whose stored value was wrong, with the correction.
+    """
+    actual: Dict[str, int] = {}
+    for model, attr in TRACKED.items():
+        table = model.__tablename__
+        if attr:
+            rows = db.session.execute(
+                select(getattr(model, attr), func.count()).group_by(getattr(model, attr))
+            ).all()
+            for status, n in rows:
+                actual[status_key(table, status)] = n
+            actual[table] = sum(n for _, n in rows)
+        else:
+            actual[table] = db.session.scalar(select(func.count()).select_from(model))
+
+    tables = [model.__tablename__ for model in TRACKED]
+    tracked_keys = or_(StatCounter.key.in_(tables),
+                       *(StatCounter.key.like(status_key(t, '%')) for t in tables))
+    stored = dict(db.session.execute(
+        select(StatCounter.key, StatCounter.value).where(tracked_keys)).all())
+
+    db.session.execute(delete(StatCounter).where(tracked_keys))
+    db.session.execute(
+        StatCounter.__table__.insert(),
+        [{'key': key, 'value': value} for key, value in sorted(actual.items())],
+    )
+
+    drift = {key: actual.get(key, 0) - stored.get(key, 0)
+             for key in actual.keys() | stored.keys()
+             if actual.get(key, 0) != stored.get(key, 0)}
+    if drift:
+        logger.info('Stats reconciled; corrected %s', drift)
+    return drift
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def count(key: str) -> int:
+    """One counter, e.g. ``count('targets')`` or ``count(status_key('targets', 'live'))``."""
+    return db.session.scalar(select(StatCounter.value).where(StatCounter.key == key)) or 0
+
+
+def dashboard_stats() -> dict:
+    """Everything the dashboard's counters show, from a single query."""
+    counters = dict(db.session.execute(select(StatCounter.key, StatCounter.value)).all())
+
+    def by_status(table):
+        prefix = status_key(table, '')
+        return {key[len(prefix):]: value for key, value in sorted(counters.items())
+                if key.startswith(prefix) and value > 0}
+
+    return {
+        'total_platforms': counters.get('platforms', 0),
+        'total_targets': counters.get('targets', 0),
+        'total_campaigns': counters.get('campaigns', 0),
+        'total_emails': counters.get('outreach_emails', 0),
+        'targets_by_status': by_status('targets'),
+        'emails_by_status': by_status('outreach_emails'),
+    }
+
+
+_cache: dict = {'value': None, 'at': 0.0, 'refreshing': False}
+_cache_lock = threading.Lock()
+
+
+def _refresh_cache(app) -> None:
+    with app.app_context():
+        try:
+            value = dashboard_stats()
+            with _cache_lock:
+                _cache.update(value=value, at=time.monotonic())
+        except Exception:
+            logger.exception('Dashboard stats refresh failed')
+        finally:
+            _cache['refreshing'] = False
+            db.session.remove()
+
+
+def cached_dashboard_stats() -> dict:
+    """dashboard_stats behind a per-process stale-while-revalidate cache.
+
+    Fresh for DASHBOARD_CACHE_TTL seconds; for DASHBOARD_CACHE_STALE seconds
+    after that the old value is served while one background thread
+    refreshes it. A TTL of 0 disables the cache.
+    """
+    ttl = current_app.config.get('DASHBOARD_CACHE_TTL', 0)
+    if not ttl:
+        return dashboard_stats()
+
+    stale = current_app.config.get('DASHBOARD_CACHE_STALE', 0)
+    value: Optional[dict] = _cache['value']
+    age = time.monotonic() - _cache['at']
+    if value is not None and age < ttl:
+        return value
+    if value is not None and age < ttl + stale:
+        with _cache_lock:
+            start = not _cache['refreshing']
+            _cache['refreshing'] = True
+        if start:
+            threading.Thread(target=_refresh_cache, daemon=True,
+                             args=(current_app._get_current_object(),)).start()
+        return value
+
+    value = dashboard_stats()
+    with _cache_lock:
+        _cache.update(value=value, at=time.monotonic())
+    return value
@@ -0,0 +1,41 @@
+"""
+Streamed rendering for the big list pages.
+
+``render_stream`` sends a template as it renders instead of building the
+whole page in memory first: the layout and table header go out straight
+away and rows follow in chunks of about STREAM_CHUNK_SIZE characters, so
+time to first byte no longer grows with the page size and a worker never
+holds more than one chunk of HTML.
+
+Anything that writes the session (CSRF token, consuming flash messages)
+has to happen before the headers are sent, so the CSRF token is created
+up front and pages with pending flash messages are rendered normally.
+"""
+from typing import Iterable, Iterator
+
+from flask import current_app, render_template, session, stream_template
+
+
+def _coalesce(chunks: Iterable[str], size: int) -> Iterator[str]:
+    """Join Jinja's many small fragments into chunks of at least ``size``."""
+    buffer, length = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def render_stream(template_name: str, **context):
+    """Render ``template_name`` as a streamed HTML response."""
+    size = current_app.config.get('STREAM_CHUNK_SIZE', 8192)
+    if not size or session.get('_flashes'):
+        return render_template(template_name, **context)
+
+    from flask_wtf.csrf import generate_csrf
+    generate_csrf()
+    return current_app.response_class(
+        _coalesce(stream_template(template_name, **context), size), mimetype='text/html')
@@ -0,0 +1,147 @@
+"""
+Compiled email templates.
+
+Subject and body are parsed once into a list of segments (literal text,
+placeholders and conditional sections) and cached per template version, so
+rendering is a single pass over pre-split text with no per-render parsing.
+
+Syntax:
+  {{contact_first_name}}              value, or empty
+  {{contact_first_name|there}}        value, or the default text "there"
+  {{#topic}}About {{topic}}.{{/topic}}  section shown only when topic is set
+  {{^topic}}Any topic works.{{/topic}}  section shown only when topic is empty
+
+Unknown placeholders are left in the output untouched.
+"""
+import re
+from typing import Dict, Iterable, List, Tuple
+
+from app.services.cache import LRUCache
+
+FIELDS = ('contact_name', 'contact_first_name', 'platform_name',
+          'platform_url', 'tier', 'topic')
+
+_TAG_RE = re.compile(r'\{\{\s*([#^/]?)\s*([a-z_]+)\s*(?:\|([^}]*))?\}\}')
+
+# Segment kinds (first tuple item); literal text is stored as a plain str
+_FIELD = 0
+_SECTION = 1
+
+_compiled = LRUCache(maxsize=128)
+
+
+class TemplateSyntaxError(ValueError):
+    pass
+
+
+def compile_text(text: str) -> list:
+    """Parse template text into a nested segment list."""
+    root: list = []
+    stack: List[Tuple[str, list]] = []
+    out = root
+    pos = 0
+
+    for m in _TAG_RE.finditer(text):
+        sigil, name, default = m.group(1), m.group(2), m.group(3)
+        if name not in FIELDS:
+            continue  # leave unknown tags as literal text
+        if m.start() > pos:
+            out.append(text[pos:m.start()])
+        pos = m.end()
+
+        if sigil in ('#', '^'):
+            children: list = []
+            out.append((_SECTION, name, sigil == '^', children))
+            stack.append((name, out))
+            out = children
+        elif sigil == '/':
+            if not stack or stack[-1][0] != name:
+                raise TemplateSyntaxError(f'Unexpected {{{{/{name}}}}}')
+            _, out = stack.pop()
+        else:
+            out.append((_FIELD, name, default or ''))
+
+    if stack:
+        raise TemplateSyntaxError(f'Missing {{{{/{stack[-1][0]}}}}}')
+    if pos < len(text):
+        out.append(text[pos:])
+    return _merge_literals(root)
+
+
+def _merge_literals(segments: list) -> list:
+    merged: list = []
+    for seg in segments:
+        if isinstance(seg, str) and merged and isinstance(merged[-1], str):
+            merged[-1] += seg
+        else:
+            merged.append(seg)
+    return merged
+
+
+def _render_into(segments: list, ctx: Dict[str, str], out: list) -> None:
+    for seg in segments:
+        if seg.__class__ is str:
+            out.append(seg)
+        elif seg[0] == _FIELD:
+            out.append(ctx[seg[1]] or seg[2])
+        elif bool(ctx[seg[1]]) != seg[2]:
+            _render_into(seg[3], ctx, out)
+
+
+def render_segments(segments: list, ctx: Dict[str, str]) -> str:
+    out: list = []
+    _render_into(segments, ctx, out)
+    return ''.join(out)
+
+
+def fields_used(segments: list) -> List[str]:
+    """Placeholder names ``segments`` reads, in first-use order."""
+    names: Dict[str, None] = {}
+    for seg in segments:
+        if seg.__class__ is str:
+            continue
+        names[seg[1]] = None
+        if seg[0] == _SECTION:
+            names.update(dict.fromkeys(fields_used(seg[3])))
+    return list(names)
+
+
+def platform_context(platform) -> Dict[str, str]:
+    """Placeholder values for a Platform (or any row with the same attributes)."""
+    contact_name = (platform.contact_name or '').strip()
+    return {
+        'contact_name': platform.contact_name or '',
+        'contact_first_name': contact_name.split()[0] if contact_name else '',
+        'platform_name': platform.name or '',
+        'platform_url': platform.url or '',
+        'tier': platform.tier or '',
+        'topic': platform.topic_to_submit or '',
+    }
+
+
+def compiled_template(template) -> Tuple[list, list]:
+    """Return the (subject, body) segment lists for an EmailTemplate.
+
+    Cached on (id, updated_at); editing a template bumps updated_at, so a
+    stale version is never served. Unsaved templates are compiled uncached.
+    """
+    if template.id is None:
+        return compile_text(template.subject), compile_text(template.body_html)
+
+    key = (template.id, template.updated_at)
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = (compile_text(template.subject), compile_text(template.body_html))
+        _compiled.set(key, compiled)
+    return compiled
+
+
+def render_many(template, platforms: Iterable) -> List[Tuple[str, str]]:
+    """Render a template for each platform; returns (subject, body) pairs."""
+    subject_segments, body_segments = compiled_template(template)
+    rendered = []
+    for platform in platforms:
+        ctx = platform_context(platform)
+        rendered.append((render_segments(subject_segments, ctx),
+                         render_segments(body_segments, ctx)))
+    return rendered
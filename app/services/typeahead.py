@@ -0,0 +1,78 @@
+"""
+Typeahead lookups for the platform and target pickers.
+
+Forms no longer ship every row as a <select> option; the picker asks
+``/lookup/<kind>?q=...`` for the best few matches instead. Matching is a
+case-insensitive substring search over the label columns, with prefix
+matches ranked first. On PostgreSQL the columns carry pg_trgm GIN indexes
+(migration 011), which serve ``ILIKE '%q%'`` directly, and trigram
+similarity adds typo-tolerant matches ranked by closeness.
+"""
+from typing import List, Optional
+
+from sqlalchemy import case, func, or_, select
+
+from app import db
+from app.models import Platform, Target
+
+MIN_SIMILARITY_CHARS = 3
+
+
+def _platform_label(name, domain) -> str:
+    return f'{name} ({domain})' if domain else name
+
+
+def _target_label(title, url, platform_name) -> str:
+    return f'{title or url} ({platform_name})'
+
+
+def _ranked(stmt, q: str, columns, primary):
+    """Filter ``stmt`` to rows matching ``q`` on any column, best first.
+
+    Prefix matches on ``primary`` come first; on PostgreSQL, rows whose
+    first column is trigram-similar to ``q`` also match.
+    """
+    criteria = [c.icontains(q, autoescape=True) for c in columns]
+    order = [case((primary.istartswith(q, autoescape=True), 0), else_=1)]
+    if db.engine.dialect.name == 'postgresql' and len(q) >= MIN_SIMILARITY_CHARS:
+        criteria.append(columns[0].bool_op('%')(q))
+        order.append(func.similarity(columns[0], q).desc())
+    return stmt.where(or_(*criteria)).order_by(*order, primary)
+
+
+def search(kind: str, q: str, limit: int) -> List[dict]:
+    """Top ``limit`` matches for ``q`` as ``[{'id': ..., 'label': ...}]``."""
+    q = q.strip()
+    if kind == 'platforms':
+        stmt = select(Platform.id, Platform.name, Platform.domain)
+        if q:
+            stmt = _ranked(stmt, q, [Platform.name, Platform.domain], Platform.name)
+        else:
+            stmt = stmt.order_by(Platform.name)
+        rows = db.session.execute(stmt.limit(limit)).all()
+        return [{'id': r.id, 'label': _platform_label(r.name, r.domain)} for r in rows]
+
+    stmt = (select(Target.id, Target.target_page_title, Target.target_url,
+                   Platform.name.label('platform_name'))
+            .join(Platform, Target.platform_id == Platform.id))
+    if q:
+        stmt = _ranked(stmt, q, [Target.target_page_title, Target.target_url, Platform.name],
+                       func.coalesce(Target.target_page_title, Target.target_url))
+    else:
+        stmt = stmt.order_by(Target.created_at.desc(), Target.id.desc())
+    rows = db.session.execute(stmt.limit(limit)).all()
+    return [{'id': r.id, 'label': _target_label(r.target_page_title, r.target_url, r.platform_name)}
+            for r in rows]
+
+
+def label(kind: str, id: Optional[int]) -> str:
+    """Display text for an already chosen row (blank if there is none)."""
+    if not id:
+        return ''
+    if kind == 'platforms':
+        platform = db.session.get(Platform, id)
+        return _platform_label(platform.name, platform.domain) if platform else ''
+    target = db.session.get(Target, id)
+    if target is None:
+        return ''
+    return _target_label(target.target_page_title, target.target_url, target.platform.name)
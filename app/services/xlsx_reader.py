@@ -0,0 +1,192 @@
+"""
+Streaming XLSX reader.
+
+Reads the active worksheet's XML straight out of the zip container with
+iterparse, one row at a time, instead of going through openpyxl's cell
+objects. Shared strings are parsed lazily — only as far as the highest
+index the sheet has referenced so far — and cells are converted to the
+same strings ``str()`` gives for openpyxl values, so callers can't tell
+the two readers apart.
+"""
+import re
+import zipfile
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+from xml.etree.ElementTree import iterparse, parse
+
+_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# Built-in number formats that display dates or times
+_BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+# Quoted text, escapes and [colour]/[h] brackets don't count as date tokens
+_FORMAT_NOISE_RE = re.compile(r'"[^"]*"|\\.|\[[^\]]*\]')
+_DATE_TOKEN_RE = re.compile(r'[dmyhs]', re.IGNORECASE)
+_COLUMN_RE = re.compile(r'[A-Z]+')
+
+_EPOCH_1900 = datetime(1899, 12, 30)
+_EPOCH_1904 = datetime(1904, 1, 1)
+
+
+def _column_index(ref: str) -> int:
+    """'A1' -> 0, 'AB7' -> 27."""
+    index = 0
+    for char in _COLUMN_RE.match(ref).group(0):
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+class _SharedStrings:
+    """Shared string table, parsed only as far as it has been read."""
+
+    def __init__(self, archive: zipfile.ZipFile, name: Optional[str]):
+        self._items: List[str] = []
+        self._events = None
+        self._stream = None
+        if name and name in archive.namelist():
+            self._stream = archive.open(name)
+            self._events = iterparse(self._stream, events=('end',))
+
+    def __getitem__(self, index: int) -> str:
+        while len(self._items) <= index and self._events is not None:
+            for _, elem in self._events:
+                if elem.tag == _NS + 'si':
+                    # Plain <t>, or rich-text runs <r><t>; phonetic <rPh> is skipped
+                    phonetic = {t for rph in elem.iter(_NS + 'rPh') for t in rph.iter(_NS + 't')}
+                    self._items.append(''.join(
+                        t.text or '' for t in elem.iter(_NS + 't') if t not in phonetic))
+                    elem.clear()
+                    break
+            else:
+                self.close()
+        return self._items[index] if index < len(self._items) else ''
+
+    def close(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+        self._stream = self._events = None
+
+
+def _date_styles(archive: zipfile.ZipFile, name: Optional[str]) -> List[bool]:
+    """For each cell style index, whether its number format is a date."""
+    if not name or name not in archive.namelist():
+        return []
+    with archive.open(name) as stream:
+        root = parse(stream).getroot()
+
+    custom_dates = set()
+    for fmt in root.iter(_NS + 'numFmt'):
+        code = _FORMAT_NOISE_RE.sub('', fmt.get('formatCode', ''))
+        if _DATE_TOKEN_RE.search(code):
+            custom_dates.add(int(fmt.get('numFmtId')))
+
+    cell_xfs = root.find(_NS + 'cellXfs')
+    if cell_xfs is None:
+        return []
+    date_ids = _BUILTIN_DATE_FORMATS | custom_dates
+    return [int(xf.get('numFmtId', 0)) in date_ids for xf in cell_xfs.iter(_NS + 'xf')]
+
+
+def _workbook_parts(archive: zipfile.ZipFile) -> Dict[str, Optional[str]]:
+    """Locate the active sheet, shared strings and styles, and the date system."""
+    with archive.open('xl/workbook.xml') as stream:
+        workbook = parse(stream).getroot()
+    with archive.open('xl/_rels/workbook.xml.rels') as stream:
+        rels = {rel.get('Id'): rel for rel in parse(stream).getroot().iter(_PKG_REL_NS + 'Relationship')}
+
+    def part(target: str) -> str:
+        target = target.lstrip('/')
+        return target if target.startswith('xl/') else 'xl/' + target
+
+    def part_of_type(suffix: str) -> Optional[str]:
+        for rel in rels.values():
+            if rel.get('Type', '').endswith(suffix):
+                return part(rel.get('Target'))
+        return None
+
+    sheets = list(workbook.iter(_NS + 'sheet'))
+    view = workbook.find(f'{_NS}bookViews/{_NS}workbookView')
+    active = int(view.get('activeTab', 0)) if view is not None else 0
+    sheet = sheets[active] if active < len(sheets) else sheets[0]
+
+    properties = workbook.find(_NS + 'workbookPr')
+    date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+    return {
+        'sheet': part(rels[sheet.get(_REL_NS + 'id')].get('Target')),
+        'shared_strings': part_of_type('/sharedStrings'),
+        'styles': part_of_type('/styles'),
+        'date1904': date1904,
+    }
+
+
+def _serial_date(serial: float, epoch: datetime) -> str:
+    """Excel serial -> the str() of the datetime/time openpyxl would return.
+
+    Mirrors openpyxl's ``from_excel``: the time of day is rounded to the
+    millisecond, so float error never shows up as ``09:59:59.999999``.
+    """
+    day, fraction = divmod(serial, 1)
+    time_of_day = timedelta(milliseconds=round(fraction * 86400 * 1000))
+    if 0 <= serial < 1 and time_of_day.days == 0:
+        return str((datetime.min + time_of_day).time())
+    if epoch is _EPOCH_1900 and 0 < serial < 60:
+        day += 1  # Excel's phantom 1900-02-29
+    return str(epoch + timedelta(days=day) + time_of_day)
+
+
+def _number(text: str) -> str:
+    if '.' in text or 'E' in text or 'e' in text:
+        return str(float(text))
+    return str(int(text))
+
+
+def iter_xlsx_rows(file) -> Iterator[List[str]]:
+    """Yield every row of the active sheet as a list of strings.
+
+    Gaps between cells are filled with '' so each value keeps its column
+    position; rows are not padded on the right.
+    """
+    with zipfile.ZipFile(file) as archive:
+        parts = _workbook_parts(archive)
+        shared = _SharedStrings(archive, parts['shared_strings'])
+        date_styles = _date_styles(archive, parts['styles'])
+        epoch = _EPOCH_1904 if parts['date1904'] else _EPOCH_1900
+
+        def cell_text(cell) -> str:
+            kind = cell.get('t', 'n')
+            if kind == 'inlineStr':
+                return ''.join(t.text or '' for t in cell.iter(_NS + 't'))
+            value = cell.findtext(_NS + 'v')
+            if value is None:
+                return ''
+            if kind == 's':
+                return shared[int(value)]
+            if kind == 'b':
+                return 'True' if value == '1' else 'False'
+            if kind == 'n':
+                style = int(cell.get('s', 0))
+                if style < len(date_styles) and date_styles[style]:
+                    return _serial_date(float(value), epoch)
+                return _number(value)
+            if kind == 'd':
+                return str(datetime.fromisoformat(value))
+            return value  # 'str' (formula result) and 'e' (error) are literal
+
+        try:
+            with archive.open(parts['sheet']) as stream:
+                for _, elem in iterparse(stream, events=('end',)):
+                    if elem.tag != _NS + 'row':
+                        continue
+                    row: List[str] = []
+                    for cell in elem.iter(_NS + 'c'):
+                        ref = cell.get('r')
+                        if ref:
+                            gap = _column_index(ref) - len(row)
+                            if gap > 0:
+                                row.extend([''] * gap)
+                        row.append(cell_text(cell))
+                    elem.clear()
+                    yield row
+        finally:
+            shared.close()
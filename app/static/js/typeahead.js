@@ -0,0 +1,61 @@
+// Typeahead picker: a text box that searches /lookup/<kind> and stores the
+// chosen row's ID in the hidden input named by data-typeahead-for.
+document.querySelectorAll('[data-typeahead-url]').forEach(input => {
+    const hidden = document.getElementById(input.dataset.typeaheadFor);
+    const menu = document.createElement('div');
+    menu.className = 'dropdown-menu w-100';
+    input.after(menu);
+    let timer = null;
+    let request = 0;
+
+    function choose(item) {
+        hidden.value = item.id;
+        input.value = item.label;
+        menu.classList.remove('show');
+        input.classList.remove('is-invalid');
+        hidden.dispatchEvent(new Event('change', {bubbles: true}));
+    }
+
+    function show(results) {
+        menu.innerHTML = '';
+        if (!results.length) {
+            const empty = document.createElement('span');
+            empty.className = 'dropdown-item-text text-muted';
+            empty.textContent = 'No matches';
+            menu.append(empty);
+        }
+        results.forEach(item => {
+            const option = document.createElement('button');
+            option.type = 'button';
+            option.className = 'dropdown-item text-truncate';
+            option.textContent = item.label;
+            option.addEventListener('mousedown', e => { e.preventDefault(); choose(item); });
+            menu.append(option);
+        });
+        menu.classList.add('show');
+    }
+
+    function search() {
+        const current = ++request;
+        fetch(input.dataset.typeaheadUrl + '?' + new URLSearchParams({q: input.value}))
+            .then(r => r.json())
+            .then(data => { if (current === request) show(data.results); });
+    }
+
+    input.addEventListener('input', () => {
+        hidden.value = '';  // typing invalidates the previous choice
+        clearTimeout(timer);
+        timer = setTimeout(search, 200);
+    });
+    input.addEventListener('focus', search);
+    input.addEventListener('blur', () => menu.classList.remove('show'));
+    input.addEventListener('keydown', e => {
+        const first = menu.querySelector('.dropdown-item');
+        if (e.key === 'Enter' && menu.classList.contains('show') && first) {
+            e.preventDefault();
+            first.dispatchEvent(new MouseEvent('mousedown'));
+        } else if (e.key === 'Escape') {
+            menu.classList.remove('show');
+        }
+    });
+});
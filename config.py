@@ -8,6 +8,73 @@ class Config:
     GMAIL_SENDER_EMAIL = os.environ.get('GMAIL_SENDER_EMAIL', 'anna@writeitgreat.com')
     GMAIL_CREDENTIALS_FILE = os.environ.get('GMAIL_CREDENTIALS_FILE', 'credentials.json')
     GMAIL_TOKEN_FILE = os.environ.get('GMAIL_TOKEN_FILE', 'token.json')
+    # Override the Gmail API base URL, e.g. to point at a local fake server
+    GMAIL_API_ENDPOINT = os.environ.get('GMAIL_API_ENDPOINT', '')
+
+    # Platforms sent per transaction in Bulk Send
+    BULK_SEND_CHUNK_SIZE = 200
+
+    # Rows per INSERT batch (and commit) when importing platforms
+    IMPORT_BATCH_SIZE = 1000
+    # On PostgreSQL, load imports through a COPY staging table
+    IMPORT_USE_COPY = True
+    # .xlsx uploads at least this big are read with the streaming XML reader
+    IMPORT_FAST_XLSX_MIN_BYTES = 1024 * 1024
+    # Uploads wait in the database while the user confirms the detected column
+    # types; this directory (default: system temp) caches them on each dyno
+    IMPORT_UPLOAD_DIR = os.environ.get('IMPORT_UPLOAD_DIR', '')
+    IMPORT_UPLOAD_MAX_AGE = 24 * 3600
+
+    # Rows per page in the list views (?per_page= may ask for up to MAX_PAGE_SIZE)
+    PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 50))
+    MAX_PAGE_SIZE = 500
+    # Raise (instead of log) when a view goes over its @query_budget
+    QUERY_BUDGET_ENFORCE = False
+    # Most matches a /lookup typeahead returns
+    TYPEAHEAD_LIMIT = 20
+    # Full-text search: results per page, and how many matches PostgreSQL
+    # ranks at most (very common terms rank only the newest this many)
+    SEARCH_PER_PAGE = 20
+    SEARCH_MAX_CANDIDATES = 5000
+
+    # Dashboard counters: serve cached for TTL seconds, then stale for up to
+    # STALE more seconds while refreshing in the background (0 = no cache)
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 0))
+    DASHBOARD_CACHE_STALE = int(os.environ.get('DASHBOARD_CACHE_STALE', 60))
+
+    # Rendered list pages/dashboard, per process, until a table they show is
+    # written (0 = off). Keep the TTL under WTF_CSRF_TIME_LIMIT (1 hour):
+    # cached pages carry CSRF tokens.
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 600))
+    RESPONSE_CACHE_SIZE = 256
+    # List pages stream their HTML in chunks of about this many characters
+    # (0 = render the whole page before sending)
+    STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 8192))
+    # gzip level (Brotli if the brotli package is installed) for HTML/JSON/CSV
+    # and static responses of at least COMPRESS_MIN_SIZE bytes (0 = off)
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_MIN_SIZE = 500
+
+    # Rows fetched per round trip (server-side cursor) when exporting
+    EXPORT_YIELD_PER = 1000
+    # Rows per UPDATE/DELETE (and commit) in the list pages' bulk actions
+    BULK_ACTION_CHUNK_SIZE = 500
+    # Delete All runs as a background purge: rows per transaction, optional
+    # sleep between batches, and how long without progress means it died
+    PURGE_BATCH_SIZE = 1000
+    PURGE_BATCH_PAUSE = 0
+    PURGE_STALE_SECONDS = 300
+    # JSON API (/api/v1): records accepted per bulk POST/PATCH, and rows per
+    # INSERT/UPDATE statement within it
+    API_MAX_BATCH = int(os.environ.get('API_MAX_BATCH', 5000))
+    API_WRITE_CHUNK = 1000
+    # Emails per transaction in `flask email-bodies compact` / `prune`
+    EMAIL_BODY_CHUNK_SIZE = 1000
+
+    # Follow-up automation: days to wait after the pitch / first follow-up
+    FOLLOW_UP_1_DAYS = int(os.environ.get('FOLLOW_UP_1_DAYS', 7))
+    FOLLOW_UP_2_DAYS = int(os.environ.get('FOLLOW_UP_2_DAYS', 7))
+    FOLLOW_UP_CHUNK_SIZE = 500
 
     # Email finder API keys
     KENDO_API_KEY = os.environ.get('KENDO_API_KEY', '')
@@ -33,8 +100,17 @@ class ProductionConfig(Config):
     DEBUG = False
 
 
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL', 'sqlite://')
+    WTF_CSRF_ENABLED = False
+    # Views over their @query_budget raise instead of logging a warning
+    QUERY_BUDGET_ENFORCE = True
+
+
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig,
 }
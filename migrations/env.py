@@ -76,11 +76,22 @@ def run_migrations_online():
 
     connectable = get_engine()
 
+    # skip dialect-specific objects (Index(...).ddl_if(dialect=...)) that
+    # were never created on this database, and the full-text search objects
+    # the database maintains itself (migration 012)
+    def include_object(object, name, type_, reflected, compare_to):
+        from app.services.search import database_managed
+        if reflected and database_managed(name):
+            return False
+        ddl_if = getattr(object, '_ddl_if', None)
+        return not (ddl_if and ddl_if.dialect and ddl_if.dialect != connectable.dialect.name)
+
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
             process_revision_directives=process_revision_directives,
+            include_object=include_object,
             **current_app.extensions['migrate'].configure_args
         )
 
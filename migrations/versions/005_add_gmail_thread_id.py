@@ -0,0 +1,56 @@
+"""Add gmail_thread_id to outreach_emails for reply/bounce sync
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19
+
+On PostgreSQL the indexes are built CONCURRENTLY (outside the migration
+transaction), so running this from the release phase never blocks writes.
+Indexes that already exist are skipped; an invalid one left behind by an
+interrupted concurrent build is dropped and rebuilt.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns)
+INDEXES = [
+    ('ix_outreach_emails_gmail_thread_id', 'outreach_emails', ['gmail_thread_id']),
+    ('ix_outreach_emails_gmail_message_id', 'outreach_emails', ['gmail_message_id']),
+]
+
+
+def _drop_if_invalid(bind, name):
+    invalid = bind.execute(sa.text(
+        'SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+        'WHERE c.relname = :name AND NOT i.indisvalid'
+    ), {'name': name}).scalar()
+    if invalid:
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def upgrade():
+    bind = op.get_bind()
+    postgres = bind.dialect.name == 'postgresql'
+
+    op.add_column('outreach_emails', sa.Column('gmail_thread_id', sa.String(200)))
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            if postgres:
+                _drop_if_invalid(bind, name)
+            op.create_index(name, table, columns, if_not_exists=True,
+                            postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True,
+                          postgresql_concurrently=True)
+    op.drop_column('outreach_emails', 'gmail_thread_id')
@@ -0,0 +1,64 @@
+"""Add follow-up stage to outreach_emails and partial indexes for due follow-ups
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19
+
+On PostgreSQL the indexes are built CONCURRENTLY (outside the migration
+transaction), so running this from the release phase never blocks writes.
+Indexes that already exist are skipped; an invalid one left behind by an
+interrupted concurrent build is dropped and rebuilt.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, partial WHERE clause)
+INDEXES = [
+    ('ix_outreach_emails_platform_id', 'outreach_emails', ['platform_id'], None),
+    ('ix_platforms_follow_up_1_due', 'platforms', ['pitch_sent_date'],
+     'follow_up_1 IS NULL AND response_date IS NULL'),
+    ('ix_platforms_follow_up_2_due', 'platforms', ['follow_up_1'],
+     'follow_up_2 IS NULL AND response_date IS NULL'),
+]
+
+
+def _drop_if_invalid(bind, name):
+    invalid = bind.execute(sa.text(
+        'SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+        'WHERE c.relname = :name AND NOT i.indisvalid'
+    ), {'name': name}).scalar()
+    if invalid:
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def upgrade():
+    bind = op.get_bind()
+    postgres = bind.dialect.name == 'postgresql'
+
+    op.add_column('outreach_emails', sa.Column('follow_up_stage', sa.SmallInteger()))
+
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            if postgres:
+                _drop_if_invalid(bind, name)
+            op.create_index(
+                name, table, columns,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                sqlite_where=sa.text(where) if where else None,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True,
+                          postgresql_concurrently=True)
+    op.drop_column('outreach_emails', 'follow_up_stage')
@@ -0,0 +1,103 @@
+"""Add normalized domain to platforms with a unique index
+
+Existing duplicates keep the domain on their oldest row only; later copies
+are left with a NULL domain so the unique index can be built. They stay
+editable: the domain is only checked and set again when their URL changes.
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19
+
+The backfill commits once per batch, so it never holds row locks on the
+whole table, and on PostgreSQL the unique index is built CONCURRENTLY, so
+running this from the release phase never blocks writes. A run that was
+interrupted picks up where it stopped: the column is only added once,
+rows that already have a domain are kept, and an invalid index left behind
+by an interrupted concurrent build is dropped and rebuilt.
+"""
+from urllib.parse import urlsplit
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def _normalize_domain(url):
+    # Snapshot of app.models.normalize_domain at the time of this migration
+    if not url or not url.strip():
+        return None
+    value = url.strip().lower()
+    if '://' not in value:
+        value = 'http://' + value
+    try:
+        host = urlsplit(value).hostname or ''
+    except ValueError:
+        return None
+    if host.startswith('www.'):
+        host = host[4:]
+    return host.rstrip('.') or None
+
+
+def _drop_if_invalid(bind, name):
+    invalid = bind.execute(sa.text(
+        'SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+        'WHERE c.relname = :name AND NOT i.indisvalid'
+    ), {'name': name}).scalar()
+    if invalid:
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def upgrade():
+    conn = op.get_bind()
+    if 'domain' not in {c['name'] for c in sa.inspect(conn).get_columns('platforms')}:
+        op.add_column('platforms', sa.Column('domain', sa.String(255)))
+
+    platforms = sa.table('platforms', sa.column('id', sa.Integer), sa.column('url', sa.String),
+                         sa.column('domain', sa.String))
+    with op.get_context().autocommit_block():
+        seen = set(conn.scalars(
+            sa.select(platforms.c.domain).where(platforms.c.domain.isnot(None))))
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                sa.select(platforms.c.id, platforms.c.url)
+                .where(platforms.c.id > last_id, platforms.c.domain.is_(None))
+                .order_by(platforms.c.id)
+                .limit(BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            updates = []
+            for row in rows:
+                domain = _normalize_domain(row.url)
+                if domain and domain not in seen:
+                    seen.add(domain)
+                    updates.append({'pid': row.id, 'd': domain})
+            if updates:
+                # One executemany per batch, committed on its own
+                conn.execute(
+                    platforms.update().where(platforms.c.id == sa.bindparam('pid'))
+                    .values(domain=sa.bindparam('d')),
+                    updates,
+                )
+
+        if conn.dialect.name == 'postgresql':
+            _drop_if_invalid(conn, 'ix_platforms_domain')
+        op.create_index('ix_platforms_domain', 'platforms', ['domain'], unique=True,
+                        if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_platforms_domain', table_name='platforms', if_exists=True,
+                      postgresql_concurrently=True)
+    op.drop_column('platforms', 'domain')
@@ -0,0 +1,78 @@
+"""Add indexes for the list, filter and lookup queries
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19
+
+On PostgreSQL every index is built CONCURRENTLY (outside the migration
+transaction), so running this from the release phase never blocks writes.
+Indexes that already exist are skipped; an invalid one left behind by an
+interrupted concurrent build is dropped and rebuilt.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+HAS_EMAIL = "contact_email IS NOT NULL AND contact_email <> ''"
+NEEDS_EMAIL = ("contact_name IS NOT NULL AND contact_name <> '' "
+               "AND (contact_email IS NULL OR contact_email = '')")
+
+# (name, table, columns, partial WHERE clause)
+INDEXES = [
+    # Platforms list (newest first) and name-ordered pickers
+    ('ix_platforms_created_at', 'platforms', ['created_at'], None),
+    ('ix_platforms_name', 'platforms', ['name'], None),
+    # Bulk Send recipients, ordered by name
+    ('ix_platforms_with_email', 'platforms', ['name'], HAS_EMAIL),
+    # Find All Emails: a contact name but no email yet
+    ('ix_platforms_needs_email', 'platforms', ['id'], NEEDS_EMAIL),
+
+    ('ix_targets_platform_id', 'targets', ['platform_id'], None),
+    ('ix_targets_created_at', 'targets', ['created_at'], None),
+    # Status tab + newest first, and the dashboard's GROUP BY status
+    ('ix_targets_status_created_at', 'targets', ['status', 'created_at'], None),
+
+    ('ix_outreach_emails_target_id', 'outreach_emails', ['target_id'], None),
+    ('ix_outreach_emails_campaign_id', 'outreach_emails', ['campaign_id'], None),
+    ('ix_outreach_emails_template_id', 'outreach_emails', ['template_id'], None),
+    ('ix_outreach_emails_created_at', 'outreach_emails', ['created_at'], None),
+    ('ix_outreach_emails_status_created_at', 'outreach_emails', ['status', 'created_at'], None),
+]
+
+
+def _drop_if_invalid(bind, name):
+    invalid = bind.execute(sa.text(
+        'SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+        'WHERE c.relname = :name AND NOT i.indisvalid'
+    ), {'name': name}).scalar()
+    if invalid:
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def upgrade():
+    bind = op.get_bind()
+    postgres = bind.dialect.name == 'postgresql'
+
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            if postgres:
+                _drop_if_invalid(bind, name)
+            op.create_index(
+                name, table, columns,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                sqlite_where=sa.text(where) if where else None,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True,
+                          postgresql_concurrently=True)
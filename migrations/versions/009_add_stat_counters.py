@@ -0,0 +1,37 @@
+"""Add stat_counters table for precomputed dashboard counts
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'stat_counters',
+        sa.Column('key', sa.String(100), primary_key=True),
+        sa.Column('value', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+
+    # Seed from the current tables; from here on the app keeps them current
+    for table in ('platforms', 'campaigns', 'targets', 'outreach_emails'):
+        op.execute(f"INSERT INTO stat_counters (key, value) SELECT '{table}', count(*) FROM {table}")
+    for table in ('targets', 'outreach_emails'):
+        op.execute(
+            f"INSERT INTO stat_counters (key, value) "
+            f"SELECT '{table}.status.' || COALESCE(status, 'None'), count(*) "
+            f"FROM {table} GROUP BY status"
+        )
+
+
+def downgrade():
+    op.drop_table('stat_counters')
@@ -0,0 +1,115 @@
+"""Add (created_at, id) indexes for keyset pagination
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19
+
+Replaces the created_at indexes from 008 with (created_at, id) composites,
+which serve the list views' newest-first keyset pages directly. Built
+CONCURRENTLY on PostgreSQL, like 008.
+
+Keyset cursors need a created_at on every row (a NULL one can't be
+encoded, and ``(created_at, id) < ...`` never matches it), so rows
+without one get their updated_at (or now) and the column becomes NOT
+NULL. On PostgreSQL that goes through a NOT VALID check constraint,
+validated without blocking writes, which SET NOT NULL then relies on
+instead of scanning the table under an exclusive lock.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns)
+INDEXES = [
+    ('ix_platforms_created_at_id', 'platforms', ['created_at', 'id']),
+    ('ix_targets_created_at_id', 'targets', ['created_at', 'id']),
+    ('ix_targets_status_created_at_id', 'targets', ['status', 'created_at', 'id']),
+    ('ix_campaigns_created_at_id', 'campaigns', ['created_at', 'id']),
+    ('ix_outreach_emails_created_at_id', 'outreach_emails', ['created_at', 'id']),
+    ('ix_outreach_emails_status_created_at_id', 'outreach_emails', ['status', 'created_at', 'id']),
+    ('ix_email_templates_created_at_id', 'email_templates', ['created_at', 'id']),
+]
+
+# Superseded 008 indexes: (name, table, columns)
+REPLACED = [
+    ('ix_platforms_created_at', 'platforms', ['created_at']),
+    ('ix_targets_created_at', 'targets', ['created_at']),
+    ('ix_targets_status_created_at', 'targets', ['status', 'created_at']),
+    ('ix_outreach_emails_created_at', 'outreach_emails', ['created_at']),
+    ('ix_outreach_emails_status_created_at', 'outreach_emails', ['status', 'created_at']),
+]
+
+
+# Tables whose list views page on (created_at, id)
+KEYSET_TABLES = ('platforms', 'targets', 'campaigns', 'outreach_emails', 'email_templates')
+
+
+def _backfill_created_at(table):
+    op.execute(f'UPDATE {table} SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) '
+               f'WHERE created_at IS NULL')
+
+
+def _require_created_at(postgres):
+    if not postgres:
+        for table in KEYSET_TABLES:
+            _backfill_created_at(table)
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+        return
+
+    # Each statement commits on its own, so no lock outlives it
+    with op.get_context().autocommit_block():
+        for table in KEYSET_TABLES:
+            check = f'ck_{table}_created_at_not_null'
+            _backfill_created_at(table)
+            op.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {check}')
+            op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {check} '
+                       f'CHECK (created_at IS NOT NULL) NOT VALID')
+            op.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {check}')
+            op.execute(f'ALTER TABLE {table} ALTER COLUMN created_at SET NOT NULL')
+            op.execute(f'ALTER TABLE {table} DROP CONSTRAINT {check}')
+
+
+def _drop_if_invalid(bind, name):
+    invalid = bind.execute(sa.text(
+        'SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+        'WHERE c.relname = :name AND NOT i.indisvalid'
+    ), {'name': name}).scalar()
+    if invalid:
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def upgrade():
+    bind = op.get_bind()
+    postgres = bind.dialect.name == 'postgresql'
+
+    _require_created_at(postgres)
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            if postgres:
+                _drop_if_invalid(bind, name)
+            op.create_index(name, table, columns, if_not_exists=True,
+                            postgresql_concurrently=True)
+        # Only drop the old ones once their replacements exist
+        for name, table, _ in REPLACED:
+            op.drop_index(name, table_name=table, if_exists=True,
+                          postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in REPLACED:
+            op.create_index(name, table, columns, if_not_exists=True,
+                            postgresql_concurrently=True)
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True,
+                          postgresql_concurrently=True)
+    for table in KEYSET_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
@@ -0,0 +1,63 @@
+"""Add pg_trgm indexes for the typeahead lookups
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19
+
+GIN trigram indexes on the columns /lookup searches, so substring
+(ILIKE '%q%') and similarity matches don't scan the table. PostgreSQL
+only: enables the pg_trgm extension (which needs CREATE privilege on the
+database) and builds the indexes CONCURRENTLY, like 008. Other databases
+have no trigram support and are left alone.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+# (name, table, column)
+INDEXES = [
+    ('ix_platforms_name_trgm', 'platforms', 'name'),
+    ('ix_platforms_domain_trgm', 'platforms', 'domain'),
+    ('ix_targets_target_page_title_trgm', 'targets', 'target_page_title'),
+    ('ix_targets_target_url_trgm', 'targets', 'target_url'),
+]
+
+
+def _drop_if_invalid(bind, name):
+    invalid = bind.execute(sa.text(
+        'SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+        'WHERE c.relname = :name AND NOT i.indisvalid'
+    ), {'name': name}).scalar()
+    if invalid:
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        for name, table, column in INDEXES:
+            _drop_if_invalid(bind, name)
+            op.create_index(name, table, [column], if_not_exists=True,
+                            postgresql_using='gin',
+                            postgresql_ops={column: 'gin_trgm_ops'},
+                            postgresql_concurrently=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True,
+                          postgresql_concurrently=True)
+    # pg_trgm is left installed; other objects may depend on it
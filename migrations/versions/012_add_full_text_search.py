@@ -0,0 +1,117 @@
+"""Add full-text search indexes
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19
+
+PostgreSQL: a stored generated ``search_vector`` tsvector column on
+platforms, targets and outreach_emails, with a GIN index built
+CONCURRENTLY. Adding a stored generated column rewrites the table under an
+exclusive lock, so on large databases run this in a quiet window.
+
+SQLite: external-content FTS5 tables (``<table>_fts``) plus the triggers
+that keep them in sync, filled from the existing rows.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+# Free text is cut off well below tsvector's 1MB limit
+MAX_TEXT = 100000
+
+# table -> [(column, weight)]
+DOCUMENTS = {
+    'platforms': [('name', 'A'), ('url', 'B'), ('contact_name', 'B'),
+                  ('contact_email', 'B'), ('notes', 'C')],
+    'targets': [('target_page_title', 'A'), ('target_url', 'B')],
+    'outreach_emails': [('subject', 'A'), ('recipient_email', 'B'), ('body', 'C')],
+}
+
+
+def _tsvector(columns):
+    parts = []
+    for weight in 'ABC':
+        names = [c for c, w in columns if w == weight]
+        if not names:
+            continue
+        doc = " || ' ' || ".join(f"coalesce({c}, '')" for c in names)
+        if weight == 'C':
+            doc = f'left({doc}, {MAX_TEXT})'
+        parts.append(f"setweight(to_tsvector('english'::regconfig, {doc}), '{weight}')")
+    return ' || '.join(parts)
+
+
+def _drop_if_invalid(bind, name):
+    invalid = bind.execute(sa.text(
+        'SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+        'WHERE c.relname = :name AND NOT i.indisvalid'
+    ), {'name': name}).scalar()
+    if invalid:
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def _sqlite_ddl(table, columns):
+    fts = f'{table}_fts'
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{c}' for c in columns)
+    old = ', '.join(f'old.{c}' for c in columns)
+    delete_old = (f"INSERT INTO {fts}({fts}, rowid, {cols}) "
+                  f"VALUES ('delete', old.id, {old});")
+    insert_new = f'INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{cols}, content='{table}', content_rowid='id', tokenize='porter unicode61')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} '
+        f'BEGIN {delete_old} {insert_new} END',
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == 'postgresql':
+        for table, columns in DOCUMENTS.items():
+            op.execute(
+                f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector '
+                f'GENERATED ALWAYS AS ({_tsvector(columns)}) STORED'
+            )
+        with op.get_context().autocommit_block():
+            for table in DOCUMENTS:
+                name = f'ix_{table}_search_vector'
+                _drop_if_invalid(bind, name)
+                op.create_index(name, table, ['search_vector'], if_not_exists=True,
+                                postgresql_using='gin', postgresql_concurrently=True)
+
+    elif dialect == 'sqlite':
+        for table, columns in DOCUMENTS.items():
+            for statement in _sqlite_ddl(table, [c for c, _ in columns]):
+                op.execute(statement)
+
+
+def downgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            for table in DOCUMENTS:
+                op.drop_index(f'ix_{table}_search_vector', table_name=table,
+                              if_exists=True, postgresql_concurrently=True)
+        for table in DOCUMENTS:
+            op.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector')
+
+    elif dialect == 'sqlite':
+        for table in DOCUMENTS:
+            fts = f'{table}_fts'
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {fts}')
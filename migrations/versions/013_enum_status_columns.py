@@ -0,0 +1,147 @@
+"""Normalize status, tier, priority and difficulty and store them as enums
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19
+
+Values are first normalized on every database: spelling variants are
+matched to the allowed value ignoring case, spaces and punctuation
+('pitch sent' -> 'Pitch Sent'), blanks become NULL (or the column's
+default for statuses and priority), and anything unrecognisable falls
+back the same way and is logged. The targets/emails status counters are
+then recounted, since normalizing moves rows between statuses.
+
+PostgreSQL: each column becomes a native enum type (4 bytes per value,
+compared as integers in GROUP BYs and indexes), one ALTER TABLE per table.
+The values themselves are unchanged, so raw SQL comparing against string
+literals keeps working. ALTER COLUMN TYPE rewrites the table and its
+indexes under an exclusive lock, so on large databases run this in a
+quiet window. Other databases keep the VARCHAR columns.
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+PLATFORM_STATUSES = ('Not Started', 'Pitch Sent', 'Article Sent', 'Follow-up',
+                     'Published', 'Rejected')
+TARGET_STATUSES = ('identified', 'contacted', 'negotiating', 'approved', 'live', 'rejected')
+CAMPAIGN_STATUSES = ('draft', 'active', 'paused', 'completed')
+EMAIL_STATUSES = ('draft', 'queued', 'sent', 'delivered', 'replied', 'bounced')
+
+# (table, column, enum type, values, default, VARCHAR length before)
+COLUMNS = [
+    ('platforms', 'status', 'platform_status', PLATFORM_STATUSES, 'Not Started', 50),
+    ('platforms', 'tier', 'platform_tier', ('T1', 'T2', 'T3'), None, 10),
+    ('platforms', 'difficulty', 'platform_difficulty', ('Easy', 'Medium', 'Hard'), None, 20),
+    ('targets', 'status', 'target_status', TARGET_STATUSES, 'identified', 50),
+    ('targets', 'priority', 'target_priority', ('low', 'medium', 'high'), 'medium', 20),
+    ('campaigns', 'status', 'campaign_status', CAMPAIGN_STATUSES, 'draft', 50),
+    ('outreach_emails', 'status', 'email_status', EMAIL_STATUSES, 'draft', 50),
+]
+
+COUNTED_TABLES = ('targets', 'outreach_emails')
+
+
+def _key(value):
+    return ''.join(ch for ch in value.lower() if ch.isalnum())
+
+
+def _key_sql(column):
+    """The same key as _key(), in SQL both PostgreSQL and SQLite understand."""
+    expr = f'lower(trim({column}))'
+    for ch in (' ', '-', '_', '.', '/'):
+        expr = f"replace({expr}, '{ch}', '')"
+    return expr
+
+
+def _quote(value):
+    return 'NULL' if value is None else "'" + value.replace("'", "''") + "'"
+
+
+def _normalize(bind, table, column, values, default):
+    allowed = ', '.join(_quote(v) for v in values)
+    cases = ' '.join(f'WHEN {_quote(_key(v))} THEN {_quote(v)}' for v in values)
+    # NULL stays NULL where there is no default
+    needs_fixing = f'({column} IS NULL OR {column} NOT IN ({allowed}))' if default else \
+        f'({column} IS NOT NULL AND {column} NOT IN ({allowed}))'
+
+    unknown = bind.execute(sa.text(
+        f"SELECT {column}, count(*) FROM {table} WHERE {needs_fixing} "
+        f"AND trim({column}) <> '' "
+        f"AND {_key_sql(column)} NOT IN ({', '.join(_quote(_key(v)) for v in values)}) "
+        f"GROUP BY {column}"
+    )).all()
+    for value, n in unknown:
+        logger.warning('%s.%s: %d rows with unknown value %r set to %s',
+                       table, column, n, value, default or 'NULL')
+
+    op.execute(
+        f'UPDATE {table} SET {column} = CASE {_key_sql(column)} {cases} '
+        f'ELSE {_quote(default)} END WHERE {needs_fixing}'
+    )
+
+
+def _recount_statuses():
+    for table in COUNTED_TABLES:
+        op.execute(f"DELETE FROM stat_counters WHERE key LIKE '{table}.status.%'")
+        op.execute(
+            f"INSERT INTO stat_counters (key, value) "
+            f"SELECT '{table}.status.' || COALESCE(status, 'None'), count(*) "
+            f"FROM {table} GROUP BY status"
+        )
+
+
+def _by_table():
+    tables = {}
+    for table, column, type_name, values, default, length in COLUMNS:
+        tables.setdefault(table, []).append((column, type_name, values, default, length))
+    return tables
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    for table, column, _, values, default, _ in COLUMNS:
+        _normalize(bind, table, column, values, default)
+    _recount_statuses()
+
+    if bind.dialect.name != 'postgresql':
+        return
+
+    for _, _, type_name, values, _, _ in COLUMNS:
+        sa.Enum(*values, name=type_name).create(bind, checkfirst=True)
+    for table, columns in _by_table().items():
+        # A default can't be cast along with the column: drop it, convert, restore
+        actions = []
+        for column, type_name, _, default, _ in columns:
+            actions += [f'ALTER COLUMN {column} DROP DEFAULT',
+                        f'ALTER COLUMN {column} TYPE {type_name} USING {column}::{type_name}']
+            if default:
+                actions.append(f'ALTER COLUMN {column} SET DEFAULT {_quote(default)}')
+        op.execute(f'ALTER TABLE {table} ' + ', '.join(actions))
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    for table, columns in _by_table().items():
+        actions = []
+        for column, _, _, default, length in columns:
+            actions += [f'ALTER COLUMN {column} DROP DEFAULT',
+                        f'ALTER COLUMN {column} TYPE VARCHAR({length}) USING {column}::text']
+            if default:
+                actions.append(f'ALTER COLUMN {column} SET DEFAULT {_quote(default)}')
+        op.execute(f'ALTER TABLE {table} ' + ', '.join(actions))
+    for _, _, type_name, values, _, _ in COLUMNS:
+        sa.Enum(*values, name=type_name).drop(bind, checkfirst=True)
@@ -0,0 +1,306 @@
+"""Store outreach email bodies once per distinct text
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-19
+
+Bodies move out of outreach_emails into email_bodies (one row per
+distinct text, keyed by its SHA-256); each email keeps ``body_id`` and,
+for emails rendered from a template, ``body_context`` (see
+app/services/email_bodies.py). Existing bodies are deduplicated as they
+are; run ``flask email-bodies compact`` afterwards to move personalised
+emails onto their template's body, then ``flask email-bodies prune``.
+
+Full-text search follows the body: outreach_emails is indexed on subject
+and recipient, email_bodies on the body (PostgreSQL: generated
+``search_vector`` with a GIN index built CONCURRENTLY; SQLite: FTS5).
+
+PostgreSQL rewrites outreach_emails under an exclusive lock to fill
+body_id, so on large databases run this in a quiet window. The dropped
+column's space is reused by new rows but only returned to the OS by
+VACUUM FULL (or pg_repack).
+"""
+import hashlib
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+# Free text is cut off well below tsvector's 1MB limit
+MAX_TEXT = 100000
+
+BATCH = 1000
+
+# PostgreSQL: the same hex digest as hashlib.sha256(body.encode()).hexdigest()
+PG_HASH = "encode(sha256(convert_to({}, 'UTF8')), 'hex')"
+
+EMAIL_VECTOR = ("setweight(to_tsvector('english'::regconfig, coalesce(subject, '')), 'A') || "
+                "setweight(to_tsvector('english'::regconfig, coalesce(recipient_email, '')), 'B')")
+BODY_VECTOR = f"setweight(to_tsvector('english'::regconfig, left(body, {MAX_TEXT})), 'C')"
+# As created by migration 012, for the downgrade
+OLD_EMAIL_VECTOR = (f"{EMAIL_VECTOR} || setweight(to_tsvector('english'::regconfig, "
+                    f"left(coalesce(body, ''), {MAX_TEXT})), 'C')")
+
+
+def _drop_if_invalid(bind, name):
+    invalid = bind.execute(sa.text(
+        'SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+        'WHERE c.relname = :name AND NOT i.indisvalid'
+    ), {'name': name}).scalar()
+    if invalid:
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def _sqlite_ddl(table, columns):
+    fts = f'{table}_fts'
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{c}' for c in columns)
+    old = ', '.join(f'old.{c}' for c in columns)
+    delete_old = (f"INSERT INTO {fts}({fts}, rowid, {cols}) "
+                  f"VALUES ('delete', old.id, {old});")
+    insert_new = f'INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{cols}, content='{table}', content_rowid='id', tokenize='porter unicode61')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} '
+        f'BEGIN {delete_old} {insert_new} END',
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _drop_sqlite_fts(table):
+    fts = f'{table}_fts'
+    for suffix in ('ai', 'ad', 'au'):
+        op.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+    op.execute(f'DROP TABLE IF EXISTS {fts}')
+
+
+def _backfill_python(bind):
+    """SQLite and others: hash in Python, a batch of emails at a time."""
+    emails = sa.table('outreach_emails', sa.column('id'), sa.column('body'),
+                      sa.column('body_id'))
+    bodies = sa.table('email_bodies', sa.column('id'), sa.column('hash'),
+                      sa.column('body'), sa.column('created_at'))
+    after_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(emails.c.id, emails.c.body)
+            .where(emails.c.id > after_id).order_by(emails.c.id).limit(BATCH)
+        ).all()
+        if not rows:
+            break
+        after_id = rows[-1].id
+
+        hashes = {row.id: hashlib.sha256((row.body or '').encode('utf-8')).hexdigest()
+                  for row in rows}
+        texts = {hashes[row.id]: row.body or '' for row in rows}
+        known = dict(bind.execute(
+            sa.select(bodies.c.hash, bodies.c.id).where(bodies.c.hash.in_(list(texts)))).all())
+        new = [{'hash': h, 'body': t, 'created_at': sa.func.current_timestamp()}
+               for h, t in texts.items() if h not in known]
+        for record in new:
+            known[record['hash']] = bind.execute(
+                sa.insert(bodies).values(record).returning(bodies.c.id)).scalar()
+        bind.execute(
+            sa.update(emails).where(emails.c.id == sa.bindparam('email_id'))
+            .values(body_id=sa.bindparam('new_body_id')),
+            [{'email_id': email_id, 'new_body_id': known[h]} for email_id, h in hashes.items()])
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    op.create_table(
+        'email_bodies',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('hash'),
+    )
+
+    if dialect == 'postgresql':
+        op.execute('ALTER TABLE outreach_emails ADD COLUMN body_id INTEGER, '
+                   'ADD COLUMN body_context JSON')
+        op.execute(
+            f'INSERT INTO email_bodies (hash, body, created_at) '
+            f'SELECT DISTINCT ON (hash) hash, body, now() FROM '
+            f"(SELECT {PG_HASH.format('body')} AS hash, body FROM outreach_emails) AS e"
+        )
+        op.execute(f"UPDATE outreach_emails SET body_id = b.id FROM email_bodies b "
+                   f"WHERE b.hash = {PG_HASH.format('outreach_emails.body')}")
+        # Drops the index on it too; recreated without the body below
+        op.execute('ALTER TABLE outreach_emails DROP COLUMN IF EXISTS search_vector')
+        op.execute(
+            'ALTER TABLE outreach_emails DROP COLUMN body, '
+            'ALTER COLUMN body_id SET NOT NULL, '
+            'ADD CONSTRAINT outreach_emails_body_id_fkey '
+            'FOREIGN KEY (body_id) REFERENCES email_bodies (id), '
+            f'ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({EMAIL_VECTOR}) STORED'
+        )
+        op.execute(f'ALTER TABLE email_bodies ADD COLUMN search_vector tsvector '
+                   f'GENERATED ALWAYS AS ({BODY_VECTOR}) STORED')
+        with op.get_context().autocommit_block():
+            _drop_if_invalid(bind, 'ix_outreach_emails_body_id')
+            op.create_index('ix_outreach_emails_body_id', 'outreach_emails', ['body_id'],
+                            if_not_exists=True, postgresql_concurrently=True)
+            for table in ('outreach_emails', 'email_bodies'):
+                name = f'ix_{table}_search_vector'
+                _drop_if_invalid(bind, name)
+                op.create_index(name, table, ['search_vector'], if_not_exists=True,
+                                postgresql_using='gin', postgresql_concurrently=True)
+        return
+
+    with op.batch_alter_table('outreach_emails') as batch_op:
+        batch_op.add_column(sa.Column('body_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('body_context', sa.JSON(), nullable=True))
+    _backfill_python(bind)
+
+    if dialect == 'sqlite':
+        # The table is rebuilt below; its FTS triggers go first
+        _drop_sqlite_fts('outreach_emails')
+    with op.batch_alter_table('outreach_emails') as batch_op:
+        batch_op.alter_column('body_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_outreach_emails_body_id', 'email_bodies',
+                                    ['body_id'], ['id'])
+        batch_op.create_index('ix_outreach_emails_body_id', ['body_id'])
+        batch_op.drop_column('body')
+
+    if dialect == 'sqlite':
+        for statement in _sqlite_ddl('outreach_emails', ['subject', 'recipient_email']):
+            op.execute(statement)
+        for statement in _sqlite_ddl('email_bodies', ['body']):
+            op.execute(statement)
+
+
+# Snapshot of app.services.template_engine at the time of this migration,
+# so the downgrade renders bodies the way they were stored
+_FIELDS = ('contact_name', 'contact_first_name', 'platform_name',
+           'platform_url', 'tier', 'topic')
+_TAG_RE = re.compile(r'\{\{\s*([#^/]?)\s*([a-z_]+)\s*(?:\|([^}]*))?\}\}')
+
+
+def _compile(text):
+    """Parse template text into literal strs, ('field', name, default) and
+    ('section', name, inverted, children) segments."""
+    root, stack, pos = [], [], 0
+    out = root
+    for m in _TAG_RE.finditer(text):
+        sigil, name, default = m.group(1), m.group(2), m.group(3)
+        if name not in _FIELDS:
+            continue
+        if m.start() > pos:
+            out.append(text[pos:m.start()])
+        pos = m.end()
+        if sigil in ('#', '^'):
+            children = []
+            out.append(('section', name, sigil == '^', children))
+            stack.append((name, out))
+            out = children
+        elif sigil == '/':
+            if not stack or stack[-1][0] != name:
+                raise ValueError(f'Unexpected {{{{/{name}}}}}')
+            _, out = stack.pop()
+        else:
+            out.append(('field', name, default or ''))
+    if stack:
+        raise ValueError(f'Missing {{{{/{stack[-1][0]}}}}}')
+    if pos < len(text):
+        out.append(text[pos:])
+    return root
+
+
+def _render(segments, ctx, out):
+    for seg in segments:
+        if isinstance(seg, str):
+            out.append(seg)
+        elif seg[0] == 'field':
+            out.append(ctx[seg[1]] or seg[2])
+        elif bool(ctx[seg[1]]) != seg[2]:
+            _render(seg[3], ctx, out)
+    return out
+
+
+def _restore_bodies(bind):
+    """Write each email's full body back, rendering templated ones."""
+
+    emails = sa.table('outreach_emails', sa.column('id'), sa.column('body'),
+                      sa.column('body_id'), sa.column('body_context', sa.JSON()))
+    bodies = sa.table('email_bodies', sa.column('id'), sa.column('body'))
+
+    op.execute('UPDATE outreach_emails SET body = (SELECT body FROM email_bodies '
+               'WHERE email_bodies.id = outreach_emails.body_id)')
+    after_id = 0
+    compiled = {}
+    while True:
+        rows = bind.execute(
+            sa.select(emails.c.id, emails.c.body_id, emails.c.body_context, bodies.c.body)
+            .join(bodies, bodies.c.id == emails.c.body_id)
+            .where(emails.c.body_context.isnot(None), emails.c.id > after_id)
+            .order_by(emails.c.id).limit(BATCH)
+        ).all()
+        if not rows:
+            break
+        after_id = rows[-1].id
+        updates = []
+        for row in rows:
+            if row.body_id not in compiled:
+                compiled[row.body_id] = _compile(row.body)
+            context = {**dict.fromkeys(_FIELDS, ''), **row.body_context}
+            updates.append({'email_id': row.id,
+                            'text': ''.join(_render(compiled[row.body_id], context, []))})
+        bind.execute(sa.update(emails).where(emails.c.id == sa.bindparam('email_id'))
+                     .values(body=sa.bindparam('text')), updates)
+
+
+def downgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            for table in ('outreach_emails', 'email_bodies'):
+                op.drop_index(f'ix_{table}_search_vector', table_name=table,
+                              if_exists=True, postgresql_concurrently=True)
+        op.execute('ALTER TABLE outreach_emails DROP COLUMN IF EXISTS search_vector, '
+                   'ADD COLUMN body TEXT')
+        _restore_bodies(bind)
+        op.execute('ALTER TABLE outreach_emails ALTER COLUMN body SET NOT NULL, '
+                   'DROP COLUMN body_id, DROP COLUMN body_context, '
+                   f'ADD COLUMN search_vector tsvector '
+                   f'GENERATED ALWAYS AS ({OLD_EMAIL_VECTOR}) STORED')
+        op.drop_table('email_bodies')
+        with op.get_context().autocommit_block():
+            _drop_if_invalid(bind, 'ix_outreach_emails_search_vector')
+            op.create_index('ix_outreach_emails_search_vector', 'outreach_emails',
+                            ['search_vector'], if_not_exists=True,
+                            postgresql_using='gin', postgresql_concurrently=True)
+        return
+
+    if dialect == 'sqlite':
+        _drop_sqlite_fts('email_bodies')
+        _drop_sqlite_fts('outreach_emails')
+    with op.batch_alter_table('outreach_emails') as batch_op:
+        batch_op.add_column(sa.Column('body', sa.Text(), nullable=True))
+    _restore_bodies(bind)
+    with op.batch_alter_table('outreach_emails') as batch_op:
+        batch_op.alter_column('body', existing_type=sa.Text(), nullable=False)
+        batch_op.drop_index('ix_outreach_emails_body_id')
+        batch_op.drop_constraint('fk_outreach_emails_body_id', type_='foreignkey')
+        batch_op.drop_column('body_context')
+        batch_op.drop_column('body_id')
+    op.drop_table('email_bodies')
+
+    if dialect == 'sqlite':
+        for statement in _sqlite_ddl('outreach_emails', ['subject', 'recipient_email', 'body']):
+            op.execute(statement)
@@ -0,0 +1,34 @@
+"""Add the 'Responded' platform status
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-19
+
+Reply sync moves a platform to 'Responded' when its contact answers a
+pitch or follow-up. PostgreSQL gains the value on the platform_status
+enum (ADD VALUE runs outside the migration transaction, and takes no
+table lock); other databases store the status as VARCHAR and need no
+change.
+
+PostgreSQL can't drop an enum value, so the downgrade moves responded
+platforms back to 'Pitch Sent' and leaves the value on the type.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE platform_status ADD VALUE IF NOT EXISTS 'Responded' "
+                       "AFTER 'Follow-up'")
+
+
+def downgrade():
+    op.execute(sa.text("UPDATE platforms SET status = 'Pitch Sent' WHERE status = 'Responded'"))
@@ -0,0 +1,35 @@
+"""Keep staged platform uploads in the database
+
+Revision ID: 016
+Revises: 015
+Create Date: 2026-10-19
+
+An upload waits between the upload and confirm steps of a platform
+import. On local disk the confirm request can land on another dyno (or
+after a restart) and find nothing, so the file is stored here in chunks
+instead; the disk only caches it.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '016'
+down_revision = '015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'staged_upload_chunks',
+        sa.Column('token', sa.String(40), primary_key=True),
+        sa.Column('seq', sa.Integer(), primary_key=True),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    op.create_index('ix_staged_upload_chunks_created_at', 'staged_upload_chunks', ['created_at'])
+
+
+def downgrade():
+    op.drop_index('ix_staged_upload_chunks_created_at', table_name='staged_upload_chunks')
+    op.drop_table('staged_upload_chunks')
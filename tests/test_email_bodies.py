@@ -0,0 +1,24 @@
+from app import db
+from app.models import EmailBody, OutreachEmail
+
+
+def test_body_reads_back_before_and_after_flush(app):
+    email = OutreachEmail(recipient_email='a@b.example', subject='Hi', body='<p>hi</p>')
+    assert email.body == '<p>hi</p>'
+    db.session.add(email)
+    assert email.body == '<p>hi</p>'
+    db.session.commit()
+
+    email.body = '<p>edited</p>'
+    assert email.body == '<p>edited</p>'
+    db.session.commit()
+    email_id = email.id
+    db.session.expunge_all()
+    assert db.session.get(OutreachEmail, email_id).body == '<p>edited</p>'
+
+
+def test_identical_bodies_are_stored_once(app):
+    db.session.add_all(OutreachEmail(recipient_email=f'{i}@b.example', subject='Hi',
+                                     body='<p>same</p>') for i in range(3))
+    db.session.commit()
+    assert db.session.scalar(db.select(db.func.count()).select_from(EmailBody)) == 1
@@ -0,0 +1,70 @@
+import io
+from datetime import date, datetime
+
+import openpyxl
+
+from app import db
+from app.models import Platform, Target
+from app.services import bulk_actions, xlsx_writer
+
+
+def test_xlsx_export_streams_a_readable_workbook(app, client):
+    db.session.add_all([
+        Platform(name='Alpha & <Co>', url='https://alpha.example', domain='alpha.example',
+                 pitch_sent_date=date(2024, 2, 1), notes='line one\nline\x07 two',
+                 backlink_confirmed=True),
+        Platform(name='Beta', url='https://beta.example', domain='beta.example'),
+    ])
+    db.session.commit()
+
+    response = client.get('/export/platforms.xlsx')
+    assert response.status_code == 200
+    assert response.is_streamed
+
+    ws = openpyxl.load_workbook(io.BytesIO(response.get_data())).active
+    assert ws.title == 'Platforms'
+    rows = list(ws.values)
+    assert rows[0][:3] == ('Name', 'URL', 'Tier')
+    alpha = dict(zip(rows[0], rows[1]))
+    assert alpha['Name'] == 'Alpha & <Co>'
+    assert alpha['Pitch Sent Date'] == datetime(2024, 2, 1)
+    assert alpha['Notes'] == 'line one\nline two'
+    assert alpha['Backlink Confirmed'] == 'Yes'
+    assert dict(zip(rows[0], rows[2]))['Status'] == 'Not Started'
+
+
+def test_xlsx_writer_yields_before_the_last_row(monkeypatch):
+    monkeypatch.setattr(xlsx_writer, 'FLUSH_SIZE', 1024)
+    fetched = []
+
+    def rows():
+        for i in range(5000):
+            fetched.append(i)
+            yield [i, f'row {i}', datetime(2024, 1, 1, 12, 30), i % 2 == 0]
+
+    chunks = xlsx_writer.stream_xlsx('Sheet', ['N', 'Text', 'When', 'Even'], rows())
+    first = next(chunks)
+    assert len(fetched) < 5000
+    data = first + b''.join(chunks)
+
+    ws = openpyxl.load_workbook(io.BytesIO(data)).active
+    values = list(ws.values)
+    assert len(values) == 5001
+    assert values[-1] == (4999, 'row 4999', datetime(2024, 1, 1, 12, 30), False)
+
+
+def test_non_numeric_id_filters_match_nothing(app, client):
+    platform = Platform(name='Alpha', url='https://alpha.example', domain='alpha.example')
+    target = Target(platform=platform, target_url='https://alpha.example/post')
+    db.session.add(target)
+    db.session.commit()
+
+    response = client.get(f'/export/targets.csv?platform_id={platform.id}')
+    assert response.get_data(as_text=True).count('alpha.example/post') == 1
+    response = client.get('/export/targets.csv?platform_id=abc')
+    assert response.status_code == 200
+    assert 'alpha.example/post' not in response.get_data(as_text=True)
+
+    assert list(bulk_actions.iter_id_chunks('targets', filters={'platform_id': 'abc'})) == []
+    chunks = bulk_actions.iter_id_chunks('targets', filters={'platform_id': str(platform.id)})
+    assert list(chunks) == [[target.id]]
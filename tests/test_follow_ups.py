@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+
+from app import db
+from app.models import EmailTemplate, OutreachEmail, Platform
+from app.services import follow_ups
+
+
+class FakeGmail:
+    def __init__(self, error=None):
+        self.error = error
+        self.sent = []
+
+    def get_thread_last_message_id(self, thread_id):
+        return None
+
+    def send_email(self, to, subject, body_html, **kwargs):
+        if self.error:
+            return {'error': self.error}
+        self.sent.append(to)
+        return {'id': f'msg-{len(self.sent)}', 'thread_id': f'thread-{len(self.sent)}'}
+
+
+def _pitched(name, pitch_status='sent'):
+    platform = Platform(name=name, url=f'https://{name}.example', domain=f'{name}.example',
+                        contact_email=f'editor@{name}.example',
+                        pitch_sent_date=date.today() - timedelta(days=30))
+    db.session.add(platform)
+    db.session.flush()
+    db.session.add(OutreachEmail(platform_id=platform.id, recipient_email=platform.contact_email,
+                                 subject='Pitch', body='<p>Pitch</p>', status=pitch_status))
+    return platform
+
+
+def _template():
+    template = EmailTemplate(name='Nudge', subject='Nudge', body_html='<p>Any news?</p>')
+    db.session.add(template)
+    db.session.commit()
+    return template
+
+
+def test_failed_sends_stay_queued_and_are_not_recreated(app):
+    platform = _pitched('alpha')
+    template = _template()
+    assert follow_ups.create_follow_ups(template, 1, queue=True).created == 1
+
+    result = follow_ups.send_queued(FakeGmail(error='429 Too Many Requests'))
+    assert (result.sent, result.failed) == (0, 1)
+    assert db.session.scalar(db.select(OutreachEmail.status)
+                             .where(OutreachEmail.follow_up_stage == 1)) == 'queued'
+    assert db.session.get(Platform, platform.id).follow_up_1 is None
+
+    # The pending follow-up still blocks a duplicate, and the retry goes out
+    assert follow_ups.create_follow_ups(template, 1, queue=True).created == 0
+    gmail = FakeGmail()
+    assert follow_ups.send_queued(gmail).sent == 1
+    assert gmail.sent == ['editor@alpha.example']
+    assert db.session.get(Platform, platform.id).follow_up_1 == date.today()
+
+
+def test_bounced_and_replied_platforms_get_no_follow_ups(app):
+    _pitched('alpha')
+    _pitched('bounced', pitch_status='bounced')
+    _pitched('replied', pitch_status='replied')
+    due = db.session.execute(follow_ups.due_platforms(1)).all()
+    assert [row.name for row in due] == ['alpha']
@@ -0,0 +1,33 @@
+import io
+import re
+
+from app import db
+from app.models import Platform, StagedUploadChunk
+from app.services import platform_import
+
+CSV = b'Name,URL,Status\nAlpha,https://alpha.example,Pitch Sent\nBeta,https://beta.example,\n'
+
+
+def test_confirm_finds_the_upload_on_another_dyno(app, client, tmp_path, monkeypatch):
+    monkeypatch.setattr(platform_import, 'STAGED_CHUNK_SIZE', 16)
+    app.config['IMPORT_UPLOAD_DIR'] = str(tmp_path / 'web.1')
+    response = client.post('/platforms/upload', content_type='multipart/form-data',
+                           data={'file': (io.BytesIO(CSV), 'platforms.csv'), 'mode': 'skip'})
+    assert response.status_code == 200
+    token = re.search(rb'name="token" type="hidden" value="([^"]+)"', response.data).group(1)
+    assert db.session.query(StagedUploadChunk).count() > 1
+
+    # The confirm POST reaches a dyno whose disk never saw the file
+    app.config['IMPORT_UPLOAD_DIR'] = str(tmp_path / 'web.2')
+    response = client.post('/platforms/upload/confirm',
+                           data={'token': token.decode(), 'mode': 'skip', 'true_values': ''})
+    assert response.status_code == 302
+
+    assert sorted(db.session.scalars(db.select(Platform.name))) == ['Alpha', 'Beta']
+    assert db.session.query(StagedUploadChunk).count() == 0
+    assert list((tmp_path / 'web.2').iterdir()) == []
+
+
+def test_unknown_token_has_expired(app):
+    assert platform_import.staged_upload_path('0' * 32 + '.csv') is None
+    assert platform_import.staged_upload_path('../../etc/passwd') is None
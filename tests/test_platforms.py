@@ -0,0 +1,38 @@
+from app import db
+from app.models import Platform
+
+
+def _form(**fields):
+    return {'name': 'Alpha copy', 'url': 'https://www.alpha.example/blog',
+            'status': 'Pitch Sent', **fields}
+
+
+def test_duplicate_left_without_a_domain_stays_editable(app, client):
+    original = Platform(name='Alpha', url='https://alpha.example')
+    db.session.add(original)
+    db.session.flush()
+    # What migration 007 leaves behind for a later copy of the same domain
+    duplicate = Platform(name='Alpha copy', url='https://www.alpha.example/blog')
+    duplicate.domain = None
+    db.session.add(duplicate)
+    db.session.commit()
+    duplicate_id = duplicate.id
+
+    response = client.post(f'/platforms/{duplicate_id}/edit', data=_form(notes='Chased by phone'))
+    assert response.status_code == 302
+    db.session.expire_all()
+    duplicate = db.session.get(Platform, duplicate_id)
+    assert (duplicate.notes, duplicate.domain) == ('Chased by phone', None)
+
+    # A new URL is checked: still the same site...
+    response = client.post(f'/platforms/{duplicate_id}/edit',
+                           data=_form(url='https://alpha.example/other'))
+    assert response.status_code == 200
+    assert b'Alpha already uses alpha.example' in response.data
+
+    # ...or a different one, which the row now owns
+    response = client.post(f'/platforms/{duplicate_id}/edit',
+                           data=_form(url='https://beta.example'))
+    assert response.status_code == 302
+    db.session.expire_all()
+    assert db.session.get(Platform, duplicate_id).domain == 'beta.example'
@@ -0,0 +1,92 @@
+"""Every @query_budget view, over more rows than any budget allows.
+
+TestingConfig turns budgets into hard failures, so an N+1 creeping into a
+view (or its template) fails here instead of only logging in production.
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+from app import db
+from app.models import Campaign, EmailTemplate, OutreachEmail, Platform, Target
+from app.services import api_resources, email_bodies
+
+ROWS = 12  # more than the largest budget, so per-row queries go over it
+
+RESOURCES = ('platforms', 'targets', 'campaigns', 'emails', 'templates')
+
+
+@pytest.fixture
+def seeded(app):
+    app.config['RESPONSE_CACHE_TTL'] = 0  # run the views, not the page cache
+    template = EmailTemplate(name='Pitch', subject='Hi {{contact_first_name}}',
+                             body_html='<p>Hello {{contact_first_name|there}}, about {{topic}}</p>')
+    db.session.add(template)
+    db.session.add_all(EmailTemplate(name=f'Template {i}', subject='Hello', body_html='<p>Hi</p>')
+                       for i in range(ROWS))
+    db.session.flush()
+
+    emails = []
+    for i in range(ROWS):
+        platform = Platform(name=f'Platform {i}', url=f'https://p{i}.example', domain=f'p{i}.example',
+                            tier='T1', contact_name=f'Editor {i}',
+                            contact_email=f'editor{i}@p{i}.example', topic_to_submit=f'topic {i}')
+        target = Target(platform=platform, target_url=f'https://p{i}.example/post')
+        campaign = Campaign(name=f'Campaign {i}')
+        db.session.add_all([platform, target, campaign])
+        db.session.flush()
+        (body_id, context), = email_bodies.store_rendered(template, [platform])
+        emails.append(OutreachEmail(target_id=target.id, campaign_id=campaign.id,
+                                    platform_id=platform.id, template_id=template.id,
+                                    recipient_email=platform.contact_email,
+                                    subject=f'Hi Editor {i}', body_id=body_id, body_context=context,
+                                    status='sent' if i % 2 else 'draft',
+                                    sent_at=datetime.now(timezone.utc) if i % 2 else None))
+        emails.append(OutreachEmail(target_id=target.id, platform_id=platform.id,
+                                    recipient_email=platform.contact_email,
+                                    subject=f'Hand-written {i}', body=f'<p>Note {i}</p>'))
+    db.session.add_all(emails)
+    token = api_resources.create_token('tests')
+    db.session.commit()
+    return {'draft_id': emails[0].id, 'target_id': emails[0].target_id,
+            'auth': {'Authorization': f'Bearer {token}'}}
+
+
+@pytest.mark.parametrize('path', [
+    '/',
+    '/platforms',
+    '/targets',
+    '/campaigns',
+    '/emails',
+    '/templates',
+    '/lookup/platforms?q=Platform',
+    '/lookup/targets?q=example',
+    '/search?q=Platform',
+    '/search?q=Platform&kind=platforms',
+])
+def test_html_views_stay_within_budget(client, seeded, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    response.get_data()  # a streamed page is checked once its body has been sent
+
+
+def test_email_forms_stay_within_budget(client, seeded):
+    assert client.get('/emails/new').status_code == 200
+    assert client.get(f'/emails/new?target_id={seeded["target_id"]}').status_code == 200
+    assert client.get(f'/emails/{seeded["draft_id"]}/edit').status_code == 200
+
+    form = {'target_id': seeded['target_id'], 'campaign_id': 0, 'recipient_email': 'a@b.example',
+            'subject': 'Subject', 'body': '<p>Body</p>'}
+    assert client.post('/emails/new', data=form).status_code == 302
+    assert client.post(f'/emails/{seeded["draft_id"]}/edit', data=form).status_code == 302
+
+
+@pytest.mark.parametrize('resource', RESOURCES)
+def test_api_reads_stay_within_budget(client, seeded, resource):
+    response = client.get(f'/api/v1/{resource}', headers=seeded['auth'])
+    assert response.status_code == 200
+    records = response.get_json()['data']
+    assert len(records) >= ROWS
+
+    response = client.get(f'/api/v1/{resource}/{records[0]["id"]}', headers=seeded['auth'])
+    assert response.status_code == 200
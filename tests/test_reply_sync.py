@@ -0,0 +1,119 @@
+import json
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app import db
+from app.models import AppSetting, OutreachEmail, Platform, Target
+from app.services import reply_sync
+from app.services.gmail_service import GmailService
+
+
+class FakeGmail(BaseHTTPRequestHandler):
+    """Just enough of the Gmail REST API for reply sync."""
+
+    mailbox = {'history_id': '100', 'history': [], 'headers': {}, 'expired': False}
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        box = self.mailbox
+        if url.path == '/gmail/v1/users/me/profile':
+            return self._json({'historyId': box['history_id']})
+        if url.path == '/gmail/v1/users/me/history':
+            if box['expired']:
+                return self._json({'error': {'code': 404, 'message': 'Not Found'}}, 404)
+            since = int(query['startHistoryId'][0])
+            history = [h for h in box['history'] if int(h['id']) > since]
+            return self._json({'history': history, 'historyId': box['history_id']})
+        if url.path.startswith('/gmail/v1/users/me/messages/'):
+            message_id = url.path.rsplit('/', 1)[1]
+            headers = [{'name': k, 'value': v} for k, v in box['headers'][message_id].items()]
+            return self._json({'id': message_id, 'payload': {'headers': headers}})
+        self._json({'error': {'code': 404, 'message': 'Not Found'}}, 404)
+
+    def _json(self, body, status=200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def gmail(tmp_path):
+    FakeGmail.mailbox = {'history_id': '100', 'history': [], 'headers': {}, 'expired': False}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeGmail)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield GmailService(token_file=str(tmp_path / 'token.json'),
+                       api_endpoint=f'http://127.0.0.1:{server.server_port}/')
+    server.shutdown()
+    server.server_close()
+
+
+def _deliver(message_id, thread_id, history_id, **headers):
+    box = FakeGmail.mailbox
+    box['history'].append({'id': history_id, 'messagesAdded': [
+        {'message': {'id': message_id, 'threadId': thread_id, 'labelIds': ['INBOX']}}]})
+    box['headers'][message_id] = headers
+    box['history_id'] = history_id
+
+
+def _pitch(name):
+    platform = Platform(name=name, url=f'https://{name}.example', domain=f'{name}.example',
+                        status='Pitch Sent')
+    target = Target(platform=platform, target_url=f'https://{name}.example/post',
+                    status='contacted')
+    db.session.add_all([platform, target])
+    db.session.flush()
+    email = OutreachEmail(platform_id=platform.id, target_id=target.id,
+                          recipient_email=f'editor@{name}.example', subject='Pitch',
+                          body='<p>Pitch</p>', status='sent',
+                          gmail_message_id=f'{name}-sent', gmail_thread_id=f'{name}-thread')
+    db.session.add(email)
+    db.session.commit()
+    return email
+
+
+def test_sync_marks_replies_and_bounces(app, gmail):
+    replied = _pitch('alpha')
+    bounced = _pitch('beta')
+
+    assert reply_sync.sync_replies(gmail).reset
+    assert AppSetting.get(reply_sync.CHECKPOINT_KEY) == '100'
+
+    _deliver('m1', 'alpha-thread', '101', From='Editor <editor@alpha.example>')
+    _deliver('m2', 'beta-thread', '102', From='Mail Delivery <mailer-daemon@example.com>')
+    _deliver('m3', 'alpha-thread', '103', From='editor@alpha.example', **{'Auto-Submitted': 'auto-replied'})
+
+    result = reply_sync.sync_replies(gmail)
+    assert (result.messages_seen, result.replied, result.bounced) == (3, 1, 1)
+    assert result.history_id == '103'
+
+    db.session.expire_all()
+    assert db.session.get(OutreachEmail, replied.id).status == 'replied'
+    assert db.session.get(OutreachEmail, bounced.id).status == 'bounced'
+    assert db.session.get(Target, replied.target_id).status == 'negotiating'
+    platform = db.session.get(Platform, replied.platform_id)
+    assert (platform.status, platform.response_date) == ('Responded', date.today())
+    assert db.session.get(Platform, bounced.platform_id).status == 'Pitch Sent'
+
+    # Only changes since the checkpoint are fetched
+    assert reply_sync.sync_replies(gmail).messages_seen == 0
+
+
+def test_expired_checkpoint_resets(app, gmail):
+    AppSetting.set(reply_sync.CHECKPOINT_KEY, '5')
+    db.session.commit()
+    FakeGmail.mailbox.update(expired=True, history_id='250')
+
+    result = reply_sync.sync_replies(gmail)
+    assert result.reset and result.history_id == '250'
+    assert AppSetting.get(reply_sync.CHECKPOINT_KEY) == '250'